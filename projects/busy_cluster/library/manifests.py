@@ -0,0 +1,167 @@
+#! /usr/bin/env python3
+
+import sys
+import json
+import time
+import logging
+logging.getLogger().setLevel(logging.INFO)
+import pathlib
+
+import yaml
+import fire
+
+TOPSAIL_DIR = pathlib.Path(__file__).absolute().parents[3]
+sys.path.insert(0, str(TOPSAIL_DIR)) # launched as a script
+
+from projects.core.library import k8s_apply # noqa: E402
+
+# Generates the busy_cluster objects from their template, and applies
+# them in the namespaces.
+#
+# The template is parsed once, and the objects only get their own copy
+# of the fields that differ (name, app selector), the rest of the
+# template (eg, the configmap data) is shared between all the objects.
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PARALLEL = 8
+
+# the fields receiving the name of the object
+NAME_PATHS = {
+    "Deployment": [
+        ("metadata", "name"),
+        ("spec", "selector", "matchLabels", "app"),
+        ("spec", "template", "metadata", "labels", "app"),
+    ],
+}
+DEFAULT_NAME_PATHS = [("metadata", "name")]
+
+# the Services select the Pods of a Deployment
+SERVICE_APP_PATH = ("spec", "selector", "app")
+
+
+def _set_path(obj, path, value):
+    # copy the dicts along the path, share the rest of the object
+    obj = dict(obj)
+    if len(path) == 1:
+        obj[path[0]] = value
+    else:
+        obj[path[0]] = _set_path(obj.get(path[0]) or {}, path[1:], value)
+
+    return obj
+
+
+def load_template(template_file):
+    with open(template_file) as f:
+        docs = [doc for doc in yaml.safe_load_all(f) if doc]
+
+    if len(docs) != 1:
+        raise ValueError(f"Expected one object in {template_file}, found {len(docs)} ...")
+
+    return docs[0]
+
+
+def generate_objects(template, prefix, count, per_object=None):
+    """
+    Generates `count` objects named <prefix>-<idx>, or, with
+    `per_object`, `per_object` Services named <prefix>-<idx>-svc<svc_idx>
+    selecting the Pods of the Deployment <prefix>-<idx>.
+    """
+
+    name_paths = NAME_PATHS.get(template["kind"], DEFAULT_NAME_PATHS)
+
+    for idx in range(1, count + 1):
+        name = f"{prefix}-{idx:03d}"
+
+        if per_object is None:
+            obj = template
+            for path in name_paths:
+                obj = _set_path(obj, path, name)
+            yield obj
+
+            continue
+
+        for svc_idx in range(1, per_object + 1):
+            obj = _set_path(template, ("metadata", "name"), f"{name}-svc{svc_idx:03d}")
+            yield _set_path(obj, SERVICE_APP_PATH, name)
+
+
+def generate(template_file, prefix, count, dest_file, per_object=None):
+    """
+    Generates the objects from the template, and saves them as a List in a single file
+
+    Args:
+      template_file: the template of the objects
+      prefix: the prefix of the object names
+      count: the number of objects to generate
+      dest_file: the file where the List of objects is saved
+      per_object: if set, generates this number of Services per object (count x per_object Services)
+    """
+
+    template = load_template(template_file)
+
+    start = time.time()
+    items = list(generate_objects(template, prefix, count, per_object))
+
+    with open(dest_file, "w") as f:
+        json.dump(dict(apiVersion="v1", kind="List", items=items), f)
+
+    logging.info(f"{len(items)} {template['kind']} objects generated in {time.time() - start:.2f}s, saved into {dest_file}")
+
+
+def apply(manifests_file, namespaces, artifacts_dir,
+          batch_size=DEFAULT_BATCH_SIZE,
+          parallel=DEFAULT_PARALLEL):
+    """
+    Applies the List of objects in each of the namespaces, with concurrent batches of `oc apply` calls
+
+    Args:
+      manifests_file: the file containing the List of objects
+      namespaces: the namespaces where the objects are applied (whitespace-separated)
+      artifacts_dir: the directory where the batch results are saved
+      batch_size: the number of objects applied by each `oc apply` call
+      parallel: the number of `oc apply` calls running in parallel
+    """
+
+    if not isinstance(namespaces, (list, tuple)):
+        namespaces = str(namespaces).split()
+
+    with open(manifests_file) as f:
+        items = json.load(f)["items"]
+
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+    tasks = [(namespace, batch_idx, batch) for namespace in namespaces for batch_idx, batch in enumerate(batches)]
+
+    logging.info(f"Applying {len(items)} objects x {len(namespaces)} namespaces = {len(items) * len(namespaces)} objects, "
+                 f"in {len(tasks)} batches of {batch_size} objects, {parallel} in parallel ...")
+
+    apply_results, apply_summary = k8s_apply.apply_batches([(namespace, batch) for namespace, _, batch in tasks], parallel)
+    results = [dict(namespace=namespace, batch=batch_idx) | result
+               for (namespace, batch_idx, _), result in zip(tasks, apply_results)]
+
+    failed = [result for result in results if result["returncode"] != 0]
+    for result in failed:
+        logging.error(f"Batch #{result['batch']} of namespace {result['namespace']} failed: {result['error']}")
+
+    summary = dict(
+        objects=len(items) * len(namespaces),
+        namespaces=len(namespaces),
+        batch_size=batch_size,
+    ) | apply_summary
+
+    artifacts_dir = pathlib.Path(artifacts_dir)
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+    with open(artifacts_dir / f"apply_{pathlib.Path(manifests_file).stem}.yaml", "w") as f:
+        yaml.dump(dict(summary=summary, batches=results), f, sort_keys=False)
+
+    logging.info(f"{len(tasks)} batches applied in {summary['duration']:.2f}s.")
+
+    if failed:
+        logging.error(f"{len(failed)}/{len(tasks)} batches failed to apply ...")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Print help rather than opening a pager
+    fire.core.Display = lambda lines, out: print(*lines, file=out)
+
+    fire.Fire(dict(generate=generate, apply=apply))
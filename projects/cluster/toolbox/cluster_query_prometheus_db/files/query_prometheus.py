@@ -10,10 +10,19 @@ urllib3.disable_warnings()
 import logging
 logging.getLogger().setLevel(logging.INFO)
 import datetime
+import time
+import shutil
+import math
+import concurrent.futures
+
+import requests
 
 import prometheus_api_client
 import fire
 
+DEFAULT_WORKERS = 8
+DEFAULT_CHUNK_DURATION_S = 3600
+
 def get_k8s_token_proxy():
     token_file = pathlib.Path("/run/secrets/kubernetes.io/serviceaccount/token")
     if token_file.exists():
@@ -72,10 +81,173 @@ def get_prometheus_route():
     return result.stdout.strip()
 
 
+QUERY_RETRIES = 3
+QUERY_RETRY_DELAY_S = 5
+
+
+def get_chunks(start_ts, end_ts, step, chunk_duration_s, raw_samples):
+    """
+    Splits [start_ts, end_ts] into chunks aligned on an absolute grid
+    (multiples of the chunk length), so that the chunks of an
+    interrupted capture are found again when the capture window moves.
+
+    With raw_samples=False (range queries), the chunks are the first and
+    last evaluation timestamps of the chunk, aligned on the step, and
+    they do not overlap.
+
+    With raw_samples=True (metric selectors), the chunks are contiguous
+    [chunk_start, chunk_end) intervals, the last one includes end_ts.
+    """
+
+    chunk_len = max(1, int(chunk_duration_s // step)) * step
+
+    if raw_samples:
+        first, last = start_ts, end_ts
+    else:
+        first = math.ceil(start_ts / step) * step
+        last = math.floor(end_ts / step) * step
+        if first > last: # shorter than a step
+            return [(start_ts, end_ts)]
+
+    chunks = []
+    for cell in range(int(first // chunk_len), int(last // chunk_len) + 1):
+        cell_start = cell * chunk_len
+        cell_end = cell_start + chunk_len
+        if raw_samples:
+            chunk = (max(first, cell_start), min(last, cell_end))
+        else:
+            chunk = (max(first, cell_start), min(last, cell_end - step))
+
+        if raw_samples and chunk[0] == chunk[1] and chunk[1] != last:
+            continue # empty [start, end) interval
+        chunks.append(chunk)
+
+    return chunks
+
+
+def fetch_chunk(prom_connect, metric_name, metric_query, step, chunk_start, chunk_end, is_last, partial_file):
+    if partial_file.exists():
+        with open(partial_file) as f:
+            return json.load(f)
+
+    raw_samples = "(" not in metric_query
+
+    # the raw samples are fetched with a range selector, which excludes its start time
+    start_date = datetime.datetime.fromtimestamp(chunk_start - 1 if raw_samples else chunk_start)
+    end_date = datetime.datetime.fromtimestamp(chunk_end)
+
+    for attempt in range(1, QUERY_RETRIES + 1):
+        try:
+            if not raw_samples:
+                values = prom_connect.custom_query_range(query=metric_query, step=step,
+                                                         start_time=start_date, end_time=end_date)
+            else:
+                values = prom_connect.get_metric_range_data(
+                    metric_query,
+                    start_time=start_date, end_time=end_date
+                )
+            break
+        except (prometheus_api_client.exceptions.PrometheusApiClientException,
+                requests.exceptions.RequestException) as e:
+            logging.warning(f"Fetching {metric_name} [{chunk_start} - {chunk_end}] raised an exception (attempt {attempt}/{QUERY_RETRIES})")
+            logging.warning(f"Exception: {e}")
+            if attempt == QUERY_RETRIES:
+                raise
+            time.sleep(QUERY_RETRY_DELAY_S * attempt)
+
+    values = values or []
+
+    if raw_samples:
+        # keep the samples of [chunk_start, chunk_end), so that the contiguous chunks do not overlap
+        for current_values in values:
+            current_values["values"] = [
+                [ts, val] for ts, val in current_values["values"]
+                if chunk_start <= ts and (ts < chunk_end or (is_last and ts <= chunk_end))
+            ]
+        values = [current_values for current_values in values if current_values["values"]]
+
+    tmp_file = partial_file.with_name(f".{partial_file.name}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(values, f)
+    os.replace(tmp_file, partial_file)
+
+    return values
+
+
+def get_partial_filename(step, chunk_start, chunk_end):
+    return f"{step}-{chunk_start}-{chunk_end}.json"
+
+
+def get_resumed_step(partial_dir, step):
+    """
+    Returns the step of the interrupted capture, if any, and saves the step of the current capture.
+
+    In duration_s mode, the step is computed from the duration, which
+    grows between the runs. The step of the interrupted capture is kept,
+    so that its chunks are on the same grid.
+    """
+
+    step_file = partial_dir / "step"
+    if step_file.exists():
+        resumed_step = int(step_file.read_text())
+        if resumed_step != step:
+            logging.info(f"Resuming an interrupted capture, using its step of {resumed_step}s instead of {step}s.")
+
+        return resumed_step
+
+    partial_dir.mkdir(parents=True, exist_ok=True)
+    step_file.write_text(str(step))
+
+    return step
+
+
+def merge_chunks(chunks_values):
+    merged = {}
+    for values in chunks_values:
+        for current_values in values:
+            key = json.dumps(current_values["metric"], sort_keys=True)
+            if key not in merged:
+                merged[key] = dict(metric=current_values["metric"], values=[])
+            merged[key]["values"] += current_values["values"]
+
+    for current_values in merged.values():
+        current_values["values"].sort(key=lambda ts_val: ts_val[0])
+
+    return list(merged.values())
+
+
+def deduplicate_values(values):
+    metric_values = []
+    for current_values in values:
+        current_metric_values = {}
+        metric_values.append(current_metric_values)
+        current_metric_values["metric"] = current_values["metric"] # empty :/
+        current_metric_values["values"] = []
+        prev_val = None
+        prev_ts = None
+        has_skipped = False
+        for ts, val in current_values["values"]:
+            prev_ts = ts
+            if val == prev_val:
+                has_skipped = True
+                continue
+            if has_skipped:
+                current_metric_values["values"].append([prev_ts, prev_val])
+                has_skipped = False
+            current_metric_values["values"].append([ts, val])
+            prev_val = val
+        if prev_val is not None and has_skipped:
+            # add the last value if the list wasn't empty
+            current_metric_values["values"].append([ts, val])
+
+    return metric_values
+
+
 def fetch_and_save_prometheus_metrics(
         prom_connect, queries, dest,
         namespace,
         duration_s=0, start_ts=None, end_ts=None,
+        workers=DEFAULT_WORKERS, chunk_duration_s=DEFAULT_CHUNK_DURATION_S,
 ):
 
     if duration_s:
@@ -87,7 +259,6 @@ def fetch_and_save_prometheus_metrics(
         end_ts = up_query[0]["values"][-1][0]
         start_ts = end_ts - duration_s
 
-    ...
     start_date = datetime.datetime.fromtimestamp(start_ts)
     end_date = datetime.datetime.fromtimestamp(end_ts)
 
@@ -101,70 +272,74 @@ def fetch_and_save_prometheus_metrics(
     MIN_STEP = 5
     step = max(MIN_STEP, int(duration_s / SECOND_PER_STEP))
 
+    partial_dir = dest / ".partial"
+    step = get_resumed_step(partial_dir, step)
+
+    chunks = {
+        raw_samples: get_chunks(start_ts, end_ts, step, chunk_duration_s, raw_samples)
+        for raw_samples in (False, True)
+    }
+
     logging.info(f"Fetching the metrics between {start_date} and {end_date}, with a step of {step} and a duration of {(end_date - start_date).total_seconds()}s...")
-    metrics_values = dict()
+    logging.info(f"Using {len(chunks[False])} chunk(s) of {chunk_duration_s}s per query, and {workers} worker(s).")
+
+    metrics_futures = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for query in queries:
+            metric_name = query["name"]
+            metric_query = query["query"]
+            metric_query = metric_query.replace("$NAMESPACE", namespace)
+
+            metric_file = dest / (query["name"].replace(".*", "") + ".json")
+            if metric_file.exists():
+                logging.info(f"Already captured: {metric_file.name}")
+                continue
 
-    def get_filename(query_name):
-        return
+            metric_partial_dir = partial_dir / metric_file.stem
+            metric_partial_dir.mkdir(parents=True, exist_ok=True)
 
-    for query in queries:
-        metric_name = query["name"]
-        metric_query = query["query"]
-        metric_query = metric_query.replace("$NAMESPACE", namespace)
+            metric_chunks = chunks["(" not in metric_query]
+            partial_files = [metric_partial_dir / get_partial_filename(step, chunk_start, chunk_end)
+                             for chunk_start, chunk_end in metric_chunks]
 
-        metric_file = dest / (query["name"].replace(".*", "") + ".json")
-        if metric_file.exists():
-            logging.info(f"Already captured: {metric_file.name}")
-            continue
+            # the chunks of a previous capture which are not on the current grid
+            # (eg, the last chunk of the interrupted capture window)
+            for stale_file in set(metric_partial_dir.glob("*.json")) - set(partial_files):
+                stale_file.unlink()
 
-        logging.info(f"Fetching {metric_name} ...")
-        if "(" in metric_query:
+            logging.info(f"Fetching {metric_name} ...")
+            metrics_futures[metric_name] = (metric_query, metric_file, metric_partial_dir, [
+                executor.submit(fetch_chunk, prom_connect, metric_name, metric_query, step,
+                                chunk_start, chunk_end, chunk_idx == len(metric_chunks) - 1,
+                                partial_file)
+                for chunk_idx, ((chunk_start, chunk_end), partial_file) in enumerate(zip(metric_chunks, partial_files))
+            ])
+
+        for metric_name, (metric_query, metric_file, metric_partial_dir, futures) in metrics_futures.items():
             try:
-                values = prom_connect.custom_query_range(query=metric_query, step=step,
-                                                         start_time=start_date, end_time=end_date)
-            except prometheus_api_client.exceptions.PrometheusApiClientException as e:
-                logging.warning(f"Fetching {metric_query} raised an exception")
+                chunks_values = [future.result() for future in futures]
+            except Exception as e:
+                logging.warning(f"Fetching {metric_query} failed, the partial results are kept in {metric_partial_dir}")
                 logging.warning(f"Exception: {e}")
                 continue
 
-            metrics_values[metric_name] = metric_values = []
-            if not values: continue
-            # deduplicate the values
-            for current_values in values:
-                current_metric_values = {}
-                metric_values.append(current_metric_values)
-                current_metric_values["metric"] = current_values["metric"] # empty :/
-                current_metric_values["values"] = []
-                prev_val = None
-                prev_ts = None
-                has_skipped = False
-                for ts, val in current_values["values"]:
-                    prev_ts = ts
-                    if val == prev_val:
-                        has_skipped = True
-                        continue
-                    if has_skipped:
-                        current_metric_values["values"].append([prev_ts, prev_val])
-                        has_skipped = False
-                    current_metric_values["values"].append([ts, val])
-                    prev_val = val
-                if prev_val is not None and has_skipped:
-                    # add the last value if the list wasn't empty
-                    current_metric_values["values"].append([ts, val])
-
-        else:
-            metric_values = metrics_values[metric_name] = prom_connect.get_metric_range_data(
-                metric_query,
-                start_time=start_date, end_time=end_date
-            )
+            metric_values = merge_chunks(chunks_values)
+            if "(" in metric_query:
+                metric_values = deduplicate_values(metric_values)
 
-        if not metric_values:
-            logging.warning(f"{metric_name} has no data :/")
+            if not metric_values:
+                logging.warning(f"{metric_name} has no data :/")
 
+            tmp_file = metric_file.with_name(f".{metric_file.name}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(metric_values, f)
+            os.replace(tmp_file, metric_file)
 
-        with open(metric_file, "w") as f:
-            json.dump(metrics_values.get(metric_name, []), f)
+            shutil.rmtree(metric_partial_dir, ignore_errors=True)
 
+    if not any(path.is_dir() for path in partial_dir.iterdir()):
+        shutil.rmtree(partial_dir)
+    # otherwise, some metrics failed, keep their partial files for the next run
 
 
 def main(promquery_file,
@@ -173,6 +348,8 @@ def main(promquery_file,
          duration_s=0,
          start_ts=None,
          end_ts=None,
+         workers=DEFAULT_WORKERS,
+         chunk_duration_s=DEFAULT_CHUNK_DURATION_S,
          ):
     """
         Query Prometheus with a list of PromQueries read in a file
@@ -206,6 +383,9 @@ def main(promquery_file,
           start_ts: the start timestamp of the history to query. Incompatible with duration_s flag.
           end_ts: the end timestamp of the history to query. Incompatible with duration_s flag.
           namespace: the namespace where the metrics should searched for
+          workers: the number of queries sent concurrently to Prometheus
+          chunk_duration_s: the duration of the time chunks the range queries are split into.
+            Each chunk is saved in a partial file, so that an interrupted capture can be resumed.
         """
 
     token, proxy = get_k8s_token_proxy()
@@ -230,7 +410,8 @@ def main(promquery_file,
     dest.mkdir(parents=True, exist_ok=True)
 
     logging.info(f"Fetching the metrics")
-    fetch_and_save_prometheus_metrics(prom_connect, queries, dest, namespace, duration_s, start_ts, end_ts)
+    fetch_and_save_prometheus_metrics(prom_connect, queries, dest, namespace, duration_s, start_ts, end_ts,
+                                      workers=workers, chunk_duration_s=chunk_duration_s)
 
 
 if __name__ == "__main__":
@@ -16,31 +16,55 @@ import logging
 from projects.core.library import config
 TOPSAIL_DIR = pathlib.Path(config.__file__).parents[3]
 
+@functools.cache
+def get_toolbox_index():
+    """
+    Returns the {toolbox name --> module name} index of the project toolboxes.
+
+    The index is computed from the file names only, so that no toolbox
+    module is imported before it is actually used.
+    """
+    index = {}
+    for toolbox_file in sorted((TOPSAIL_DIR / "projects").glob("*/toolbox/*.py")):
+        if toolbox_file.name.startswith("."): continue
+
+        toolbox_name = toolbox_file.with_suffix("").name
+        if toolbox_name.startswith("_"): continue
+
+        index[toolbox_name] = str(toolbox_file.relative_to(TOPSAIL_DIR).with_suffix("")).replace(os.path.sep, ".")
+
+    return index
+
+
 class Toolbox:
     """
     The Topsail Toolbox
     """
 
-    def __init__(self):
-        for toolbox_file in (TOPSAIL_DIR / "projects").glob("*/toolbox/*.py"):
-            if toolbox_file.name.startswith("."): continue
-
-            project_toolbox_module = str(toolbox_file.relative_to(TOPSAIL_DIR).with_suffix("")).replace(os.path.sep, ".")
-            mod = importlib.import_module(project_toolbox_module)
-            toolbox_name = toolbox_file.with_suffix("").name
+    def __dir__(self):
+        return list(get_toolbox_index().keys())
 
-            if toolbox_name.startswith("_"): continue
+    def __getattr__(self, toolbox_name):
+        try:
+            project_toolbox_module = get_toolbox_index()[toolbox_name]
+        except KeyError:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{toolbox_name}'")
 
-            if hasattr(mod, "__entrypoint"):
-                self.__dict__[toolbox_name] = getattr(mod, "__entrypoint")
-                continue
+        mod = importlib.import_module(project_toolbox_module)
 
+        if hasattr(mod, "__entrypoint"):
+            toolbox = getattr(mod, "__entrypoint")
+        else:
             try:
-                self.__dict__[toolbox_name] = getattr(mod, toolbox_name.title())
+                toolbox = getattr(mod, toolbox_name.title())
             except AttributeError as e:
                 logging.fatal(str(e)) # eg: AttributeError: module 'projects.notebooks.toolbox.notebooks' has no attribute 'Notebooks'
                 sys.exit(1)
 
+        self.__dict__[toolbox_name] = toolbox
+
+        return toolbox
+
 
 def AnsibleRole(role_name):
     def decorator(fct):
@@ -4,8 +4,10 @@ import os, sys
 import pathlib
 import yaml
 import shutil
-import subprocess
 import threading
+import functools
+import re
+import tempfile
 
 import jsonpath_ng
 
@@ -17,6 +19,11 @@ TOPSAIL_DIR = pathlib.Path(common.__file__).parents[3]
 VARIABLE_OVERRIDES_FILENAME = "variable_overrides.yaml"
 PR_ARG_KEY = "PR_POSITIONAL_ARG_"
 
+# plain dotted keys (eg, 'tests.e2e.mode') are resolved with dict lookups,
+# without going through jsonpath_ng
+PLAIN_KEY_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_\-]*(\.[a-zA-Z_][a-zA-Z0-9_\-]*)*$")
+JSONPATH_RESERVED_WORDS = ("where", "wherenot")
+
 project = None # the project config will be populated in init()
 
 class TempValue(object):
@@ -38,6 +45,23 @@ class TempValue(object):
         return False # If we returned True here, any exception would be suppressed!
 
 
+class Batch(object):
+    def __init__(self, config):
+        self.config = config
+
+    def __enter__(self):
+        self.config._batch_depth += 1
+
+        return True
+
+    def __exit__(self, ex_type, ex_value, exc_traceback):
+        self.config._batch_depth -= 1
+        if self.config._batch_depth == 0:
+            self.config.flush()
+
+        return False # If we returned True here, any exception would be suppressed!
+
+
 class Config:
     def __init__(self, testing_dir, config_path):
         self.testing_dir = testing_dir
@@ -52,6 +76,31 @@ class Config:
         with open(self.config_path) as config_f:
             self.config = yaml.safe_load(config_f)
 
+        self._batch_depth = 0
+        self._dirty = False
+        # serializes the writes of self.config with its flushes, which
+        # may happen in the threads of run.Parallel (see run._flush_config)
+        self._lock = threading.RLock()
+
+    def batch(self):
+        """
+        Context manager holding the set_config writes in memory.
+        The configuration files are written once, when leaving the outermost batch.
+        """
+        return Batch(self)
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+
+            _dump_yaml_atomically(self.config, self.config_path, default_flow_style=False, sort_keys=False)
+
+            if (shared_dir := os.environ.get("SHARED_DIR")) and (shared_dir_path := pathlib.Path(shared_dir)) and shared_dir_path.exists():
+                _dump_yaml_atomically(self.config, shared_dir_path / "config.yaml")
+
+            self._dirty = False
+
 
     def apply_config_overrides(self, *, ignore_not_found=False, variable_overrides_path=None, log=True):
         if variable_overrides_path is None:
@@ -70,6 +119,10 @@ class Config:
             logging.fatal(msg)
             raise ValueError(msg)
 
+        with self.batch():
+            self._apply_config_overrides(variable_overrides, ignore_not_found, log)
+
+    def _apply_config_overrides(self, variable_overrides, ignore_not_found, log):
         for key, value in variable_overrides.items():
             MAGIC_DEFAULT_VALUE = object()
             current_value = self.get_config(key, MAGIC_DEFAULT_VALUE, print=False, warn=False)
@@ -99,6 +152,10 @@ class Config:
         if values is None:
             raise ValueError(f"Preset '{name}' does not exists")
 
+        with self.batch():
+            self._apply_preset(name, values)
+
+    def _apply_preset(self, name, values):
         presets = self.get_config("ci_presets.names", print=False) or []
         if not name in presets:
             self.set_config("ci_presets.names", presets + [name])
@@ -118,7 +175,7 @@ class Config:
 
     def get_config(self, jsonpath, default_value=..., warn=True, print=True):
         try:
-            value = jsonpath_ng.parse(jsonpath).find(self.config)[0].value
+            value = get_jsonpath(self.config, jsonpath)
         except IndexError as ex:
             if default_value != ...:
                 if warn:
@@ -144,36 +201,36 @@ class Config:
             else:
                 raise RuntimeError(msg)
 
-        try:
-            self.get_config(jsonpath, print=False) # will raise an exception if the jsonpath does not exist
-            jsonpath_ng.parse(jsonpath).update(self.config, value)
-        except Exception as ex:
-            logging.error(f"set_config: {jsonpath}={value} --> {ex}")
-            raise
+        with self._lock:
+            try:
+                self.get_config(jsonpath, print=False) # will raise an exception if the jsonpath does not exist
+                _update_jsonpath(self.config, jsonpath, value)
+            except Exception as ex:
+                logging.error(f"set_config: {jsonpath}={value} --> {ex}")
+                raise
+
+            self._dirty = True
 
         if print:
             logging.info(f"set_config: {jsonpath} --> {value}")
 
-        with open(self.config_path, "w") as f:
-            yaml.dump(self.config, f, indent=4, default_flow_style=False, sort_keys=False)
-
-        if (shared_dir := os.environ.get("SHARED_DIR")) and (shared_dir_path := pathlib.Path(shared_dir)) and shared_dir_path.exists():
-
-            with open(shared_dir_path / "config.yaml", "w") as f:
-                yaml.dump(self.config, f, indent=4)
+        if not self._batch_depth:
+            self.flush()
 
     def save_config_overrides(self):
         variable_overrides_path = env.ARTIFACT_DIR / VARIABLE_OVERRIDES_FILENAME
 
         if not variable_overrides_path.exists():
             logging.debug(f"save_config_overrides: {variable_overrides_path} does not exist, nothing to save.")
-            self.config["overrides"] = {}
+            with self._lock:
+                self.config["overrides"] = {}
             return
 
         with open(variable_overrides_path) as f:
             variable_overrides = yaml.safe_load(f)
 
-        self.config["overrides"] = variable_overrides
+        with self._lock:
+            self.config["overrides"] = variable_overrides
 
 
     def apply_preset_from_pr_args(self):
@@ -275,27 +332,87 @@ def _set_config_environ(testing_dir):
 
 
 def get_command_arg(group, command, arg, prefix=None, suffix=None, mute=False):
+    # imported here to avoid a circular import (from_config --> ansible_toolbox --> config)
+    from projects.core.toolbox import from_config
+
+    if project:
+        project.flush()
+
+    if not mute:
+        logging.info(f"get_command_arg: {group} {command} {arg}")
+
+    config_file = os.environ["TOPSAIL_FROM_CONFIG_FILE"]
+    command_args_file = os.environ["TOPSAIL_FROM_COMMAND_ARGS_FILE"]
+
+    command_key = from_config.get_command_key(group, command, prefix, suffix)
+    command_args = from_config.get_command_args(config_file, command_args_file)
+
     try:
-        if not mute:
-            logging.info(f"get_command_arg: {group} {command} {arg}")
-
-        proc = run.run_toolbox_from_config(group, command, show_args=arg,
-                                           prefix=prefix, suffix=suffix,
-                                           check=True,
-                                           run_kwargs=dict(capture_stdout=True, capture_stderr=True, log_command=(not mute)))
-    except subprocess.CalledProcessError as e:
-        logging.error(e.stderr.strip().decode("ascii", "ignore"))
+        value = command_args[command_key][arg]
+    except KeyError as e:
+        logging.error(f"get_command_arg: {command_key} {arg} --> key {e} not found in {command_args_file}")
         raise
 
-    return proc.stdout.strip()
+    return str(value).strip()
+
+
+def _dump_yaml_atomically(content, dest, **kwargs):
+    dest = pathlib.Path(dest)
+    with tempfile.NamedTemporaryFile("w", dir=dest.parent, prefix=f".{dest.name}.", delete=False) as f:
+        yaml.dump(content, f, indent=4, **kwargs)
+
+    os.chmod(f.name, 0o644) # NamedTemporaryFile creates the file with 0o600
+    os.replace(f.name, dest)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_jsonpath(jsonpath):
+    return jsonpath_ng.parse(jsonpath)
+
+
+@functools.lru_cache(maxsize=1024)
+def _split_plain_key(jsonpath):
+    if not PLAIN_KEY_RE.match(jsonpath):
+        return None
+
+    keys = tuple(jsonpath.split("."))
+    if any(key in JSONPATH_RESERVED_WORDS for key in keys):
+        return None
+
+    return keys
+
+
+def _update_jsonpath(config, jsonpath, value):
+    if (keys := _split_plain_key(jsonpath)) is None:
+        _parse_jsonpath(jsonpath).update(config, value)
+        return
+
+    parent = config
+    for key in keys[:-1]:
+        if not isinstance(parent, dict) or key not in parent:
+            return # same as jsonpath_ng: nothing to update
+        parent = parent[key]
+
+    if isinstance(parent, dict) and keys[-1] in parent:
+        parent[keys[-1]] = value
 
 
 def set_jsonpath(config, jsonpath, value):
     get_jsonpath(config, jsonpath) # will raise an exception if the jsonpath does not exist
-    jsonpath_ng.parse(jsonpath).update(config, value)
+    _update_jsonpath(config, jsonpath, value)
+
 
 def get_jsonpath(config, jsonpath):
-    return jsonpath_ng.parse(jsonpath).find(config)[0].value
+    if (keys := _split_plain_key(jsonpath)) is None:
+        return _parse_jsonpath(jsonpath).find(config)[0].value
+
+    value = config
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            raise IndexError("list index out of range") # same as jsonpath_ng find(...)[0]
+        value = value[key]
+
+    return value
 
 
 def test_skip_list():
@@ -358,30 +475,32 @@ def init(testing_dir, apply_preset_from_pr_args=False, apply_config_overrides=Tr
 
     repo_var_overrides = TOPSAIL_DIR / VARIABLE_OVERRIDES_FILENAME
 
-    if repo_var_overrides.exists():
-        logging.info(f"Found '{repo_var_overrides}', apply the variables overrides from it.")
-        project.apply_config_overrides(variable_overrides_path=repo_var_overrides)
+    # the configuration files are written only once, at the end of the batch
+    with project.batch():
+        if repo_var_overrides.exists():
+            logging.info(f"Found '{repo_var_overrides}', apply the variables overrides from it.")
+            project.apply_config_overrides(variable_overrides_path=repo_var_overrides)
 
-    ci_presets_to_apply = project.get_config("ci_presets.to_apply", [], warn=False)
-    if isinstance(ci_presets_to_apply, str):
-        ci_presets_to_apply = [ci_presets_to_apply]
+        ci_presets_to_apply = project.get_config("ci_presets.to_apply", [], warn=False)
+        if isinstance(ci_presets_to_apply, str):
+            ci_presets_to_apply = [ci_presets_to_apply]
 
-    for preset in ci_presets_to_apply:
-        project.apply_preset(preset)
+        for preset in ci_presets_to_apply:
+            project.apply_preset(preset)
 
-    variable_overrides_to_apply = project.get_config("ci_presets.variable_overrides", {}, warn=False)
-    for var_name, var_value in variable_overrides_to_apply.items():
-        project.set_config(var_name, var_value)
+        variable_overrides_to_apply = project.get_config("ci_presets.variable_overrides", {}, warn=False)
+        for var_name, var_value in variable_overrides_to_apply.items():
+            project.set_config(var_name, var_value)
 
-    if repo_var_overrides.exists():
-        # reapply to force overrides on top of presets
-        project.apply_config_overrides(variable_overrides_path=repo_var_overrides, log=False)
+        if repo_var_overrides.exists():
+            # reapply to force overrides on top of presets
+            project.apply_config_overrides(variable_overrides_path=repo_var_overrides, log=False)
 
-    project.apply_config_overrides()
+        project.apply_config_overrides()
 
-    if apply_preset_from_pr_args:
-        project.apply_preset_from_pr_args()
-        # reapply to force overrides on top of presets
-        project.apply_config_overrides(log=False)
+        if apply_preset_from_pr_args:
+            project.apply_preset_from_pr_args()
+            # reapply to force overrides on top of presets
+            project.apply_config_overrides(log=False)
 
     test_skip_list()
@@ -4,13 +4,19 @@ import logging
 logging.getLogger().setLevel(logging.INFO)
 import os, sys
 import json
+import time
 import subprocess
 import functools
 import pathlib
+import hashlib
+import shutil
+import tarfile
+import threading
+import concurrent.futures
 
 import fire
 
-from projects.core.library import config, run, env
+from projects.core.library import config, env
 
 
 def init():
@@ -32,6 +38,319 @@ def entrypoint():
         return wrapper
     return decorator
 
+# Incremental export of an artifacts directory to S3.
+#
+# The manifest of the exported files (size, mtime and sha256 of each
+# file) is saved in <artifacts_dir>/.export_manifest.json, and next to
+# the exported files. The files are uploaded by batches, with a few
+# `aws s3 cp --recursive` calls running in parallel, and the manifest
+# is updated after each successful batch. A new export only uploads the
+# files that changed since the last export, and resumes an interrupted
+# export.
+#
+# Optionally, the small files of a directory (eg, the Ansible logs) are
+# packed in a <dir>/_small_files.tar.gz bundle, with its
+# <dir>/_small_files.index.json index. The bundled files cannot be
+# browsed or downloaded individually.
+
+MANIFEST_FILENAME = ".export_manifest.json"
+LOG_FILENAME = ".export.log"
+MANIFEST_VERSION = 1
+STAGING_DIRNAME = ".export_staging"
+BUNDLE_FILENAME = "_small_files.tar.gz"
+BUNDLE_INDEX_FILENAME = "_small_files.index.json"
+
+DEFAULT_PARALLEL = 4
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BUNDLE_MAX_FILE_SIZE = 16 * 1024
+DEFAULT_BUNDLE_MIN_FILES = 20
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def _load_manifest(manifest_file, dest):
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.warning(f"Invalid export manifest {manifest_file}: {e}")
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("dest") != dest:
+        return None
+
+    return manifest
+
+
+def _save_manifest(manifest_file, manifest):
+    tmp_file = manifest_file.with_name(f".{manifest_file.name}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+
+def scan_directory(src, previous_files=None, excluded=()):
+    """
+    Returns the {relative path: {size, mtime_ns, hash}} manifest of the files of src.
+
+    The hash of the files with the same size and mtime as in previous_files isn't recomputed.
+    The export files (manifest, log) and the excluded relative paths are ignored.
+    """
+
+    previous_files = previous_files or {}
+    excluded = {MANIFEST_FILENAME, LOG_FILENAME, *excluded}
+
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(src, followlinks=True):
+        dirpath = pathlib.Path(dirpath)
+        if dirpath == src and STAGING_DIRNAME in dirnames:
+            dirnames.remove(STAGING_DIRNAME)
+
+        for filename in filenames:
+            path = dirpath / filename
+            relpath = str(path.relative_to(src))
+            if relpath in excluded:
+                continue
+
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                logging.warning(f"Cannot export {path}: broken link")
+                continue
+
+            entry = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+            previous = previous_files.get(relpath)
+            if previous and previous.get("size") == entry["size"] and previous.get("mtime_ns") == entry["mtime_ns"]:
+                entry["hash"] = previous["hash"]
+            else:
+                entry["hash"] = _hash_file(path)
+
+            files[relpath] = entry
+
+    return files
+
+
+def plan_bundles(files, max_file_size=DEFAULT_BUNDLE_MAX_FILE_SIZE, min_files=DEFAULT_BUNDLE_MIN_FILES):
+    """
+    Returns the {bundle relative path: index} of the directories with at least min_files small files.
+    """
+
+    small_files = {}
+    for relpath, entry in files.items():
+        if entry["size"] > max_file_size:
+            continue
+
+        parent = os.path.dirname(relpath)
+        small_files.setdefault(parent, []).append(relpath)
+
+    bundles = {}
+    for parent, relpaths in small_files.items():
+        if len(relpaths) < min_files:
+            continue
+
+        index = [dict(path=os.path.basename(relpath), size=files[relpath]["size"], hash=files[relpath]["hash"])
+                 for relpath in sorted(relpaths)]
+
+        bundles[os.path.join(parent, BUNDLE_FILENAME)] = index
+
+    return bundles
+
+
+def _stage_file(src_path, staged_path):
+    staged_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src_path, staged_path)
+    except OSError: # cross-device or not supported
+        shutil.copyfile(src_path, staged_path)
+
+
+def _stage_bundle(src, bundle_relpath, index, staging_dir):
+    parent = os.path.dirname(bundle_relpath)
+    bundle_path = staging_dir / bundle_relpath
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tarfile.open(bundle_path, "w:gz") as tar:
+        for member in index:
+            tar.add(src / parent / member["path"], arcname=member["path"])
+
+    with open(staging_dir / parent / BUNDLE_INDEX_FILENAME, "w") as f:
+        json.dump(dict(bundle=BUNDLE_FILENAME, files=index), f, indent=1)
+
+
+class _S3Uploader:
+    def __init__(self, dest, log_file, credentials_file=None, endpoint_url=None, acl=None):
+        self.dest = dest.rstrip("/")
+        self.log_file = log_file
+        self.log_lock = threading.Lock()
+
+        self.env = dict(os.environ)
+        if credentials_file:
+            self.env["AWS_SHARED_CREDENTIALS_FILE"] = str(credentials_file)
+
+        self.options = ["--only-show-errors"]
+        if endpoint_url:
+            self.options += ["--endpoint-url", endpoint_url]
+        self.acl = acl
+
+    def _run(self, args):
+        proc = subprocess.run(["aws", "s3", *args, *self.options],
+                              env=self.env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+        with self.log_lock, open(self.log_file, "a") as f:
+            print(f"# aws s3 {' '.join(args)} --> {proc.returncode}", file=f)
+            if proc.stdout:
+                print(proc.stdout.rstrip(), file=f)
+
+        return proc.returncode == 0
+
+    def upload_directory(self, src_dir, dest_path=""):
+        acl = ["--acl", self.acl] if self.acl else []
+
+        return self._run(["cp", "--recursive", str(src_dir), f"{self.dest}/{dest_path}".rstrip("/"), *acl])
+
+    def upload_file(self, src_file, dest_path):
+        acl = ["--acl", self.acl] if self.acl else []
+
+        return self._run(["cp", str(src_file), f"{self.dest}/{dest_path}", *acl])
+
+    def download_file(self, dest_path, dst_file):
+        return self._run(["cp", f"{self.dest}/{dest_path}", str(dst_file)])
+
+
+def upload_directory(src, dest,
+                     credentials_file=None,
+                     endpoint_url=None,
+                     acl=None,
+                     parallel=DEFAULT_PARALLEL,
+                     batch_size=DEFAULT_BATCH_SIZE,
+                     bundle_small_files=False,
+                     bundle_max_file_size=DEFAULT_BUNDLE_MAX_FILE_SIZE,
+                     bundle_min_files=DEFAULT_BUNDLE_MIN_FILES,
+                     log_file=None):
+    """
+    Uploads the files of a directory that changed since the last export
+
+    Args:
+      src: the directory to export
+      dest: the S3 destination of the export (s3://bucket/path)
+      credentials_file: the AWS credentials file to use
+      endpoint_url: the URL of the S3 endpoint, for S3-compatible storages
+      acl: the ACL of the uploaded files (eg, public-read)
+      parallel: the number of `aws s3 cp` calls running in parallel
+      batch_size: the number of files uploaded by each `aws s3 cp` call
+      bundle_small_files: if True, pack the small files of the directories into tar bundles
+      bundle_max_file_size: the maximum size of the bundled files
+      bundle_min_files: the minimum number of small files in a directory to bundle them
+      log_file: the file where the `aws` logs are saved. Default: <src>/.export.log
+    """
+
+    src = pathlib.Path(src)
+    dest = dest.rstrip("/")
+    manifest_file = src / MANIFEST_FILENAME
+    staging_dir = src / STAGING_DIRNAME
+    log_file = pathlib.Path(log_file) if log_file else src / LOG_FILENAME
+
+    uploader = _S3Uploader(dest, log_file, credentials_file, endpoint_url, acl)
+
+    manifest = _load_manifest(manifest_file, dest)
+    if manifest is None:
+        # try to resume from the manifest of the previous export
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir()
+        if uploader.download_file(MANIFEST_FILENAME, staging_dir / MANIFEST_FILENAME):
+            manifest = _load_manifest(staging_dir / MANIFEST_FILENAME, dest)
+
+        if manifest is None:
+            manifest = dict(version=MANIFEST_VERSION, dest=dest, files={}, uploaded={})
+        else:
+            logging.info(f"Resuming from the manifest of {dest}")
+
+    # the log file is written during the export, it cannot be part of it
+    excluded = []
+    if log_file.resolve().is_relative_to(src.resolve()):
+        excluded.append(str(log_file.resolve().relative_to(src.resolve())))
+
+    start = time.time()
+    files = scan_directory(src, manifest["files"], excluded)
+    bundles = plan_bundles(files, bundle_max_file_size, bundle_min_files) if bundle_small_files else {}
+
+    # {relative path: hash} of the files/bundles to upload
+    to_upload = {}
+    bundled = set()
+    for bundle_relpath, index in bundles.items():
+        parent = os.path.dirname(bundle_relpath)
+        bundled.update(os.path.join(parent, member["path"]) for member in index)
+
+        to_upload[bundle_relpath] = hashlib.sha256(json.dumps(index, sort_keys=True).encode()).hexdigest()
+
+    for relpath, entry in files.items():
+        if relpath not in bundled:
+            to_upload[relpath] = entry["hash"]
+
+    changed = sorted(relpath for relpath, hash in to_upload.items() if manifest["uploaded"].get(relpath) != hash)
+    logging.info(f"Export of {src}: {len(files)} files, {len(bundled)} in {len(bundles)} bundles, "
+                 f"{len(changed)}/{len(to_upload)} files to upload (scanned in {time.time() - start:.1f}s)")
+
+    manifest["files"] = files
+
+    batches = [changed[idx:idx + batch_size] for idx in range(0, len(changed), batch_size)]
+    manifest_lock = threading.Lock()
+
+    def upload_batch(batch_idx, batch):
+        batch_dir = staging_dir / f"batch_{batch_idx:04d}"
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+        for relpath in batch:
+            if relpath in bundles:
+                _stage_bundle(src, relpath, bundles[relpath], batch_dir)
+            else:
+                _stage_file(src / relpath, batch_dir / relpath)
+
+        success = uploader.upload_directory(batch_dir)
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+        if not success:
+            logging.warning(f"Batch #{batch_idx} ({len(batch)} files) failed to upload, see {log_file}")
+            return False
+
+        with manifest_lock:
+            for relpath in batch:
+                manifest["uploaded"][relpath] = to_upload[relpath]
+            _save_manifest(manifest_file, manifest)
+
+        return True
+
+    staging_dir.mkdir(exist_ok=True)
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+        results = list(executor.map(upload_batch, range(len(batches)), batches))
+    failed = results.count(False)
+
+    # the manifest of the export, for the next exports
+    _save_manifest(manifest_file, manifest)
+    if not uploader.upload_file(manifest_file, MANIFEST_FILENAME):
+        logging.warning(f"Could not upload the export manifest, see {log_file}")
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    logging.info(f"Uploaded {len(batches) - failed}/{len(batches)} batches in {time.time() - start:.1f}s.")
+
+    if failed:
+        raise RuntimeError(f"{failed}/{len(batches)} batches of {src} failed to upload to {dest}. "
+                           "Retry the export to resume it.")
+
 
 @entrypoint()
 def export_artifacts(artifacts_dirname, test_step=None):
@@ -81,7 +400,15 @@ def export_artifacts(artifacts_dirname, test_step=None):
 
     logging.info(f"Exporting to {export_dest} ({export_url})")
     aws_creds_filename = config.project.get_config("secrets.aws_credentials")
-    run.run(f"AWS_SHARED_CREDENTIALS_FILE=\"$PSAP_ODS_SECRET_PATH/{aws_creds_filename}\" aws s3 cp --recursive \"{artifacts_dirname}\" \"{export_dest}\" --acl public-read &> {env.ARTIFACT_DIR / 'aws_s3_cp.log'}")
+    upload_directory(
+        artifacts_dirname, export_dest,
+        credentials_file=pathlib.Path(os.environ["PSAP_ODS_SECRET_PATH"]) / aws_creds_filename,
+        endpoint_url=config.project.get_config("export_artifacts.endpoint_url", None, warn=False),
+        acl="public-read",
+        parallel=config.project.get_config("export_artifacts.parallel", DEFAULT_PARALLEL, warn=False),
+        bundle_small_files=config.project.get_config("export_artifacts.bundle_small_files", False, warn=False),
+        log_file=env.ARTIFACT_DIR / "aws_s3_cp.log",
+    )
 
 
 
@@ -92,12 +419,15 @@ class Export:
 
     def __init__(self):
         self.export_artifacts = export_artifacts
+        self.upload_directory = upload_directory
 
 
 def main():
     # Print help rather than opening a pager
     fire.core.Display = lambda lines, out: print(*lines, file=out)
 
+    env.init() # required by the threads of upload_directory
+
     fire.Fire(Export())
 
 
@@ -0,0 +1,64 @@
+import json
+import time
+import subprocess
+import concurrent.futures
+
+# Applies Kubernetes objects by batches: each `oc apply` call applies a
+# List of objects, and a few calls run in parallel, instead of one
+# `oc apply` call per object.
+
+
+def apply_batch(objects, namespace=None):
+    """
+    Applies a List of objects with a single server-side `oc apply` call
+
+    Returns the count, latency and returncode of the call (and the error, if it failed).
+    """
+
+    cmd = ["oc", "apply", "--server-side", "--force-conflicts", "-f-"]
+    if namespace:
+        cmd += ["-n", namespace]
+
+    start = time.time()
+    # server-side apply: no client-side diff, no last-applied-configuration annotation
+    proc = subprocess.run(cmd, input=json.dumps(dict(apiVersion="v1", kind="List", items=objects)),
+                          capture_output=True, text=True)
+    latency = time.time() - start
+
+    result = dict(
+        count=len(objects),
+        latency=round(latency, 3),
+        returncode=proc.returncode,
+    )
+
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip()
+
+    return result
+
+
+def apply_batches(batches, parallel):
+    """
+    Applies the (namespace, objects) batches, with `parallel` `oc apply` calls running in parallel
+
+    Returns the results of the batches (see apply_batch), in the order
+    of the batches, and the summary of their latencies.
+    """
+
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+        results = list(executor.map(lambda batch: apply_batch(batch[1], namespace=batch[0]), batches))
+    duration = time.time() - start
+
+    latencies = sorted(result["latency"] for result in results)
+    summary = dict(
+        batches=len(results),
+        parallel=parallel,
+        failed_batches=sum(1 for result in results if result["returncode"] != 0),
+        duration=round(duration, 3),
+        batch_latency_min=latencies[0] if latencies else None,
+        batch_latency_median=latencies[len(latencies)//2] if latencies else None,
+        batch_latency_max=latencies[-1] if latencies else None,
+    )
+
+    return results, summary
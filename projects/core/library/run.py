@@ -4,11 +4,12 @@ import logging
 logging.getLogger().setLevel(logging.INFO)
 import json
 import signal
+import threading
+import time
+import concurrent.futures
 
 import subprocess
 
-import joblib
-
 from . import env
 
 # create new process group, become its leader, except if we're already pid 1 (defacto group leader, setpgrp gets permission denied error)
@@ -98,10 +99,22 @@ def run_toolbox(group, command, artifact_dir_suffix=None, run_kwargs=None, mute_
     return run(f'{cmd_env} ./run_toolbox.py {group} {command} {_dict_to_run_toolbox_args(kwargs)}', **run_kwargs)
 
 
+def _flush_config():
+    # imported here to avoid a circular import (config --> run)
+    from . import config
+
+    # the subprocess may read the configuration file (TOPSAIL_FROM_CONFIG_FILE),
+    # make sure that it isn't holding pending set_config writes
+    if config.project:
+        config.project.flush()
+
+
 def run(command, capture_stdout=False, capture_stderr=False, check=True, protect_shell=True, cwd=None, stdin_file=None, log_command=True):
     if log_command:
         logging.info(f"run: {command}")
 
+    _flush_config()
+
     args = {}
 
     args["cwd"] = cwd
@@ -118,19 +131,172 @@ def run(command, capture_stdout=False, capture_stderr=False, check=True, protect
     if protect_shell:
         command = f"set -o errexit;set -o pipefail;set -o nounset;set -o errtrace;{command}"
 
-    proc = subprocess.run(command, **args)
+    task = getattr(_tls_task, "val", None)
+    if task and task.own_process_group:
+        # so that the task can be cancelled without killing its siblings
+        args["start_new_session"] = True
+
+    if task:
+        proc = task.run_process(command, **args)
+    else:
+        proc = subprocess.run(command, **args)
 
     if capture_stdout: proc.stdout = proc.stdout.decode("utf8")
     if capture_stderr: proc.stderr = proc.stderr.decode("utf8")
 
     return proc
 
+_tls_task = threading.local()
+
+class Task(object):
+    """
+    A function executed by an Executor.
+
+    The subprocesses launched with `run.run` from the task are tracked,
+    so that they can be killed when the task is cancelled.
+    """
+
+    def __init__(self, function, args, kwargs, timeout=None, own_process_group=False):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.own_process_group = own_process_group
+
+        self.artifact_dir = env.ARTIFACT_DIR # the artifact dir of the thread creating the task
+        self.start_time = None
+        self.cancelled = False
+        self.timed_out = False
+        self.processes = set()
+        self.lock = threading.Lock()
+        self.future = None
+
+    def __str__(self):
+        return getattr(self.function, "__qualname__", str(self.function))
+
+    def __call__(self):
+        self.start_time = time.monotonic()
+        env._set_tls_artifact_dir(self.artifact_dir)
+        _tls_task.val = self
+        try:
+            return self.function(*self.args, **self.kwargs)
+        finally:
+            _tls_task.val = None
+
+    def is_late(self):
+        if self.timeout is None or self.start_time is None or self.future.done():
+            return False
+
+        return time.monotonic() - self.start_time > self.timeout
+
+    def run_process(self, command, check=False, **kwargs):
+        with subprocess.Popen(command, **kwargs) as proc:
+            with self.lock:
+                self.processes.add(proc)
+                cancelled = self.cancelled
+            if cancelled:
+                self._kill_process(proc)
+
+            try:
+                stdout, stderr = proc.communicate()
+            finally:
+                with self.lock:
+                    self.processes.discard(proc)
+
+        if check and proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, command, output=stdout, stderr=stderr)
+
+        return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            processes = list(self.processes)
+
+        if self.future:
+            self.future.cancel() # only effective if the task didn't start yet
+
+        for proc in processes:
+            self._kill_process(proc)
+
+    def _kill_process(self, proc):
+        try:
+            if self.own_process_group:
+                os.killpg(proc.pid, signal.SIGKILL)
+            else:
+                proc.kill()
+        except ProcessLookupError:
+            pass # already terminated
+
+
+# default maximum number of functions running concurrently in a
+# Parallel block. The functions mostly wait for subprocesses, so like
+# the ThreadPoolExecutor default, it isn't limited to the CPU count.
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class Executor(object):
+    """
+    Reusable pool of worker threads.
+
+    The tasks are executed in the FIFO order of their submission,
+    with at most `max_workers` of them running concurrently.
+    An Executor can be shared by multiple (non-nested) Parallel blocks.
+    """
+
+    def __init__(self, name="executor", max_workers=None):
+        self.name = name
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_value, exc_traceback):
+        self.shutdown()
+
+        return False # If we returned True here, any exception would be suppressed!
+
+    def submit(self, task):
+        task.future = self.pool.submit(task)
+
+        return task.future
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+
+
 class Parallel(object):
-    def __init__(self, name, exit_on_exception=True, dedicated_dir=True):
+    """
+    Runs the delayed functions in parallel, when leaving the context.
+
+    Args:
+      name: name of the parallel block, used for the dedicated artifact directory.
+      exit_on_exception: if True, exit the process on the first failure. Otherwise, raise the exception.
+      dedicated_dir: if True, run the functions in a dedicated artifact directory.
+      max_workers: maximum number of functions running concurrently (DEFAULT_MAX_WORKERS by default).
+        Functions waiting for each other must all fit in max_workers.
+      timeout: maximum duration (in seconds) of each function. When a function is late, its subprocesses
+        are killed and TimeoutError is raised right away. A function late in its Python code cannot be
+        interrupted: its thread is abandoned, and keeps running in the background until it returns.
+      cancel_siblings: if True, on the first failure, only the sibling functions of this block are cancelled
+        (their subprocesses are killed). Otherwise, with exit_on_exception, the whole process group is killed.
+      executor: a persistent Executor to use instead of a dedicated one. Its own max_workers applies,
+        so max_workers cannot be passed with it.
+    """
+
+    def __init__(self, name, exit_on_exception=True, dedicated_dir=True,
+                 max_workers=None, timeout=None, cancel_siblings=False, executor=None):
+        if executor is not None and max_workers is not None:
+            raise ValueError(f"Parallel '{name}': max_workers cannot be used with a shared executor")
+
         self.name = name
         self.parallel_tasks = None
         self.exit_on_exception = exit_on_exception
         self.dedicated_dir = dedicated_dir
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cancel_siblings = cancel_siblings
+        self.executor = executor
 
     def __enter__(self):
         self.parallel_tasks = []
@@ -138,7 +304,7 @@ class Parallel(object):
         return self
 
     def delayed(self, function, *args, **kwargs):
-        self.parallel_tasks += [joblib.delayed(function)(*args, **kwargs)]
+        self.parallel_tasks += [(function, args, kwargs)]
 
     def __exit__(self, ex_type, ex_value, exc_traceback):
 
@@ -153,7 +319,7 @@ class Parallel(object):
 
         with context:
             try:
-                joblib.Parallel(n_jobs=-1, backend="threading")(self.parallel_tasks)
+                self._run_tasks()
             except Exception as e:
                 if not self.exit_on_exception:
                     raise e
@@ -161,13 +327,73 @@ class Parallel(object):
                 traceback.print_exc()
 
                 logging.error(f"Exception caught during the '{self.name}' Parallel execution. Exiting.")
-                # kill all processes in my group
-                # (the group was started with the os.setpgrp() above)
-                os.killpg(0, signal.SIGKILL)
+                if not self.cancel_siblings:
+                    # kill all processes in my group
+                    # (the group was started with the os.setpgrp() above)
+                    os.killpg(0, signal.SIGKILL)
                 sys.exit(1)
 
         return False # If we returned True here, any exception would be suppressed!
 
+    def _run_tasks(self):
+        own_process_group = self.cancel_siblings or self.timeout is not None
+        tasks = [Task(function, args, kwargs, timeout=self.timeout, own_process_group=own_process_group)
+                 for function, args, kwargs in self.parallel_tasks]
+
+        executor = self.executor or Executor(self.name, max_workers=(self.max_workers or min(len(tasks), DEFAULT_MAX_WORKERS) or 1))
+        try:
+            for task in tasks:
+                executor.submit(task)
+
+            self._wait_tasks(tasks)
+        except BaseException as e:
+            # first failure, timeout or signal received: the pending tasks are dropped.
+            # The running tasks are killed, except if the exception is simply raised to the caller.
+            kill_running = self.cancel_siblings or self.exit_on_exception or not isinstance(e, Exception)
+            for task in tasks:
+                if kill_running:
+                    task.cancel()
+                elif task.future:
+                    task.future.cancel()
+            raise
+        finally:
+            if not self.executor:
+                # don't wait for the tasks if the process group is about to be killed,
+                # nor for the abandoned late tasks
+                abandoned = any(task.timed_out for task in tasks)
+                executor.shutdown(wait=(self.cancel_siblings or not self.exit_on_exception) and not abandoned)
+
+    def _wait_tasks(self, tasks):
+        WAIT_INTERVAL = 1 # seconds, maximum delay between two checks of the task timeouts
+
+        futures = {task.future: task for task in tasks}
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=self._get_wait_timeout(tasks, WAIT_INTERVAL),
+                                                    return_when=concurrent.futures.FIRST_EXCEPTION)
+            for future in done:
+                if (exc := future.exception()) is not None:
+                    raise exc
+
+            for future in pending:
+                task = futures[future]
+                if task.is_late():
+                    logging.error(f"Task '{task}' of the '{self.name}' Parallel execution timed out after {task.timeout}s. Killing it.")
+                    task.timed_out = True
+                    task.cancel() # only the subprocesses can be killed, the thread is abandoned
+                    raise TimeoutError(f"Task '{task}' of the '{self.name}' Parallel execution timed out after {task.timeout}s")
+
+    def _get_wait_timeout(self, tasks, wait_interval):
+        if self.timeout is None:
+            return wait_interval
+
+        # wake up when the first running task becomes late
+        now = time.monotonic()
+        deadlines = [task.start_time + task.timeout - now for task in tasks
+                     if task.start_time is not None and not task.future.done()]
+
+        return max(0.01, min(deadlines + [wait_interval]))
+
 
 def run_and_catch(exc, fct, *args, **kwargs):
     """
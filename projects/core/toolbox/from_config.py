@@ -1,4 +1,6 @@
 import sys, os
+import pathlib
+import hashlib
 import yaml
 import io
 import logging
@@ -48,61 +50,13 @@ class From_Config:
             logging.error("--command_args_file flag or TOPSAIL_FROM_COMMAND_ARGS_FILE env var must have a value.")
             raise SystemExit(1)
 
-        from projects.core.library.ansible_toolbox import Toolbox
-        toolbox = Toolbox()
-
-        with open(config_file) as f:
-            config = yaml.safe_load(f)
-
-        with open(command_args_file) as f:
-            # parse the file as yaml and dump it a string,
-            # to resolve yaml aliases
-            command_args = f.read()
-
-        def log_warning(msg):
-            logging.warning(msg)
-
-        def raise_exception(msg):
-            raise Exception(msg)
-
-        @jinja2.filters.pass_environment
-        def or_env(environment, value, attribute=None):
-            if value:
-                return value
-
-            if not attribute:
-                logging.error("An attribute must be passed to env_override ...")
-                raise SystemExit(1)
-
-            return os.getenv(attribute)
-
-        jinja2.filters.FILTERS["or_env"] = or_env
-        jinja2.filters.FILTERS["raise_exception"] = raise_exception
-        jinja2.filters.FILTERS["log_warning"] = log_warning
-
-        command_args_tpl = jinja2.Template(command_args)
-        try:
-            command_args_rendered = command_args_tpl.render(config)
-        except jinja2.exceptions.UndefinedError as e:
-            template_frame = traceback.extract_tb(e.__traceback__)[-2]
-            if template_frame.filename != "<template>":
-                raise e
-            msg = f"Error at line {template_frame.lineno} of file {command_args_file}: {e.message}"
-            logging.error("Failed to render the Jinja template.")
-            logging.error(msg)
-            raise jinja2.exceptions.UndefinedError(msg)
-
         if group == "dump" and command == "config":
-            print(command_args_rendered)
+            print(render_command_args(config_file, command_args_file))
             raise SystemExit(0)
 
-        command_args = yaml.safe_load(command_args_rendered)
+        command_args = yaml.safe_load(render_command_args(config_file, command_args_file))
 
-        command_key = f"{group} {command}"
-        if prefix:
-            command_key = f"{prefix}/{command_key}"
-        if suffix:
-            command_key = f"{command_key}/{suffix}"
+        command_key = get_command_key(group, command, prefix, suffix)
 
         try:
             command_args = command_args[command_key].copy()
@@ -133,6 +87,9 @@ class From_Config:
             if key.startswith("_"):
                 del command_args[key]
 
+        from projects.core.library.ansible_toolbox import Toolbox
+        toolbox = Toolbox()
+
         group_obj = getattr(toolbox, group)
         command_obj = getattr(group_obj, command.replace("-", "_"))
 
@@ -148,4 +105,90 @@ class From_Config:
         return run_ansible_role
 
 
+def get_command_key(group, command, prefix="", suffix=""):
+    command_key = f"{group} {command}"
+    if prefix:
+        command_key = f"{prefix}/{command_key}"
+    if suffix:
+        command_key = f"{command_key}/{suffix}"
+
+    return command_key
+
+
+def render_command_args(config_file, command_args_file):
+    with open(config_file) as f:
+        config = yaml.safe_load(f)
+
+    with open(command_args_file) as f:
+        # parse the file as yaml and dump it a string,
+        # to resolve yaml aliases
+        command_args = f.read()
+
+    def log_warning(msg):
+        logging.warning(msg)
+
+    def raise_exception(msg):
+        raise Exception(msg)
+
+    @jinja2.filters.pass_environment
+    def or_env(environment, value, attribute=None):
+        if value:
+            return value
+
+        if not attribute:
+            logging.error("An attribute must be passed to env_override ...")
+            raise SystemExit(1)
+
+        return os.getenv(attribute)
+
+    jinja2.filters.FILTERS["or_env"] = or_env
+    jinja2.filters.FILTERS["raise_exception"] = raise_exception
+    jinja2.filters.FILTERS["log_warning"] = log_warning
+
+    command_args_tpl = jinja2.Template(command_args)
+    try:
+        return command_args_tpl.render(config)
+    except jinja2.exceptions.UndefinedError as e:
+        template_frame = traceback.extract_tb(e.__traceback__)[-2]
+        if template_frame.filename != "<template>":
+            raise e
+        msg = f"Error at line {template_frame.lineno} of file {command_args_file}: {e.message}"
+        logging.error("Failed to render the Jinja template.")
+        logging.error(msg)
+        raise jinja2.exceptions.UndefinedError(msg)
+
+
+# (config file content hash, command_args file, command_args file mtime) --> rendered command args
+_command_args_cache = {}
+
+def get_command_args(config_file, command_args_file):
+    """
+    Returns the command args dict rendered from `config_file` and `command_args_file`.
+
+    The rendering is cached in-process, keyed on the content of the
+    config file and the modification time of the template, so repeated
+    lookups do not re-render the Jinja template.
+    The environment variables read by the `or_env` filter are assumed
+    not to change during the lifetime of the process.
+    """
+
+    with open(config_file, "rb") as f:
+        config_hash = hashlib.sha256(f.read()).hexdigest()
+
+    command_args_path = pathlib.Path(command_args_file).absolute()
+    cache_key = (config_hash, str(command_args_path), command_args_path.stat().st_mtime_ns)
+
+    try:
+        return _command_args_cache[cache_key]
+    except KeyError:
+        pass
+
+    command_args = yaml.safe_load(render_command_args(config_file, command_args_file))
+
+    _command_args_cache.clear() # only keep the latest version of the config
+    _command_args_cache[cache_key] = command_args
+
+    return command_args
+
+
 __entrypoint = From_Config.run
@@ -2,6 +2,11 @@ from transformers import AutoTokenizer
 import logging
 import json
 import os
+import pathlib
+import hashlib
+import tempfile
+import itertools
+import multiprocessing
 
 logger = logging.getLogger("sft_trainer")
 
@@ -54,3 +59,130 @@ def get_tokens(tokenizer, line):
 
 def get_token_count(tokenizer, line):
     return len(get_tokens(tokenizer, line))
+
+
+# Token-count sidecar cache
+#
+# The token count of each line of a dataset is computed once per
+# (dataset content, tokenizer) and saved in
+# $TOKEN_COUNTS_CACHE_DIR/<dataset sha256>.<tokenizer key>.token_counts.json
+# (in the dataset directory by default). The replication, filtering and
+# study of the dataset all read the counts from there.
+
+TOKEN_COUNTS_BATCH_SIZE = 1000
+
+def get_file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def get_tokenizer_key(tokenizer):
+    tokenizer_id = json.dumps(dict(
+        name=tokenizer.name_or_path,
+        cls=type(tokenizer).__name__,
+        vocab_size=len(tokenizer),
+        special_tokens=tokenizer.special_tokens_map,
+    ), sort_keys=True, default=str)
+
+    return hashlib.sha256(tokenizer_id.encode()).hexdigest()[:16]
+
+
+def get_token_counts_cache_file(tokenizer, dataset_hash, dataset_path):
+    cache_dir = pathlib.Path(os.environ.get("TOKEN_COUNTS_CACHE_DIR") or pathlib.Path(dataset_path).parent)
+
+    return cache_dir / f"{dataset_hash[:16]}.{get_tokenizer_key(tokenizer)}.token_counts.json"
+
+
+def save_token_counts(tokenizer, dataset_path, token_counts, dataset_hash=None):
+    if dataset_hash is None:
+        dataset_hash = get_file_hash(dataset_path)
+
+    cache_file = get_token_counts_cache_file(tokenizer, dataset_hash, dataset_path)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=cache_file.parent, prefix=f".{cache_file.name}.", delete=False) as f:
+            json.dump(dict(dataset_sha256=dataset_hash, tokenizer=tokenizer.name_or_path, token_counts=token_counts), f)
+        os.replace(f.name, cache_file)
+    except OSError as e:
+        logging.warning(f"Couldn't save the token counts into {cache_file}: {e}")
+        return
+
+    logging.info(f"Token counts of {dataset_path} saved into {cache_file}")
+
+
+_pool_tokenizer = None
+
+def _count_tokens_batch(lines):
+    samples = [json.loads(line)["output"] for line in lines]
+    # same count as get_token_count, without padding the batch to its longest sample
+    encoded = _pool_tokenizer(samples, padding=False)
+
+    return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+
+def _iter_batches(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == TOKEN_COUNTS_BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def compute_token_counts(tokenizer, lines, workers=None):
+    global _pool_tokenizer
+    _pool_tokenizer = tokenizer
+
+    if workers is None:
+        workers = len(os.sched_getaffinity(0))
+
+    batches = _iter_batches(lines)
+    if workers <= 1:
+        return [count for batch_counts in map(_count_tokens_batch, batches) for count in batch_counts]
+
+    token_counts = []
+    # fork, so that the tokenizer doesn't have to be reloaded. The
+    # tokenizer hasn't been used in this process yet, so the
+    # children do not inherit its parallelism state.
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        # a few batches per worker at a time, so that the lines aren't all loaded in memory
+        while group := list(itertools.islice(batches, workers * 4)):
+            for batch_counts in pool.map(_count_tokens_batch, group):
+                token_counts += batch_counts
+
+    return token_counts
+
+
+def get_token_counts(tokenizer, dataset_path, workers=None):
+    """
+    Returns the token count of each line of the dataset, from the sidecar cache if available.
+    """
+
+    dataset_hash = get_file_hash(dataset_path)
+    cache_file = get_token_counts_cache_file(tokenizer, dataset_hash, dataset_path)
+
+    try:
+        with open(cache_file) as f:
+            token_counts = json.load(f)["token_counts"]
+        logging.info(f"Token counts of {dataset_path} loaded from {cache_file}")
+
+        return token_counts
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"Couldn't load the token counts from {cache_file}: {e}")
+
+    logging.info(f"Computing the token counts of {dataset_path} ...")
+    with open(dataset_path) as f:
+        token_counts = compute_token_counts(tokenizer, f, workers)
+
+    save_token_counts(tokenizer, dataset_path, token_counts, dataset_hash)
+
+    return token_counts
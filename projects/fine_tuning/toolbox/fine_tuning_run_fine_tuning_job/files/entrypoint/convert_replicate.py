@@ -1,8 +1,10 @@
 #! /usr/bin/env python
 
 import sys
+import os
 import pathlib
 import random
+import array
 
 import convert_dataset_helper
 
@@ -18,58 +20,108 @@ FACTOR = float(sys.argv[3])
 print(f"Replicating {src} with a factor of {FACTOR}...")
 print(f"Filtering out samples with more than {max_seq_length=} tokens")
 
-with open(src) as src_f:
-    orig_length = len(src_f.readlines())
-    print(f"Length of {src}: {orig_length} lines")
+token_counts = convert_dataset_helper.get_token_counts(tokenizer, src)
+
+# byte-offset index of the lines, without their surrounding whitespaces
+# (the lines are written stripped). Only the index is kept in memory,
+# the lines are copied from the source file.
+line_starts = array.array("q")
+line_ends = array.array("q")
+with open(src, "rb") as src_f:
+    offset = 0
+    for line in src_f:
+        content = line.strip()
+        start = offset + len(line) - len(line.lstrip())
+        line_starts.append(start)
+        line_ends.append(start + len(content))
+        offset += len(line)
+
+orig_length = len(line_starts)
+print(f"Length of {src}: {orig_length} lines")
+
+if len(token_counts) != orig_length:
+    raise ValueError(f"Got {len(token_counts)} token counts for the {orig_length} lines of {src} ...")
+
+
+def copy_range(src_fd, dst_f, start, end):
+    # the line ranges are contiguous in the source file, copy them in the kernel
+    dst_f.flush()
+    while start < end:
+        sent = os.sendfile(dst_f.fileno(), src_fd, start, end - start)
+        if sent == 0:
+            raise EOFError(f"Unexpected end of {src} at offset {start}")
+        start += sent
+
 
 dst.unlink(missing_ok=True)
 
 factor = FACTOR
 samples_too_long = 0
-while factor >= 1:
-    print(f"Saving 1x {src} ...")
-    with open(src) as src_f, open(dst, "a") as dst_f:
-        for line in src_f.readlines():
-            if convert_dataset_helper.get_token_count(tokenizer, line) > max_seq_length:
+dst_token_counts = array.array("l")
+with open(src, "rb") as src_f, open(dst, "wb") as dst_f:
+    src_fd = src_f.fileno()
+
+    while factor >= 1:
+        print(f"Saving 1x {src} ...")
+
+        # consecutive lines are merged into a single range,
+        # the newlines between them are part of the source range
+        run_start = run_end = None
+        for idx in range(orig_length):
+            if token_counts[idx] > max_seq_length:
                 if factor == FACTOR: # count them only once
                     samples_too_long += 1
                 continue
-            print(line.strip(), file=dst_f)
 
-    factor -= 1
+            dst_token_counts.append(token_counts[idx])
 
-    with open(dst) as dst_f:
-        new_length = len(dst_f.readlines())
-        print(f"Length of {dst}: {new_length} lines")
+            if run_end is not None and line_starts[idx] == run_end + 1:
+                run_end = line_ends[idx]
+                continue
 
-if 0 < factor < 1:
-    newline_count = int(orig_length * factor)
+            if run_start is not None:
+                copy_range(src_fd, dst_f, run_start, run_end)
+                dst_f.write(b"\n")
 
-    print(f"Saving {factor}x {src}: {newline_count}/{orig_length} lines ...")
+            run_start, run_end = line_starts[idx], line_ends[idx]
 
-    with open(src) as src_f:
-        data = src_f.readlines()
+        if run_start is not None:
+            copy_range(src_fd, dst_f, run_start, run_end)
+            dst_f.write(b"\n")
+
+        factor -= 1
+
+        print(f"Length of {dst}: {len(dst_token_counts)} lines")
+
+    if 0 < factor < 1:
+        newline_count = int(orig_length * factor)
+
+        print(f"Saving {factor}x {src}: {newline_count}/{orig_length} lines ...")
+
+        # use a fixed seed to get always the same results
+        # (shuffling the indexes gives the same order as shuffling the lines)
+        indexes = array.array("q", range(orig_length))
+        random.Random(4).shuffle(indexes)
+        indexes_it = iter(indexes)
 
-    # use a fixed seed to get always the same results
-    random.Random(4).shuffle(data)
-    data_it = iter(data)
-    with open(dst, "a") as dst_f:
         lines = 0
         while lines < newline_count:
-            line = next(data_it)
+            idx = next(indexes_it)
 
-            if convert_dataset_helper.get_token_count(tokenizer, line) > max_seq_length:
+            if token_counts[idx] > max_seq_length:
                 if factor == FACTOR: # count them only once
                     samples_too_long += 1
                 continue
 
-            print(line.strip(), file=dst_f)
+            dst_f.write(os.pread(src_fd, line_ends[idx] - line_starts[idx], line_starts[idx]))
+            dst_f.write(b"\n")
+            dst_token_counts.append(token_counts[idx])
             lines += 1
 
+new_length = len(dst_token_counts)
 
-with open(dst) as dst_f:
-    new_length = len(dst_f.readlines())
-
+# the token counts of the replicated dataset, for the next steps (eg, study_dataset)
+convert_dataset_helper.save_token_counts(tokenizer, dst, dst_token_counts.tolist())
 
 print(f"Length of {dst}: {new_length} lines")
 print(f"Removed {samples_too_long} samples longer than {max_seq_length=} tokens.")
@@ -13,12 +13,16 @@ pip freeze | grep transformers
 
 echo "Source dataset: $DATASET_SOURCE"
 
+# the token counts of the datasets are cached there, see convert_dataset_helper.get_token_counts
+export TOKEN_COUNTS_CACHE_DIR="${TOKEN_COUNTS_CACHE_DIR:-/mnt/storage/dataset/.token_counts}"
+
 prepare_dataset() {
     MAX_SEQ_LENGTH=$(cat $CONFIG_JSON_PATH | grep max_seq_length | awk '{print $2}' | cut -d"," -f1)
     DATASET_PREFER_CACHE_FILE="/mnt/storage/dataset/$(basename "${DATASET_TRANSFORM:-}")_replicate_${DATASET_REPLICATION}_max${MAX_SEQ_LENGTH}tokens_$(basename "${DATASET_SOURCE}")"
     if [[ -n "${DATASET_PREFER_CACHE:-}" && -f "${DATASET_PREFER_CACHE_FILE:-}" ]]; then
         echo "Found dataset cache file $DATASET_PREFER_CACHE. Not regenerating it."
-        cp "$DATASET_PREFER_CACHE_FILE" "$DATASET_DEST"
+        # the dataset is only read, no need to copy it
+        ln -sf "$DATASET_PREFER_CACHE_FILE" "$DATASET_DEST"
         return
     fi
 
@@ -32,8 +36,9 @@ prepare_dataset() {
 
     if [[ "${DATASET_REPLICATION:-1}" != 1 ]]; then
         echo "Dataset replication factor: $DATASET_REPLICATION"
-        python /mnt/entrypoint/convert_replicate.py "$DATASET_DEST" /tmp/temp_ds.json "$DATASET_REPLICATION"
-        mv /tmp/temp_ds.json "$DATASET_DEST"
+        # written next to the destination file, so that 'mv' is only a rename
+        python /mnt/entrypoint/convert_replicate.py "$DATASET_DEST" "${DATASET_DEST}.replicated" "$DATASET_REPLICATION"
+        mv "${DATASET_DEST}.replicated" "$DATASET_DEST"
     fi
 
     if [[ -n "${DATASET_PREFER_CACHE:-}" ]]; then
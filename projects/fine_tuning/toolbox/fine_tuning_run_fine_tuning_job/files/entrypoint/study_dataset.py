@@ -26,13 +26,9 @@ tokenizer_model_max_length = tokenizer.model_max_length
 
 logging.info("Parsing the dataset ...")
 token_counts = []
-with open(dataset, "r") as f:
-    for line in f.readlines():
-        data = json.loads(line)
-        decoded = tokenizer.encode(data["output"], padding=True)
-        sample_token_count = convert_dataset_helper.get_token_count(tokenizer, line)
-        actual_token_count = min(sample_token_count, max_seq_length, tokenizer_model_max_length)
-        token_counts.append(actual_token_count)
+for sample_token_count in convert_dataset_helper.get_token_counts(tokenizer, dataset):
+    actual_token_count = min(sample_token_count, max_seq_length, tokenizer_model_max_length)
+    token_counts.append(actual_token_count)
 
 if len(token_counts) < 2:
     logging.warning("Not enough samples found in the dataset ...")
@@ -129,6 +129,7 @@ def store_parse_directory(results_dir, expe, dirname):
         raise e
 
 
+@helpers_store.reuse_kept_matrix
 def parse_data(results_dir=None):
     store.register_custom_rewrite_settings(_rewrite_settings)
 
@@ -156,5 +157,8 @@ def parse_data(results_dir=None):
 
         results_directories.append(this_dir)
 
-        expe = "expe"
-        store_parse_directory(results_dir, expe, this_dir)
+    # MATBENCH_STORE_PARALLEL_PARSING enables the parsing of the directories in a process pool
+    with helpers_store.ParallelParsing(local_store, helpers_store.get_parallel_parsing_workers()):
+        for this_dir in results_directories:
+            expe = "expe"
+            store_parse_directory(results_dir, expe, this_dir)
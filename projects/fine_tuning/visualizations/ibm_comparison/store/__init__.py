@@ -62,6 +62,7 @@ def store_parse_directory(results_dir, expe, dirname):
         raise e
 
 
+@helpers_store.reuse_kept_matrix
 def parse_data(results_dir=None):
     store.register_custom_rewrite_settings(_rewrite_settings)
 
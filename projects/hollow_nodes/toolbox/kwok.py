@@ -38,6 +38,8 @@ class Kwok:
             memory=256,
             gpu=None,
             pods=250,
+            batch_size=100,
+            parallel_batches=8,
     ):
         """
         Deploy a set of KWOK nodes
@@ -52,6 +54,9 @@ class Kwok:
           memory: number of Gi of memory allocatable
           gpu: number of nvidia.com/gpu allocatable
           pods: number of Pods allocatable
+
+          batch_size: number of nodes created by each `oc apply` call
+          parallel_batches: number of `oc apply` calls running in parallel
         """
 
         return RunAnsibleRole(locals())
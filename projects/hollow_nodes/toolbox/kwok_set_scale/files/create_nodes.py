@@ -0,0 +1,98 @@
+#! /usr/bin/env python3
+
+import sys
+import copy
+import logging
+logging.getLogger().setLevel(logging.INFO)
+import pathlib
+
+import yaml
+import fire
+
+TOPSAIL_DIR = pathlib.Path(__file__).absolute().parents[5]
+sys.path.insert(0, str(TOPSAIL_DIR)) # launched as a script
+
+from projects.core.library import k8s_apply # noqa: E402
+
+# Creates the KWOK nodes from the node template, with a few `oc apply`
+# calls in parallel, each one applying a List of nodes (see
+# k8s_apply.apply_batches).
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_PARALLEL_BATCHES = 8
+
+
+def generate_nodes(template, name, scale):
+    for idx in range(scale):
+        node = copy.deepcopy(template)
+        node["metadata"]["name"] = f"{name}-{idx}"
+
+        yield node
+
+
+def get_batches(nodes, batch_size):
+    batch = []
+    for node in nodes:
+        batch.append(node)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def main(template_file, name, scale, artifacts_dir,
+         batch_size=DEFAULT_BATCH_SIZE,
+         parallel_batches=DEFAULT_PARALLEL_BATCHES):
+    """
+    Creates the KWOK nodes of a node group
+
+    Args:
+      template_file: the node template
+      name: the name of the node group. The node index is appended to it to name the nodes.
+      scale: the number of nodes to create
+      artifacts_dir: the directory where the batch results are saved
+      batch_size: the number of nodes applied by each `oc apply` call
+      parallel_batches: the number of `oc apply` calls running in parallel
+    """
+
+    with open(template_file) as f:
+        template = yaml.safe_load(f)
+
+    artifacts_dir = pathlib.Path(artifacts_dir)
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+
+    batches = list(get_batches(generate_nodes(template, name, scale), batch_size))
+    logging.info(f"Creating {scale} nodes in {len(batches)} batches of {batch_size} nodes, {parallel_batches} in parallel ...")
+
+    apply_results, apply_summary = k8s_apply.apply_batches([(None, batch) for batch in batches], parallel_batches)
+    results = [dict(batch=batch_idx, first=batch[0]["metadata"]["name"], last=batch[-1]["metadata"]["name"]) | result
+               for batch_idx, (batch, result) in enumerate(zip(batches, apply_results))]
+
+    failed = [result for result in results if result["returncode"] != 0]
+    for result in results:
+        logging.info(f"Batch #{result['batch']}: {result['count']} nodes ({result['first']} .. {result['last']}) "
+                     f"applied in {result['latency']:.2f}s"
+                     + (f" --> FAILED: {result['error']}" if result["returncode"] != 0 else ""))
+
+    summary = dict(
+        nodes=scale,
+        batch_size=batch_size,
+    ) | apply_summary
+
+    with open(artifacts_dir / "create_nodes.yaml", "w") as f:
+        yaml.dump(dict(summary=summary, batches=results), f, sort_keys=False)
+
+    logging.info(f"{len(batches)} batches of nodes applied in {summary['duration']:.2f}s.")
+
+    if failed:
+        logging.error(f"{len(failed)}/{len(batches)} batches failed to apply ...")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Print help rather than opening a pager
+    fire.core.Display = lambda lines, out: print(*lines, file=out)
+
+    fire.Fire(main)
@@ -0,0 +1,287 @@
+import logging
+import json
+import subprocess
+import threading
+import urllib.parse
+
+import fire
+
+# Watches the Pods and InferenceServices of a namespace, and reports
+# the first failure:
+# - a Pod being terminated, deleted or in the Failed phase,
+# - an InferenceService being deleted, or whose model failed to load.
+# This is broader than the `Terminating` Pods detected by the previous
+# polling loop.
+#
+# Each resource is listed once, then followed with a long-lived watch
+# stream (`oc get --raw <path>?watch=1&resourceVersion=...`). When the
+# stream ends (server timeout, connection lost), the watch is resumed
+# from the last resourceVersion received. When the resourceVersion is
+# too old (410 Gone), the resource is listed again.
+#
+# `oc` takes care of the authentication, so the watcher can be tested
+# against a fake API server with a KUBECONFIG pointing to it.
+
+WATCH_TIMEOUT = 300 # seconds, the API server closes the stream after this delay, and the watch is resumed
+RETRY_DELAY = 5 # seconds, before resuming a watch that failed
+
+RESOURCES = {
+    "pods": "/api/v1/namespaces/{namespace}/pods",
+    "inferenceservices": "/apis/serving.kserve.io/v1beta1/namespaces/{namespace}/inferenceservices",
+}
+
+# InferenceService model transition status showing that the model will not be loaded
+ISVC_FAILED_TRANSITIONS = ("BlockedByFailedLoad", "InvalidSpec")
+
+
+class FailureDetected(RuntimeError):
+    "A failing resource has been detected"
+    pass
+
+
+class ResourceGone(Exception):
+    "The resourceVersion of the watch is too old, the resource must be listed again"
+    pass
+
+
+def check_pod(pod):
+    """
+    Returns the reason why the Pod is failing, or None if it isn't
+    """
+
+    if pod["metadata"].get("deletionTimestamp"):
+        return "being terminated"
+
+    status = pod.get("status", {})
+    if status.get("phase") == "Failed":
+        return f"failed ({status.get('reason', 'no reason')}: {status.get('message', 'no message')})"
+
+    return None
+
+
+def check_inference_service(isvc):
+    """
+    Returns the reason why the InferenceService is failing, or None if it isn't
+    """
+
+    if isvc["metadata"].get("deletionTimestamp"):
+        return "being deleted"
+
+    model_status = isvc.get("status", {}).get("modelStatus", {})
+    transition = model_status.get("transitionStatus")
+    if transition in ISVC_FAILED_TRANSITIONS:
+        failure_info = model_status.get("lastFailureInfo", {})
+        return f"model failed to load ({transition}: {failure_info.get('message', 'no message')})"
+
+    return None
+
+
+CHECKS = {
+    "pods": check_pod,
+    "inferenceservices": check_inference_service,
+}
+
+
+class FailureWatcher(object):
+    """
+    Watches the resources of a namespace, until a failure is detected or `stop` is called.
+
+    Args:
+      namespace: the namespace to watch
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.stopped = threading.Event()
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    def stop(self):
+        """
+        Stops the watches. Can be called from any thread.
+        """
+
+        with self.lock:
+            self.stopped.set()
+            processes = list(self.processes)
+
+        for proc in processes:
+            proc.kill()
+
+    def _get(self, path):
+        with self.lock:
+            if self.stopped.is_set():
+                return None
+
+            proc = subprocess.Popen(["oc", "get", "--raw", path], stdout=subprocess.PIPE, text=True)
+            self.processes.add(proc)
+
+        return proc
+
+    def _release(self, proc):
+        proc.stdout.close()
+        proc.wait()
+
+        with self.lock:
+            self.processes.discard(proc)
+
+        return proc.returncode
+
+    def _list(self, path):
+        proc = self._get(path)
+        if proc is None:
+            return None
+
+        try:
+            content = proc.stdout.read()
+        finally:
+            returncode = self._release(proc)
+
+        if self.stopped.is_set():
+            return None
+
+        if returncode != 0:
+            raise RuntimeError(f"Failed to list {path} (exit code {returncode})")
+
+        return json.loads(content)
+
+    def _stream(self, path, resource_version):
+        query = urllib.parse.urlencode(dict(
+            watch="true",
+            resourceVersion=resource_version,
+            allowWatchBookmarks="true",
+            timeoutSeconds=WATCH_TIMEOUT,
+        ))
+
+        proc = self._get(f"{path}?{query}")
+        if proc is None:
+            return
+
+        completed = False
+        try:
+            for line in proc.stdout:
+                if not line.strip():
+                    continue
+
+                event = json.loads(line)
+                if event["type"] == "ERROR":
+                    status = event["object"]
+                    if status.get("code") == 410:
+                        raise ResourceGone(status.get("message"))
+
+                    raise RuntimeError(f"Watch error: {status.get('message')}")
+
+                yield event
+
+            completed = True
+        finally:
+            if not completed: # interrupted by an exception
+                proc.kill()
+            returncode = self._release(proc)
+
+        if returncode != 0 and not self.stopped.is_set():
+            raise RuntimeError(f"The watch of {path} failed (exit code {returncode})")
+
+    def _check(self, resource, obj, event_type):
+        name = obj["metadata"]["name"]
+        kind = obj.get("kind") or resource
+
+        if event_type == "DELETED":
+            reason = "deleted"
+        else:
+            reason = CHECKS[resource](obj)
+
+        if reason is None:
+            return
+
+        msg = f"{kind}/{name} {reason} in namespace {self.namespace}. Aborting the test."
+        logging.error(msg)
+
+        raise FailureDetected(msg)
+
+    def watch(self, resource):
+        """
+        Watches a resource, and raises FailureDetected on the first failure.
+
+        Returns when `stop` is called.
+        """
+
+        path = RESOURCES[resource].format(namespace=self.namespace)
+
+        logging.info(f"watch_failures: watching the {resource} of namespace {self.namespace}")
+
+        resource_version = None
+        while not self.stopped.is_set():
+            try:
+                if resource_version is None:
+                    resource_list = self._list(path)
+                    if resource_list is None:
+                        break
+
+                    for obj in resource_list["items"]:
+                        self._check(resource, obj, "ADDED")
+
+                    resource_version = resource_list["metadata"]["resourceVersion"]
+                    logging.info(f"watch_failures: no failure out of {len(resource_list['items'])} {resource}")
+
+                for event in self._stream(path, resource_version):
+                    resource_version = event["object"]["metadata"]["resourceVersion"]
+                    if event["type"] == "BOOKMARK":
+                        continue
+
+                    self._check(resource, event["object"], event["type"])
+
+            except FailureDetected:
+                raise
+
+            except ResourceGone as e:
+                logging.info(f"watch_failures: {resource} watch expired ({e}), listing them again")
+                resource_version = None
+
+            except (RuntimeError, json.JSONDecodeError) as e:
+                if self.stopped.is_set():
+                    break
+
+                logging.warning(f"watch_failures: {e}. Retrying in {RETRY_DELAY}s ...")
+                self.stopped.wait(RETRY_DELAY)
+
+        logging.info(f"watch_failures: stopped watching the {resource} of namespace {self.namespace}")
+
+
+def watch(namespace, resources=tuple(RESOURCES)):
+    """
+    Watches the resources of a namespace until the first failure.
+
+    Args:
+      namespace: the namespace to watch
+      resources: the resources to watch (pods, inferenceservices)
+    """
+
+    if isinstance(resources, str):
+        resources = resources.split(",")
+
+    watcher = FailureWatcher(namespace)
+
+    errors = []
+    def watch_resource(resource):
+        try:
+            watcher.watch(resource)
+        except Exception as e:
+            errors.append(e)
+            watcher.stop()
+
+    threads = [threading.Thread(target=watch_resource, args=(resource,)) for resource in resources]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.INFO)
+
+    # Print help rather than opening a pager
+    fire.core.Display = lambda lines, out: print(*lines, file=out)
+
+    fire.Fire(watch)
@@ -8,6 +8,7 @@ import uuid
 
 from projects.core.library import env, config, run
 import prepare_scale
+import failure_watcher
 
 def test(test_artifact_dir_p=None):
     dry_mode = config.project.get_config("tests.dry_mode")
@@ -187,8 +188,6 @@ def run_one():
         job_index = 0
 
     namespace = config.project.get_config("tests.scale.namespace.name")
-    sync_file = pathlib.Path("/tmp/test_done")
-    sync_file.unlink(missing_ok=True)
 
     try:
         prepare_scale.consolidate_model_config("tests.scale.model")
@@ -196,33 +195,21 @@ def run_one():
 
         prepare_user_sutest_namespace(namespace)
 
-        def watch_failures(namespaces):
-            logging.info(f"watch_internal: launching the watch loop")
-            WATCH_INTERNAL = 5 # seconds
-            while not sync_file.exists():
-                pod_status = run.run(f"oc get pods -n {namespace} --no-headers", capture_stdout=True, log_command=False).stdout
-                if "Terminating" in pod_status:
-                    msg = f"Pod being terminated detected in namespace {namespace}. Aborting the test."
-                    logging.error(msg)
-                    logging.info("Pod status:\n{pod_status}")
-                    raise RuntimeError(msg)
-
-                NL = "\n"
-                logging.info(f"watch_failures: no Pod being terminated out of {len(pod_status.split(NL)) - 1}")
-                time.sleep(WATCH_INTERNAL)
-            logging.info(f"watch_internal: {sync_file} has been created, exiting the watch loop")
-
-        def test_and_mark_as_done(*args, **kwargs):
+        watcher = failure_watcher.FailureWatcher(namespace)
+
+        def test_and_stop_watching(*args, **kwargs):
             try: run_one_test(*args, **kwargs)
-            finally: sync_file.touch()
+            finally: watcher.stop()
 
-        with run.Parallel("test_and_watch_failures", dedicated_dir=False) as parallel:
-            parallel.delayed(test_and_mark_as_done, namespace, job_index)
-            parallel.delayed(watch_failures, namespace)
+        # the watchers run until the test stops them, they must all run concurrently
+        with run.Parallel("test_and_watch_failures", dedicated_dir=False,
+                          max_workers=1 + len(failure_watcher.RESOURCES)) as parallel:
+            parallel.delayed(test_and_stop_watching, namespace, job_index)
+            for resource in failure_watcher.RESOURCES:
+                parallel.delayed(watcher.watch, resource)
 
     finally:
         run.run_toolbox("kserve", "capture_state", namespace=namespace, mute_stdout=True)
-        sync_file.unlink(missing_ok=True)
 
 
 def run_one_test(namespace, job_index):
@@ -13,6 +13,7 @@ import matrix_benchmarking.plotting.table_stats as table_stats
 import matrix_benchmarking.common as common
 
 import projects.matrix_benchmarking.visualizations.helpers.plotting.report as report
+import projects.matrix_benchmarking.visualizations.helpers.analyze.llm_load_test as analyze_llm_load_test
 
 
 def register():
@@ -33,25 +34,7 @@ def _get_test_setup(entry):
     return setup_info
 
 
-def simplify_error(error):
-    if not error:
-        return error
-
-    if "CUDA out of memory" in error:
-        return "CUDA out of memory"
-
-    if (partition := error.partition("read tcp"))[1]:
-        simplify = partition[0]
-        simplify += "read tcp: "
-        simplify += partition[2].partition(": ")[2]
-
-        if "use of closed network connection" in simplify:
-            # not an error
-            return None
-
-        return simplify
-
-    return error
+simplify_error = analyze_llm_load_test.simplify_error
 
 
 def _get_test_details(entry, args):
@@ -59,23 +42,10 @@ def _get_test_details(entry, args):
 
     header += [html.H2("Error distribution")]
 
-    llm_data = entry.results.llm_load_test_output
+    error_distribution = analyze_llm_load_test.get_error_distribution(entry)
 
-    errorDistribution = defaultdict(int)
-    success_count = 0
-    error_count = 0
-
-    if entry.results.llm_load_test_output:
-        for result in entry.results.llm_load_test_output["results"]:
-            simplified_error = simplify_error(result["error_text"])
-            if not simplified_error:
-                success_count += 1
-                continue
-
-            errorDistribution[simplified_error] += 1
-            error_count += 1
-
-    errorDistribution["success"] = success_count
+    errorDistribution = dict(error_distribution.errors)
+    errorDistribution["success"] = error_distribution.success_count
 
     header += report.Plot_and_Text(f"Latency details", report.set_config(dict(only_errors=True, entry=entry), args))
     header += [html.I("Click on the graph to see the error labels in the interactive view.")]
@@ -98,19 +68,12 @@ def _get_error_overview(entries, args):
 
     errorDistribution = defaultdict(int)
     for entry in entries:
-        llm_data = entry.results.llm_load_test_output
-        success_count = 0
-
-        if entry.results.llm_load_test_output:
-            for result in entry.results.llm_load_test_output["results"]:
-                simplified_error = simplify_error(result["error_text"])
-                if not simplified_error:
-                    success_count += 1
-                    continue
+        error_distribution = analyze_llm_load_test.get_error_distribution(entry)
 
-                errorDistribution[simplified_error] += 1
+        for simplified_error, count in error_distribution.errors.items():
+            errorDistribution[simplified_error] += count
 
-        errorDistribution[entry.get_name(variables)] = success_count
+        errorDistribution[entry.get_name(variables)] = error_distribution.success_count
 
     graph_text = report.Plot_and_Text(f"Errors distribution", args)
 
@@ -15,6 +15,7 @@ from dash import html
 import matrix_benchmarking.plotting.table_stats as table_stats
 import matrix_benchmarking.common as common
 import projects.matrix_benchmarking.visualizations.helpers.plotting.report as report
+import projects.matrix_benchmarking.visualizations.helpers.analyze.llm_load_test as analyze_llm_load_test
 
 from . import error_report
 
@@ -32,25 +33,17 @@ def generateErrorHistogramData(entries, variables):
     CLOSED_CX = "rpc error: code = Unavailable desc = error reading from server: read tcp: use of closed network connection"
 
     for entry in entries:
-        if not entry.results.llm_load_test_output: continue
+        if analyze_llm_load_test.get_results(entry) is None: continue
 
-        errorDistribution = defaultdict(int)
-        for result in entry.results.llm_load_test_output["results"]:
-            simplified_error = error_report.simplify_error(result["error_text"])
-            if not simplified_error:
-                continue
-
-            if simplified_error in (CLOSING_CX, CLOSED_CX, None):
+        test_name = entry.get_name(variables).replace(", ", "<br>")
+        for descr, count in analyze_llm_load_test.get_error_distribution(entry).errors.items():
+            if descr in (CLOSING_CX, CLOSED_CX):
                 continue # ignore these errors from the top chart, they're well known
 
-            errorDistribution[simplified_error] += 1
-
-
-        for descr, count in errorDistribution.items():
             datum = {}
             datum["error"] = descr
             datum["count"] = count
-            datum["test_name"] = entry.get_name(variables).replace(", ", "<br>")
+            datum["test_name"] = test_name
             data.append(datum)
 
     return data
@@ -133,68 +126,19 @@ class SuccessCountDistribution():
 
 # ---
 
-# See https://github.com/IBM/vllm/blob/21fb852e754158a37230cfa6e7faf77c0b814896/vllm/entrypoints/grpc/grpc_server.py#L415
-def convertvLLMFinishReason(reason):
-    if reason == "length":
-        return 1 #TODO could also be 6 / TOKEN_LIMIT
-    elif reason == "stop":
-        return 2 #TODO could also be 5 / STOP_SEQUENCE
-    elif reason == "abort":
-        return 3
-    else:
-        logging.warning("Unrecognized finish_reason: %s", reason)
-        return None
-
-
 def generateFinishReasonData(entries, variables):
-    # https://github.com/IBM/text-generation-inference/blob/88f2a0b858b9f080f42cde388c4ebec961b9fa7d/proto/generation.proto#L155-L172
-    STOP_REASONS = {
-        # Possibly more tokens to be streamed
-        0: "NOT_FINISHED",
-        # Maximum requested tokens reached
-        1: "MAX_TOKENS",
-        # End-of-sequence token encountered
-        2: "EOS_TOKEN",
-        # Request cancelled by client
-        3: "CANCELLED",
-        # Time limit reached
-        4: "TIME_LIMIT",
-        # Stop sequence encountered
-        5: "STOP_SEQUENCE",
-        # Total token limit reached
-        6: "TOKEN_LIMIT",
-        # Decoding error
-        7: "ERROR",
-        # Stop reason is not reported
-        None: "NOT_REPORTED"
-    }
-
     data = []
 
     for entry in entries:
-        if not entry.results.llm_load_test_output: continue
-
-        finishReasons = defaultdict(int)
-        for result in entry.results.llm_load_test_output["results"]:
-            reason = result.get("stop_reason")
-            if result["error_code"] is not None:
-                reason = error_report.simplify_error(result["error_text"])
-
-            #elif reason == 1: # MAX_TOKENS: good, ignore
-            #    continue
-            else:
-                if isinstance(reason, str): # vLLM
-                    reason = STOP_REASONS[convertvLLMFinishReason(reason)]
-                else:
-                    reason = STOP_REASONS[reason]
-
-            finishReasons[reason] += 1
+        finish_reasons = analyze_llm_load_test.get_finish_reasons(entry)
+        if finish_reasons is None: continue
 
-        for reason, count in finishReasons.items():
+        test_name = entry.get_name(variables).replace(", ", "<br>")
+        for reason, count in finish_reasons.items():
             datum = {}
             datum["reason"] = reason
             datum["count"] = count
-            datum["test_name"] = entry.get_name(variables).replace(", ", "<br>")
+            datum["test_name"] = test_name
             data.append(datum)
 
     return data
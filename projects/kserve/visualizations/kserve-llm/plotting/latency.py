@@ -5,8 +5,6 @@ import datetime
 import math
 import copy
 
-import statistics as stats
-
 import plotly.graph_objs as go
 import pandas as pd
 import plotly.express as px
@@ -15,6 +13,9 @@ from dash import html
 import matrix_benchmarking.plotting.table_stats as table_stats
 import matrix_benchmarking.common as common
 
+import projects.matrix_benchmarking.visualizations.helpers.store.llm_load_test as helpers_store_llm_load_test
+import projects.matrix_benchmarking.visualizations.helpers.analyze.llm_load_test as analyze_llm_load_test
+
 from . import error_report, report
 
 def register():
@@ -39,8 +40,8 @@ class LatencyDistribution():
         cfg__box_plot = cfg.get("box_plot", True)
         cfg__show_text = cfg.get("show_text", True)
 
-        df = pd.DataFrame(generateLatencyDetailsData(entries, variables, ordered_vars,
-                                                     only_tokens=cfg__only_tokens, collapse_index=cfg__collapse_index))
+        df = generateLatencyDetailsData(entries, variables, ordered_vars,
+                                        only_tokens=cfg__only_tokens, collapse_index=cfg__collapse_index)
 
         if df.empty:
             return None, "Not data available ..."
@@ -84,14 +85,10 @@ class LatencyDistribution():
                     plot.visible = "legendonly"
 
         msg = []
-        for test_fullname in df.sort_values(by=["test_fullname"]).test_fullname.unique() if cfg__show_text else []:
-            stats_data = df[df.test_fullname == test_fullname][y_key]
-
+        for test_fullname, stats_data in df.groupby("test_fullname", sort=True)[y_key] if cfg__show_text else []:
             msg += [html.H3(test_fullname)]
-            q0 = stats_data.min()
-            q100 = stats_data.max()
-            q1, med, q3 = stats.quantiles(stats_data)
-            q90 = stats.quantiles(stats_data, n=10)[8] # 90th percentile
+            stats = helpers_store_llm_load_test.get_stats(stats_data)
+            q0, q1, med, q3, q90, q100 = stats.min, stats.q1, stats.median, stats.q3, stats.q90, stats.max
             if cfg__only_tokens:
                 label = "the calls contained less than"
                 unit = "tokens"
@@ -131,22 +128,16 @@ def plotCustomComparison(df, x, y):
     fig = go.Figure()
     data_whatxy = defaultdict(dict)
 
-    for x_value in df[x].unique():
-        df_x_value = df[df[x] == x_value]
-        y_min = df_x_value[y].min()
-        y_max = df_x_value[y].max()
-        q1, median, q3 = stats.quantiles(df_x_value[y])
+    for x_value, y_values in df.groupby(x, sort=False)[y]:
+        stats = helpers_store_llm_load_test.get_stats(y_values)
 
-        q90 = stats.quantiles(df_x_value[y], n=10)[8] # 90th percentile
-        q99 = stats.quantiles(df_x_value[y], n=100)[98] # 99th percentile
-
-        data_whatxy["max"][x_value] = y_max
-        data_whatxy["99th percentile"][x_value] = q99
-        data_whatxy["90th percentile"][x_value] = q90
-        data_whatxy["Q3 (75%)"][x_value] = q3
-        data_whatxy["median (50%)"][x_value] = median
-        data_whatxy["Q1 (25%)"][x_value] = q1
-        data_whatxy["min"][x_value] = y_min
+        data_whatxy["max"][x_value] = stats.max
+        data_whatxy["99th percentile"][x_value] = stats.q99
+        data_whatxy["90th percentile"][x_value] = stats.q90
+        data_whatxy["Q3 (75%)"][x_value] = stats.q3
+        data_whatxy["median (50%)"][x_value] = stats.median
+        data_whatxy["Q1 (25%)"][x_value] = stats.q1
+        data_whatxy["min"][x_value] = stats.min
 
     all_x_values = set()
     all_y_values = []
@@ -171,8 +162,8 @@ def generateTestStartEnd(entries, model_name):
         if model_name and entry.settings.__dict__.get("model_name") != model_name:
             continue
 
-        if not entry.results.llm_load_test_output: continue
-        start = datetime.datetime.fromtimestamp(min(r["start_time"] for r in entry.results.llm_load_test_output["results"]))
+        if entry.results.llm_load_test_results is None: continue
+        start = datetime.datetime.fromtimestamp(entry.results.llm_load_test_results.start_time.min())
         duration = entry.results.llm_load_test_config.get("load_options.duration")
         end = start + datetime.timedelta(seconds=duration)
 
@@ -186,88 +177,18 @@ def generateTestStartEnd(entries, model_name):
     return data
 
 
-def generateLatencyDetailsData(entries, _variables, _ordered_vars,
-                               only_errors=False, test_name_by_error=False, latency_per_token=True, show_errors=False, only_tokens=False, collapse_index=False, model_name=None):
-    data = []
-
-    variables = list(_variables) # make a copy before modifying
-    if "mode" in _variables:
-        variables.remove("mode")
-        has_multiple_modes = True
-    else:
-        has_multiple_modes = False
-
-    if model_name and "model_name" in variables:
-        variables.remove("model_name")
-
-    ordered_vars = [v for v in _ordered_vars if v in variables]
-
-    for entry in entries:
-        if model_name and entry.settings.__dict__.get("model_name") != model_name:
-            continue
-
-        if not entry.results.llm_load_test_output: continue
-        for result in entry.results.llm_load_test_output["results"]:
-
-            if only_errors and not result["error_code"]:
-                continue # in this plot, ignore the latency if no error occured
-            if not show_errors and result["error_code"]:
-                continue
-
-            datum = {}
-
-            datum["timestamp"] = datetime.datetime.fromtimestamp(result["start_time"])
-
-            generatedTokens = result["output_tokens"] or 0
+def _get_model_name(entry):
+    return entry.settings.model_name
 
-            datum["tokens"] = generatedTokens
 
-            datum["latency"] = result["response_time"] if generatedTokens else 0
-
-
-            datum["latencyPerToken"] = datum["latency"] / generatedTokens \
-                if generatedTokens else 0
-
-            datum["model_name"] = (f"{entry.settings.model_name}<br>"+entry.get_name([v for v in variables if v not in ("index", "mode", "model_name")]).replace(", ", "<br>")).removesuffix("<br>")
-
-            if has_multiple_modes:
-                datum["model_name"] += f"<br>{entry.settings.mode.title()}"
-
-            if collapse_index:
-                datum["test_name"] = entry.get_name(v for v in variables if v != "index").replace(", ", "<br>")
-            elif test_name_by_error:
-                simplified_error = datum["test_name"] = error_report.simplify_error(result.get("error_text"))
-                if not simplified_error: continue
-
-            elif result["error_code"]:
-                datum["test_name"] = "errors"
-                datum["latency"] = -1
-            else:
-                datum["test_name"] = entry.get_name(variables).replace(", ", "<br>")
-
-            datum["error"] = result["error_text"] or "no error"
-
-            datum["test_fullname"] = entry.get_name([v for v in variables if v != "index"] if collapse_index else variables)
-            datum["start_time"] = datetime.datetime.fromtimestamp(result["start_time"])
-            datum["end_time"] = datetime.datetime.fromtimestamp(result["end_time"])
-
-            datum["duration"] = result["response_time"]
-            datum["user_id"] = str(result["user_id"])
-            datum["user_id_int"] = result["user_id"]
-
-            datum["tpot"] = result["tpot"]
-            datum["ttft"] = result["ttft"]
-            datum["itl"] = result["itl"]
-
-            datum["sort_index"] = entry.settings.__dict__[ordered_vars[0]] \
-                if ordered_vars else 0
-
-            if has_multiple_modes:
-                datum["test_fullname"] += f" {entry.settings.mode.title()}"
-
-            data.append(datum)
-
-    return data
+def generateLatencyDetailsData(entries, _variables, _ordered_vars,
+                               only_errors=False, test_name_by_error=False, latency_per_token=True, show_errors=False, only_tokens=False, collapse_index=False, model_name=None):
+    return analyze_llm_load_test.generate_latency_details_data(
+        entries, _variables, _ordered_vars,
+        model_name_key="model_name", get_model_name=_get_model_name,
+        only_errors=only_errors, test_name_by_error=test_name_by_error, show_errors=show_errors,
+        collapse_index=collapse_index, model_name=model_name,
+    )
 
 
 class LatencyDetails():
@@ -296,13 +217,13 @@ class LatencyDetails():
         entries = list([cfg__entry] if cfg__entry else \
                        common.Matrix.all_records(settings, setting_lists))
         latency_per_token = (not cfg__only_errors and not cfg__show_errors)
-        df = pd.DataFrame(generateLatencyDetailsData(entries, variables, ordered_vars,
-                                                     test_name_by_error=cfg__only_errors,
-                                                     show_errors=cfg__show_errors,
-                                                     only_errors=cfg__only_errors,
-                                                     only_tokens=cfg__only_tokens,
-                                                     latency_per_token=latency_per_token,
-                                                     model_name=cfg__model_name))
+        df = generateLatencyDetailsData(entries, variables, ordered_vars,
+                                        test_name_by_error=cfg__only_errors,
+                                        show_errors=cfg__show_errors,
+                                        only_errors=cfg__only_errors,
+                                        only_tokens=cfg__only_tokens,
+                                        latency_per_token=latency_per_token,
+                                        model_name=cfg__model_name)
 
         if df.empty:
             return None, "Not data available ..."
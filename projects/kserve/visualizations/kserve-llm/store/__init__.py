@@ -8,6 +8,7 @@ import matrix_benchmarking.store as store
 import matrix_benchmarking.store.simple as store_simple
 
 import projects.matrix_benchmarking.visualizations.helpers.store as helpers_store
+import projects.matrix_benchmarking.visualizations.helpers.store.llm_load_test as helpers_store_llm_load_test
 
 from . import parsers
 from . import lts_parser
@@ -26,6 +27,10 @@ class KserverLlmStore(helpers_store.BaseStore):
             results.llm_load_test_config.name,
             results.llm_load_test_config.yaml_file
         )
+        helpers_store_llm_load_test.upgrade_cached_results(results)
+
+    def is_cached_results_up_to_date(self, results):
+        return helpers_store_llm_load_test.is_cached_results_up_to_date(results)
 
 local_store = KserverLlmStore(
     cache_filename=CACHE_FILENAME, important_files=IMPORTANT_FILES,
@@ -41,6 +46,7 @@ local_store = KserverLlmStore(
 
 parsers.register_important_file = local_store.register_important_file
 build_lts_payloads = local_store.build_lts_payloads
+parse_data = local_store.parse_data
 is_mandatory_file = local_store.is_mandatory_file
 is_cache_file = local_store.is_cache_file
 is_important_file = local_store.is_important_file
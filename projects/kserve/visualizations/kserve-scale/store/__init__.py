@@ -42,3 +42,4 @@ store.register_custom_rewrite_settings(_rewrite_settings)
 store_simple.register_custom_parse_results(local_store.parse_directory)
 
 build_lts_payloads = local_store.build_lts_payloads
+parse_data = local_store.parse_data
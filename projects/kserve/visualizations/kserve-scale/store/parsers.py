@@ -10,6 +10,7 @@ import dateutil
 import matrix_benchmarking.cli_args as cli_args
 import matrix_benchmarking.store.prom_db as store_prom_db
 
+import projects.matrix_benchmarking.visualizations.helpers.store as helpers_store
 import projects.matrix_benchmarking.visualizations.helpers.store.parsers as helpers_store_parsers
 
 from . import prom as workload_prom
@@ -89,15 +90,11 @@ def _parse_start_end_time(dirname):
         job = yaml.safe_load(f)
 
     test_start_end_time.start = \
-        datetime.datetime.strptime(
-            job["status"]["startTime"],
-            K8S_TIME_FMT)
+        helpers_store_parsers.parse_k8s_time(job["status"]["startTime"])
 
     if job["status"].get("completionTime"):
         test_start_end_time.end = \
-            datetime.datetime.strptime(
-                job["status"]["completionTime"],
-                K8S_TIME_FMT)
+            helpers_store_parsers.parse_k8s_time(job["status"]["completionTime"])
     else:
         test_start_end_time.end = test_start_end_time.start + datetime.timedelta(hours=1)
 
@@ -138,6 +135,7 @@ def _parse_user_progress(dirname, ci_pod_dir):
     return progress
 
 
+@helpers_store.cache_parser
 def _parse_user_data(dirname, user_count):
     user_data = {}
     for user_id in range(user_count):
@@ -167,6 +165,7 @@ def _parse_file_locations(dirname):
     return file_locations
 
 
+@helpers_store.cache_parser
 @helpers_store_parsers.ignore_file_not_found
 def _parse_pod_times(dirname):
     filename = artifact_paths.KSERVE_CAPTURE_OPERATORS_STATE_DIR / "predictor_pods.json"
@@ -180,48 +179,15 @@ def _parse_pod_times(dirname):
 
     pod_times = []
     for pod in json_file["items"]:
-      pod_time = types.SimpleNamespace()
+      pod_time = helpers_store_parsers.parse_pod_time(pod)
       pod_times.append(pod_time)
 
       pod_time.namespace = pod["metadata"]["namespace"]
-      pod_time.pod_name = pod["metadata"]["name"]
-
-      pod_time.hostname = pod["spec"].get("nodeName")
-
-      pod_time.creation_time = datetime.datetime.strptime(
-              pod["metadata"]["creationTimestamp"], K8S_TIME_FMT)
 
       pod_time.user_idx = int(pod_time.namespace.split("-u")[-1])
       pod_time.model_id = int(pod["metadata"]["name"].split("-m")[1].split("-")[0])
       pod_time.pod_friendly_name = f"model_{pod_time.model_id}"
 
-      start_time_str = pod["status"].get("startTime")
-      pod_time.start_time = None if not start_time_str else \
-          datetime.datetime.strptime(start_time_str, K8S_TIME_FMT)
-
-      for condition in pod["status"].get("conditions", []):
-          last_transition = datetime.datetime.strptime(condition["lastTransitionTime"], K8S_TIME_FMT)
-
-          if condition["type"] == "ContainersReady":
-              pod_time.containers_ready = last_transition
-
-          elif condition["type"] == "Initialized":
-              pod_time.pod_initialized = last_transition
-          elif condition["type"] == "PodScheduled":
-              pod_time.pod_scheduled = last_transition
-
-      for containerStatus in pod["status"].get("containerStatuses", []):
-          try:
-              finishedAt =  datetime.datetime.strptime(
-                  containerStatus["state"]["terminated"]["finishedAt"],
-                  K8S_TIME_FMT)
-          except KeyError: continue
-
-          # take the last container_finished found
-          if ("container_finished" not in pod_time.__dict__
-              or pod_time.container_finished < finishedAt):
-              pod_time.container_finished = finishedAt
-
     return pod_times
 
 
@@ -243,8 +209,7 @@ def _parse_user_resource_times(dirname, ci_pod_dir):
         metadata = item["metadata"]
 
         kind = item["kind"]
-        creationTimestamp = datetime.datetime.strptime(
-            metadata["creationTimestamp"], K8S_TIME_FMT)
+        creationTimestamp = helpers_store_parsers.parse_k8s_time(metadata["creationTimestamp"])
 
         name = metadata["name"]
         namespace = metadata["namespace"]
@@ -291,7 +256,7 @@ def _parse_user_resource_times(dirname, ci_pod_dir):
             for condition in item["status"].get("conditions", []):
                 if not condition["status"]: continue
 
-                ts = datetime.datetime.strptime(condition["lastTransitionTime"], K8S_TIME_FMT)
+                ts = helpers_store_parsers.parse_k8s_time(condition["lastTransitionTime"])
                 obj_resource_times.conditions[condition["type"]] = ts
 
     return dict(resource_times)
@@ -14,6 +14,7 @@ import matrix_benchmarking.plotting.table_stats as table_stats
 import matrix_benchmarking.common as common
 
 import projects.matrix_benchmarking.visualizations.helpers.plotting.report as report
+import projects.matrix_benchmarking.visualizations.helpers.analyze.llm_load_test as analyze_llm_load_test
 
 
 def register():
@@ -55,25 +56,7 @@ def _get_test_setup(entry):
     return setup_info
 
 
-def simplify_error(error):
-    if not error:
-        return error
-
-    if "CUDA out of memory" in error:
-        return "CUDA out of memory"
-
-    if (partition := error.partition("read tcp"))[1]:
-        simplify = partition[0]
-        simplify += "read tcp: "
-        simplify += partition[2].partition(": ")[2]
-
-        if "use of closed network connection" in simplify:
-            # not an error
-            return None
-
-        return simplify
-
-    return error
+simplify_error = analyze_llm_load_test.simplify_error
 
 
 class ErrorReport():
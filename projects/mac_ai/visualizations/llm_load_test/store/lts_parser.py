@@ -4,6 +4,8 @@ import pytz
 import pathlib
 import yaml
 
+import projects.matrix_benchmarking.visualizations.helpers.store.llm_load_test as helpers_store_llm_load_test
+
 from .. import models
 from ..models import lts as models_lts
 
@@ -25,27 +27,15 @@ def _generate_throughput(results):
 
 
 def _generate_time_per_output_token(results):
-    if not results.llm_load_test_output: return None
-
-    tpot = dict(results.llm_load_test_output["summary"]["tpot"])
-    tpot["values"] = [x["tpot"] for x in results.llm_load_test_output["results"] if x["tpot"]]
-    return types.SimpleNamespace(**tpot)
+    return helpers_store_llm_load_test.get_summary_metric(results, "tpot")
 
 
 def _generate_inter_token_latency(results):
-    if not results.llm_load_test_output: return None
-
-    itl = dict(results.llm_load_test_output["summary"]["itl"])
-    itl["values"] = [x["itl"] for x in results.llm_load_test_output["results"] if x["itl"]]
-    return types.SimpleNamespace(**itl)
+    return helpers_store_llm_load_test.get_summary_metric(results, "itl")
 
 
 def _generate_time_to_first_token(results):
-    if not results.llm_load_test_output: return None
-
-    ttft = dict(results.llm_load_test_output["summary"]["ttft"])
-    ttft["values"] = [x["ttft"] for x in results.llm_load_test_output["results"] if x["ttft"]]
-    return types.SimpleNamespace(**ttft)
+    return helpers_store_llm_load_test.get_summary_metric(results, "ttft")
 
 
 def _generate_failures(results):
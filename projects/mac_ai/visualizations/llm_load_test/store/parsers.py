@@ -14,6 +14,7 @@ import matrix_benchmarking.cli_args as cli_args
 
 import projects.matrix_benchmarking.visualizations.helpers.store as helpers_store
 import projects.matrix_benchmarking.visualizations.helpers.store.parsers as helpers_store_parsers
+import projects.matrix_benchmarking.visualizations.helpers.store.llm_load_test as helpers_store_llm_load_test
 
 from . import lts_parser
 
@@ -49,9 +50,10 @@ def parse_once(results, dirname):
 
     results.llm_load_test_config = _parse_llm_load_test_config(dirname)
     results.llm_load_test_output = _parse_llm_load_test_output(dirname)
+    results.llm_load_test_results = helpers_store_llm_load_test.parse_results(results.llm_load_test_output)
     results.gpu_power_usage = _parse_gpu_power_metrics(dirname)
 
-    results.test_start_end = _parse_test_start_end(dirname, results.llm_load_test_output)
+    results.test_start_end = helpers_store_llm_load_test.parse_test_start_end(results.llm_load_test_results)
 
 
 @helpers_store_parsers.ignore_file_not_found
@@ -135,29 +137,3 @@ def _parse_llm_load_test_config(dirname):
     llm_load_test_config.get = helpers_store.get_yaml_get_key(llm_load_test_config.name, yaml_file)
 
     return llm_load_test_config
-
-
-def _parse_test_start_end(dirname, llm_load_test_output):
-    if not llm_load_test_output:
-        return None
-
-    test_start_end = types.SimpleNamespace()
-    test_start_end.start = None
-    test_start_end.end = None
-
-    for result in llm_load_test_output.get("results") or []:
-        start = datetime.datetime.fromtimestamp(result["start_time"])
-        end = datetime.datetime.fromtimestamp(result["end_time"])
-
-        if test_start_end.start is None or start < test_start_end.start:
-            test_start_end.start = start
-
-        if test_start_end.end is None or end > test_start_end.end:
-            test_start_end.end = end
-
-    if test_start_end.start is None:
-        logging.warning("Could not find the start time of the test...")
-    if test_start_end.end is None:
-        logging.warning("Could not find the end time of the test...")
-
-    return test_start_end
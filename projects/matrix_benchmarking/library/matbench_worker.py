@@ -0,0 +1,156 @@
+#! /usr/bin/env python
+
+# Runs matbench commands in a single, long-running process.
+#
+# Launched by visualize.MatbenchWorker. The commands are received on
+# stdin, one JSON object per line:
+#
+#   {"command": "parse", "args": {...}, "env": {...}, "cwd": "...", "log_file": "..."}
+#   {"command": "forget_matrix"}
+#   {"command": "run_parallel", "requests": [{"command": "visualize", ...}, ...], "parallel": 4}
+#
+# and their exit code is sent back on stdout: {"returncode": 0}
+# ({"returncodes": [0, ...]} for run_parallel).
+# The output of each command is saved in its log file.
+#
+# The matbench modules, the workload and its plotting modules are
+# imported only once, and the result matrix parsed by the first command
+# is kept in memory for the next ones (MATBENCH_STORE_KEEP_MATRIX, see
+# visualizations/helpers/store/__init__.py). With run_parallel, the
+# commands run in forked processes, which inherit the imported modules
+# and the parsed matrix (parsed by the first command if it isn't kept
+# yet). If the matrix cannot be kept (the workload store doesn't go
+# through helpers_store.reuse_kept_matrix), the commands run
+# sequentially, so that the results are not parsed by all the forked
+# commands at the same time.
+
+import sys
+import os
+import json
+import pathlib
+import logging
+import traceback
+
+TOPSAIL_DIR = pathlib.Path(__file__).absolute().parents[3]
+MATBENCH_DIR = TOPSAIL_DIR / "projects" / "matrix_benchmarking" / "subproject"
+
+
+def _redirect_output(log_file):
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    saved_fds = os.dup(1), os.dup(2)
+
+    fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+
+    return saved_fds
+
+
+def _restore_output(saved_fds):
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    for target_fd, saved_fd in zip((1, 2), saved_fds):
+        os.dup2(saved_fd, target_fd)
+        os.close(saved_fd)
+
+
+def run_command(matbench_main, request):
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    saved_fds = _redirect_output(request["log_file"])
+
+    try:
+        os.environ.update(request.get("env") or {})
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+
+        sys.argv = ["matbench", request["command"]] + [f"--{k}={v}" for k, v in request["args"].items()]
+
+        try:
+            ret = matbench_main.main()
+            returncode = ret if isinstance(ret, int) else 0
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+    finally:
+        _restore_output(saved_fds)
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+    return returncode
+
+
+def run_parallel(matbench_main, helpers_store, requests, parallel):
+    returncodes = [None] * len(requests)
+    running = {} # pid --> request index
+    pending = list(enumerate(requests))
+
+    if pending and not helpers_store.is_matrix_kept(requests[0]["args"]):
+        # run the first command in the worker, so that the matrix is
+        # parsed only once, and inherited by the forked commands
+        idx, request = pending.pop(0)
+        returncodes[idx] = run_command(matbench_main, request)
+
+        if pending and not helpers_store.is_matrix_kept(requests[0]["args"]):
+            logging.warning("The matrix has not been kept in memory, running the commands sequentially.")
+            for idx, request in pending:
+                returncodes[idx] = run_command(matbench_main, request)
+
+            return returncodes
+
+    while pending or running:
+        while pending and len(running) < parallel:
+            idx, request = pending.pop(0)
+
+            pid = os.fork()
+            if pid == 0: # child
+                returncode = 1
+                try:
+                    returncode = run_command(matbench_main, request)
+                finally:
+                    os._exit(returncode)
+
+            running[pid] = idx
+
+        pid, status = os.wait()
+        returncodes[running.pop(pid)] = os.waitstatus_to_exitcode(status)
+
+    return returncodes
+
+
+def main():
+    # the commands output goes to their log files, stdout is only used for the replies
+    replies = os.fdopen(os.dup(1), "w", buffering=1)
+
+    logging.getLogger().setLevel(logging.INFO)
+
+    sys.path.insert(0, str(MATBENCH_DIR))
+    sys.path.insert(0, str(TOPSAIL_DIR))
+    os.environ["MATBENCH_STORE_KEEP_MATRIX"] = "yes"
+
+    import matrix_benchmarking.__main__ as matbench_main
+    import projects.matrix_benchmarking.visualizations.helpers.store as helpers_store
+
+    for line in sys.stdin:
+        request = json.loads(line)
+
+        if request["command"] == "forget_matrix":
+            helpers_store.forget_kept_matrix()
+            reply = dict(returncode=0)
+        elif request["command"] == "run_parallel":
+            reply = dict(returncodes=run_parallel(matbench_main, helpers_store, request["requests"], request["parallel"]))
+        else:
+            reply = dict(returncode=run_command(matbench_main, request))
+
+        print(json.dumps(reply), file=replies)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ import subprocess
 import os
 import yaml, json
 import logging
+import threading
 logging.getLogger().setLevel(logging.INFO)
 
 import fire
@@ -95,7 +96,100 @@ def generate_visualizations(results_dirname, generate_lts=None):
         raise RuntimeError("Som of visualization failed")
 
 
-def call_parse(step_idx, common_args, common_env):
+class MatbenchWorker:
+    """
+    Runs the matbench commands in a single matbench_worker.py process,
+    which keeps the parsed result matrix in memory between the commands.
+    """
+
+    def __init__(self, common_env):
+        self.env = os.environ | common_env
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        logging.info("Starting the in-process matbench worker ...")
+        self.proc = subprocess.Popen(
+            [sys.executable, str(TOPSAIL_DIR / "projects" / "matrix_benchmarking" / "library" / "matbench_worker.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            env=self.env, cwd=TOPSAIL_DIR,
+        )
+
+    def _request(self, request):
+        with self.lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+
+            try:
+                print(json.dumps(request, default=str), file=self.proc.stdin, flush=True)
+                reply = self.proc.stdout.readline()
+            except BrokenPipeError:
+                reply = ""
+
+            if not reply:
+                logging.error(f"The matbench worker died (exit code: {self.proc.wait()}) ...")
+                self.proc = None
+                return None
+
+            return json.loads(reply)
+
+    def run(self, command, args, log_file, env=None, cwd=None):
+        logging.info(f"matbench worker: {command} > {log_file}")
+
+        reply = self._request(dict(command=command, args=args, env=env or {}, cwd=cwd, log_file=log_file))
+
+        return reply["returncode"] if reply else 1
+
+    def run_parallel(self, commands, parallel):
+        """
+        Runs the (command, args, log_file, env, cwd) commands in forked worker processes, `parallel` at a time.
+        Returns their exit codes.
+        """
+
+        requests = []
+        for command, args, log_file, env, cwd in commands:
+            logging.info(f"matbench worker: {command} > {log_file}")
+            requests.append(dict(command=command, args=args, env=env or {}, cwd=cwd, log_file=log_file))
+
+        reply = self._request(dict(command="run_parallel", requests=requests, parallel=parallel))
+
+        return reply["returncodes"] if reply else [1] * len(requests)
+
+    def forget_matrix(self):
+        # the results have been modified, they must be parsed again
+        if self.proc is not None:
+            self._request(dict(command="forget_matrix"))
+
+    def close(self):
+        if self.proc is None:
+            return
+
+        self.proc.stdin.close()
+        self.proc.wait()
+        self.proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_value, exc_traceback):
+        self.close()
+
+        return False # If we returned True here, any exception would be suppressed!
+
+
+def run_matbench(command, args, log_file, env=None, cwd=None, worker=None):
+    if worker:
+        return worker.run(command, args, log_file, env=env, cwd=cwd)
+
+    args_str = " ".join(f"'--{k}={v}'" for k, v in args.items())
+    env_str = ("env " + " ".join(f"'{k}={v}'" for k, v in env.items()) + " ") if env else ""
+
+    cmd = f"{env_str}matbench {command} {args_str} |& tee > {log_file}"
+
+    return run.run(cmd, check=False, cwd=cwd).returncode
+
+
+def call_parse(step_idx, common_args, common_env, worker=None):
     parse_env = common_env.copy()
     parse_args = common_args.copy()
 
@@ -106,16 +200,11 @@ def call_parse(step_idx, common_args, common_env):
 
     parse_args["output-matrix"] = env.ARTIFACT_DIR / "internal_matrix.json"
 
-    parse_args_str = " ".join(f"'--{k}={v}'" for k, v in parse_args.items())
-    parse_env_str = "env " + " ".join(f"'{k}={v}'" for k, v in parse_env.items())
-
     log_file = env.ARTIFACT_DIR / f"{step_idx}_matbench_parse.log"
 
-    cmd = f"{parse_env_str} matbench parse {parse_args_str} |& tee > {log_file}"
-
     non_fatal_errors = []
     fatal_errors = []
-    if run.run(cmd, check=False).returncode != 0:
+    if run_matbench("parse", parse_args, log_file, env=parse_env, worker=worker) != 0:
         logging.warning("An error happened while parsing the results  ...")
         fatal_errors.append(log_file.name)
 
@@ -126,17 +215,14 @@ def call_parse(step_idx, common_args, common_env):
     return fatal_errors, non_fatal_errors
 
 
-def call_generate_lts(step_idx, common_args, common_env_str):
+def call_generate_lts(step_idx, common_args, common_env, worker=None):
     lts_args = common_args.copy()
     lts_args["output-lts"] = env.ARTIFACT_DIR / "lts_payload.json"
-    lts_args_str = " ".join(f"'--{k}={v}'" for k, v in lts_args.items())
 
     log_file = env.ARTIFACT_DIR / f"{step_idx}_matbench_generate_lts.log"
 
-    cmd = f"{common_env_str} matbench parse {lts_args_str} |& tee > {log_file}"
-
     errors = []
-    if run.run(cmd, check=False).returncode != 0:
+    if run_matbench("parse", lts_args, log_file, env=common_env, worker=worker) != 0:
         logging.warning("An error happened while generating the LTS payload ...")
         errors.append(log_file.name)
 
@@ -146,19 +232,16 @@ def call_generate_lts(step_idx, common_args, common_env_str):
     return errors
 
 
-def call_generate_lts_schema(step_idx, common_args):
+def call_generate_lts_schema(step_idx, common_args, worker=None):
     lts_schema_args = common_args.copy()
 
     lts_schema_args.pop("results_dirname")
     lts_schema_args["file"] = env.ARTIFACT_DIR / "lts_payload.schema.json"
-    lts_schema_args_str = " ".join(f"'--{k}={v}'" for k, v in lts_schema_args.items())
 
     log_file = env.ARTIFACT_DIR / f"{step_idx}_matbench_generate_lts_schema.log"
 
-    cmd = f"matbench generate_lts_schema {lts_schema_args_str} |& tee > {log_file}"
-
     errors = []
-    if run.run(cmd, check=False).returncode != 0:
+    if run_matbench("generate_lts_schema", lts_schema_args, log_file, worker=worker) != 0:
         logging.warning("An error happened while generating the LTS payload schema...")
         errors.apprend(log_file.name)
 
@@ -302,21 +385,72 @@ def log_has_errors(log_file):
     return has_errors
 
 
-def call_visualize(step_idx, common_env_str, common_args, filters_to_apply, generate_url):
+def _prepare_visualize(step_idx, common_args, filters_to_apply, generate_url):
     visu_args = common_args.copy()
     visu_args["filters"] = filters_to_apply
     visu_args["generate"] = generate_url
-    visu_args_str = " ".join(f"'--{k}={v}'" for k, v in visu_args.items())
 
     dest_dir = env.ARTIFACT_DIR / filters_to_apply
     dest_dir.mkdir(parents=True, exist_ok=True)
 
     log_file = dest_dir / f"{step_idx}_matbench_visualize.log"
 
-    cmd = f"{common_env_str} matbench visualize {visu_args_str} |& tee > {log_file}"
+    return visu_args, dest_dir, log_file
+
+
+def call_visualize(step_idx, common_env, common_args, filters_to_apply, generate_url, worker=None):
+    visu_args, dest_dir, log_file = _prepare_visualize(step_idx, common_args, filters_to_apply, generate_url)
+
+    returncode = run_matbench("visualize", visu_args, log_file, env=common_env, cwd=dest_dir, worker=worker)
+
+    return _check_visualize(returncode, dest_dir, log_file)
+
+
+def call_visualize_filters(first_step_idx, common_env, common_args, filters, generate_url, worker=None):
+    """
+    Generates the reports of the filters, `matbench.visualize_parallel` at a time.
+    """
+
+    steps = list(enumerate((filters_to_apply or "" for filters_to_apply in filters), start=first_step_idx))
+    parallel = min(config.project.get_config("matbench.visualize_parallel", 1, warn=False), len(steps))
+
+    if parallel <= 1:
+        errors = []
+        for step_idx, filters_to_apply in steps:
+            errors += call_visualize(step_idx, common_env, common_args, filters_to_apply, generate_url, worker)
 
+        return errors
+
+    logging.info(f"Generating the reports of {len(steps)} filters, {parallel} at a time ...")
+
+    if worker:
+        # the reports share the matrix parsed by the worker
+        prepared = [_prepare_visualize(step_idx, common_args, filters_to_apply, generate_url)
+                    for step_idx, filters_to_apply in steps]
+
+        returncodes = worker.run_parallel([("visualize", visu_args, log_file, common_env, dest_dir)
+                                           for visu_args, dest_dir, log_file in prepared], parallel)
+
+        errors = []
+        for (visu_args, dest_dir, log_file), returncode in zip(prepared, returncodes):
+            errors += _check_visualize(returncode, dest_dir, log_file)
+
+        return errors
+
+    step_errors = {}
+    def visualize_step(step_idx, filters_to_apply):
+        step_errors[step_idx] = call_visualize(step_idx, common_env, common_args, filters_to_apply, generate_url)
+
+    with run.Parallel("visualize", exit_on_exception=False, dedicated_dir=False, max_workers=parallel) as parallel_visualize:
+        for step_idx, filters_to_apply in steps:
+            parallel_visualize.delayed(visualize_step, step_idx, filters_to_apply)
+
+    return [error for step_idx, _ in steps for error in step_errors[step_idx]]
+
+
+def _check_visualize(returncode, dest_dir, log_file):
     errors = []
-    if run.run(cmd, check=False, cwd=dest_dir).returncode != 0:
+    if returncode != 0:
         logging.warning("An error happened while generating the visualization ...")
         errors.append(log_file.name)
 
@@ -333,6 +467,16 @@ def call_visualize(step_idx, common_env_str, common_args, filters_to_apply, gene
 
 
 def generate_visualization(results_dirname, idx, generate_lts=None, upload_lts=None, analyze_lts=None):
+    if not config.project.get_config("matbench.in_process", False, warn=False):
+        return _generate_visualization(results_dirname, idx, generate_lts, upload_lts, analyze_lts)
+
+    # parse the results once, and keep the matrix in memory for all the matbench commands
+    _, common_env = get_common_matbench_args_env(results_dirname)
+    with MatbenchWorker(common_env) as worker:
+        return _generate_visualization(results_dirname, idx, generate_lts, upload_lts, analyze_lts, worker=worker)
+
+
+def _generate_visualization(results_dirname, idx, generate_lts, upload_lts, analyze_lts, worker=None):
     generate_list = matbench_config.get_config(f"visualize[{idx}].generate")
     if not generate_list:
         raise ValueError(f"Couldn't get the configuration #{idx} ...")
@@ -349,7 +493,7 @@ def generate_visualization(results_dirname, idx, generate_lts=None, upload_lts=N
     # Parse the results, to validate that they are well formed
     #
 
-    fatal_errors, _non_fatal_errors = call_parse(step_idx, common_args, common_env)
+    fatal_errors, _non_fatal_errors = call_parse(step_idx, common_args, common_env, worker)
     non_fatal_errors += _non_fatal_errors
 
     if fatal_errors:
@@ -369,10 +513,10 @@ def generate_visualization(results_dirname, idx, generate_lts=None, upload_lts=N
 
     if do_generate_lts:
         step_idx += 1
-        non_fatal_errors += call_generate_lts(step_idx, common_args, common_env_str)
+        non_fatal_errors += call_generate_lts(step_idx, common_args, common_env, worker)
 
         step_idx += 1
-        non_fatal_errors += call_generate_lts_schema(step_idx, common_args)
+        non_fatal_errors += call_generate_lts_schema(step_idx, common_args, worker)
 
     if config.project.get_config("matbench.download.save_to_artifacts"):
         shutil.copytree(common_args["MATBENCH_RESULTS_DIRNAME"], env.ARTIFACT_DIR / "downloaded")
@@ -414,6 +558,9 @@ def generate_visualization(results_dirname, idx, generate_lts=None, upload_lts=N
         step_idx += 1
         download_lts_errors = call_download_lts(step_idx, common_args, common_env_str)
         non_fatal_errors += download_lts_errors
+        if worker:
+            # the LTS payloads have been downloaded into the results directory
+            worker.forget_matrix()
 
         step_idx += 1
         analyze_lts_errors, regression_detected = call_analyze_lts(step_idx, common_args, common_env_str)
@@ -446,12 +593,9 @@ def generate_visualization(results_dirname, idx, generate_lts=None, upload_lts=N
     #
 
     filters = matbench_config.get_config(f"visualize[{idx}]").get("filters", [None])
-    for filters_to_apply in filters:
-        if not filters_to_apply:
-            filters_to_apply = ""
 
-        step_idx += 1
-        non_fatal_errors += call_visualize(step_idx, common_env_str, common_args, filters_to_apply, generate_url)
+    non_fatal_errors += call_visualize_filters(step_idx + 1, common_env, common_args, filters, generate_url, worker)
+    step_idx += len(filters)
 
     #
     # Done :)
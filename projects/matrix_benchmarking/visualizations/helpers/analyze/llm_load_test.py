@@ -0,0 +1,340 @@
+import types
+import logging
+import weakref
+import functools
+import threading
+import collections
+
+import numpy
+import pandas as pd
+
+import projects.matrix_benchmarking.visualizations.helpers.store.llm_load_test as helpers_store_llm_load_test
+
+# Analysis of the llm-load-test results, shared by the kserve-llm and
+# mac_ai visualizations.
+#
+# The per-entry aggregates are computed once, from the results table
+# (see helpers/store/llm_load_test.py), and memoized for all the plots
+# of the report. The results are memoized as long as the entries are
+# alive, so they are dropped when the matrix is reloaded. The cache
+# holds weak references to the entries.
+
+LATENCY_DETAILS_CACHE_SIZE = 32
+
+# See https://github.com/IBM/text-generation-inference/blob/88f2a0b858b9f080f42cde388c4ebec961b9fa7d/proto/generation.proto#L155-L172
+STOP_REASONS = {
+    # Possibly more tokens to be streamed
+    0: "NOT_FINISHED",
+    # Maximum requested tokens reached
+    1: "MAX_TOKENS",
+    # End-of-sequence token encountered
+    2: "EOS_TOKEN",
+    # Request cancelled by client
+    3: "CANCELLED",
+    # Time limit reached
+    4: "TIME_LIMIT",
+    # Stop sequence encountered
+    5: "STOP_SEQUENCE",
+    # Total token limit reached
+    6: "TOKEN_LIMIT",
+    # Decoding error
+    7: "ERROR",
+    # Stop reason is not reported
+    None: "NOT_REPORTED"
+}
+
+
+def cache_by_entry(fn):
+    """
+    Memoizes the result of fn(entry), as long as the entry is alive.
+    """
+
+    cache = weakref.WeakKeyDictionary()
+
+    @functools.wraps(fn)
+    def wrapper(entry):
+        try:
+            return cache[entry]
+        except KeyError:
+            pass
+        except TypeError: # entry not weak-referenceable, cannot be memoized
+            return fn(entry)
+
+        cache[entry] = value = fn(entry)
+
+        return value
+
+    wrapper.cache_clear = cache.clear
+
+    return wrapper
+
+
+def simplify_error(error):
+    if not error:
+        return error
+
+    if "CUDA out of memory" in error:
+        return "CUDA out of memory"
+
+    if (partition := error.partition("read tcp"))[1]:
+        simplify = partition[0]
+        simplify += "read tcp: "
+        simplify += partition[2].partition(": ")[2]
+
+        if "use of closed network connection" in simplify:
+            # not an error
+            return None
+
+        return simplify
+
+    return error
+
+
+# See https://github.com/IBM/vllm/blob/21fb852e754158a37230cfa6e7faf77c0b814896/vllm/entrypoints/grpc/grpc_server.py#L415
+def convert_vllm_finish_reason(reason):
+    if reason == "length":
+        return 1 #TODO could also be 6 / TOKEN_LIMIT
+    elif reason == "stop":
+        return 2 #TODO could also be 5 / STOP_SEQUENCE
+    elif reason == "abort":
+        return 3
+    else:
+        logging.warning("Unrecognized finish_reason: %s", reason)
+        return None
+
+
+def _get_finish_reason(stop_reason):
+    if pd.isna(stop_reason): # NaN in the tables with a `str` stop_reason column
+        stop_reason = None
+
+    if isinstance(stop_reason, str): # vLLM
+        return STOP_REASONS[convert_vllm_finish_reason(stop_reason)]
+
+    return STOP_REASONS[stop_reason]
+
+
+def get_results(entry):
+    """
+    Returns the results table of the entry, or None if llm-load-test didn't run.
+    """
+
+    return entry.results.llm_load_test_results
+
+
+@cache_by_entry
+def get_simplified_errors(entry):
+    """
+    Returns the simplified error of each request of the entry (None when
+    the request succeeded), as a Series aligned with the results table.
+    """
+
+    results = get_results(entry)
+    if results is None:
+        return None
+
+    simplified_errors = pd.Series(None, index=results.index, dtype=object)
+
+    has_error_text = results.error_text.notna().to_numpy()
+    # the error texts are repeated a lot, simplify them only once
+    simplified = {error: simplify_error(error) for error in results.error_text[has_error_text].unique()}
+    simplified_errors[has_error_text] = [simplified[error] for error in results.error_text[has_error_text]]
+
+    return simplified_errors
+
+
+@cache_by_entry
+def get_error_distribution(entry):
+    """
+    Returns the number of successful requests of the entry, and the
+    number of occurrences of each of the simplified errors.
+    """
+
+    distribution = types.SimpleNamespace()
+    distribution.success_count = 0
+    distribution.errors = {}
+
+    simplified_errors = get_simplified_errors(entry)
+    if simplified_errors is None:
+        return distribution
+
+    is_error = simplified_errors.fillna("").astype(bool).to_numpy()
+
+    distribution.success_count = int((~is_error).sum())
+    distribution.errors = dict(collections.Counter(simplified_errors[is_error]))
+
+    return distribution
+
+
+@cache_by_entry
+def get_finish_reasons(entry):
+    """
+    Returns the number of occurrences of each of the finish reasons of
+    the requests of the entry (the simplified error of the failed requests).
+    """
+
+    results = get_results(entry)
+    if results is None:
+        return None
+
+    has_error_code = results.error_code.notna().to_numpy()
+
+    finish_reasons = get_simplified_errors(entry).copy()
+    stop_reasons = results.stop_reason[~has_error_code]
+    stop_reasons = stop_reasons.astype(object).where(stop_reasons.notna(), None)
+    reasons = {reason: _get_finish_reason(reason) for reason in stop_reasons.unique()}
+    finish_reasons[~has_error_code] = [reasons[reason] for reason in stop_reasons]
+
+    return dict(collections.Counter(finish_reasons))
+
+
+@cache_by_entry
+def _get_requests_times(entry):
+    results = get_results(entry)
+
+    return types.SimpleNamespace(
+        start_time=helpers_store_llm_load_test.to_local_datetime(results.start_time),
+        end_time=helpers_store_llm_load_test.to_local_datetime(results.end_time),
+        # str(None) for the missing user_ids, like before the results table
+        user_id=results.user_id.astype("string").fillna("None").astype(object),
+    )
+
+
+def _generate_entry_latency_details(entry, variables, ordered_vars, has_multiple_modes,
+                                    model_name_key, get_model_name,
+                                    only_errors, test_name_by_error, show_errors, collapse_index):
+    results = get_results(entry)
+    times = _get_requests_times(entry)
+
+    keep = numpy.ones(len(results), dtype=bool)
+    if only_errors:
+        keep &= results.error.to_numpy() # in this plot, ignore the latency if no error occured
+    if not show_errors:
+        keep &= ~results.error.to_numpy()
+
+    simplified_errors = None
+    if test_name_by_error and not collapse_index:
+        simplified_errors = get_simplified_errors(entry)
+        keep &= simplified_errors.fillna("").astype(bool).to_numpy()
+        simplified_errors = simplified_errors[keep]
+
+    results = results[keep]
+    if results.empty:
+        return None
+
+    errors = results.error.to_numpy()
+    latency = results.latency.to_numpy(copy=True)
+
+    entry_model_name = (f"{get_model_name(entry)}<br>"+entry.get_name([v for v in variables if v not in ("index", "mode", "model_name")]).replace(", ", "<br>")).removesuffix("<br>")
+
+    if has_multiple_modes:
+        entry_model_name += f"<br>{entry.settings.mode.title()}"
+
+    if collapse_index:
+        test_name = entry.get_name(v for v in variables if v != "index").replace(", ", "<br>")
+    elif test_name_by_error:
+        test_name = simplified_errors.to_numpy()
+    else:
+        test_name = numpy.where(errors, "errors", entry.get_name(variables).replace(", ", "<br>"))
+        latency[errors] = -1
+
+    test_fullname = entry.get_name([v for v in variables if v != "index"] if collapse_index else variables)
+    if has_multiple_modes:
+        test_fullname += f" {entry.settings.mode.title()}"
+
+    start_time = times.start_time[keep]
+
+    return pd.DataFrame({
+        "timestamp": start_time,
+        "tokens": results.tokens,
+        "latency": latency,
+        "latencyPerToken": results.latency_per_token,
+        model_name_key: entry_model_name,
+        "test_name": test_name,
+        "error": results.error_text.fillna("no error").replace("", "no error"),
+        "test_fullname": test_fullname,
+        "start_time": start_time,
+        "end_time": times.end_time[keep],
+        "duration": results.response_time,
+        "user_id": times.user_id[keep],
+        "user_id_int": results.user_id,
+        "tpot": results.tpot,
+        "ttft": results.ttft,
+        "itl": results.itl,
+        "sort_index": entry.settings.__dict__[ordered_vars[0]] if ordered_vars else 0,
+    })
+
+
+_latency_details_cache = collections.OrderedDict() # {(entry ids, options): (entry weak refs, DataFrame)}
+_latency_details_cache_lock = threading.Lock()
+
+
+def _drop_latency_details(key):
+    # called when one of the entries of the key is garbage-collected.
+    # Not locked, it may run in a thread holding the lock.
+    _latency_details_cache.pop(key, None)
+
+
+def generate_latency_details_data(entries, _variables, _ordered_vars, *,
+                                  model_name_key, get_model_name,
+                                  only_errors=False, test_name_by_error=False, show_errors=False,
+                                  collapse_index=False, model_name=None):
+    """
+    Returns the DataFrame of the latency plots, with one row per request of the entries.
+
+    `model_name_key` is the name of the model name column, and
+    `get_model_name(entry)` returns the name of the model of the entry.
+    The DataFrame is memoized, the latency plots of the report
+    requesting the same data share it. It must not be modified.
+    """
+
+    entries = list(entries)
+    options = (tuple(_variables), tuple(_ordered_vars),
+               model_name_key, get_model_name,
+               only_errors, test_name_by_error, show_errors, collapse_index, model_name)
+
+    # the key is dropped when one of the entries is garbage-collected, before its id can be reused
+    key = (tuple(map(id, entries)), options)
+    with _latency_details_cache_lock:
+        cached = _latency_details_cache.get(key)
+        if cached and all(ref() is entry for ref, entry in zip(cached[0], entries)):
+            _latency_details_cache.move_to_end(key)
+            return cached[1]
+
+    variables = list(_variables) # make a copy before modifying
+    if "mode" in _variables:
+        variables.remove("mode")
+        has_multiple_modes = True
+    else:
+        has_multiple_modes = False
+
+    if model_name and "model_name" in variables:
+        variables.remove("model_name")
+
+    ordered_vars = [v for v in _ordered_vars if v in variables]
+
+    data = []
+    for entry in entries:
+        if model_name and entry.settings.__dict__.get("model_name") != model_name:
+            continue
+
+        if get_results(entry) is None: continue
+
+        entry_data = _generate_entry_latency_details(entry, variables, ordered_vars, has_multiple_modes,
+                                                     model_name_key, get_model_name,
+                                                     only_errors, test_name_by_error, show_errors, collapse_index)
+        if entry_data is not None:
+            data.append(entry_data)
+
+    df = pd.concat(data, ignore_index=True) if data else pd.DataFrame()
+
+    try:
+        refs = tuple(weakref.ref(entry, lambda _, key=key: _drop_latency_details(key)) for entry in entries)
+    except TypeError: # entries not weak-referenceable, cannot be memoized
+        return df
+
+    with _latency_details_cache_lock:
+        _latency_details_cache[key] = (refs, df)
+        while len(_latency_details_cache) > LATENCY_DETAILS_CACHE_SIZE:
+            _latency_details_cache.popitem(last=False)
+
+    return df
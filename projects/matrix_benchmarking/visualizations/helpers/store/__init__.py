@@ -7,12 +7,293 @@ import fnmatch
 import json
 import functools
 import inspect
+import hashlib
+import importlib
+import sys
+import tempfile
+import multiprocessing
+import concurrent.futures
 
 import jsonpath_ng
 
 from matrix_benchmarking.parse import json_dumper
 import matrix_benchmarking.store as store
+import matrix_benchmarking.store.simple as store_simple
 import matrix_benchmarking.common as common
+import matrix_benchmarking.cli_args as cli_args
+
+PARSER_CACHE_DIRNAME_SUFFIX = ".parsers"
+HELPERS_PACKAGE = __name__.rpartition(".")[0] # projects.matrix_benchmarking.visualizations.helpers
+DIRECTORY_DEPENDENCIES_FILENAME = "_directory.deps.pickle"
+
+_current_store = None # the store currently parsing a directory
+_registered_files_stack = [] # the sets of files registered by the (cached) parsers currently running
+_used_parsers = {} # {parser name: source hash} of the cached parsers used to parse the current directory
+_parallel_parsing_store = None # the store running a parallel parsing, inherited by the forked workers
+_kept_matrix = None # (parse key, parse_data result) of the matrix kept in memory, with MATBENCH_STORE_KEEP_MATRIX
+
+
+def _ignore_env(name):
+    return os.environ.get(name, False) in ("yes", "y", "true", "True")
+
+
+def cache_parser(fn):
+    """
+    Caches the result of a parser function, in the result directory.
+
+    The parser must take the result directory as first argument.
+    The cache entry is invalidated when the source code of the parser
+    module changes (or of the workload and helpers modules it imports),
+    or when one of the important files it registered (with
+    `register_important_file`) is modified.
+    Files appearing after the parsing (eg, in a glob) are not detected,
+    use MATBENCH_STORE_IGNORE_PARSER_CACHE to force the parsing.
+    """
+
+    @functools.wraps(fn)
+    def decorator(dirname, *args, **kwargs):
+        if _current_store is None or _ignore_env("MATBENCH_STORE_IGNORE_PARSER_CACHE"):
+            return fn(dirname, *args, **kwargs)
+
+        return _current_store.run_cached_parser(fn, dirname, args, kwargs)
+
+    decorator.cached_parser = True
+
+    return decorator
+
+
+def _get_module_dependencies(module):
+    """
+    Returns the module and the modules it imports, recursively, from
+    its own package and from the visualization helpers.
+    """
+
+    prefixes = tuple(f"{package}." for package in (module.__package__, HELPERS_PACKAGE) if package)
+
+    dependencies = {}
+    to_visit = [module]
+    while to_visit:
+        current = to_visit.pop()
+        if current.__name__ in dependencies:
+            continue
+        dependencies[current.__name__] = current
+
+        for value in vars(current).values():
+            if isinstance(value, types.ModuleType):
+                dependency = value
+            else: # from ... import fn
+                module_name = getattr(value, "__module__", None)
+                dependency = sys.modules.get(module_name) if isinstance(module_name, str) else None
+
+            if dependency is None or dependency.__name__ in dependencies:
+                continue
+            if dependency.__name__ == __name__:
+                continue # the parser cache itself
+            if not dependency.__name__.startswith(prefixes):
+                continue
+
+            to_visit.append(dependency)
+
+    return dependencies
+
+
+@functools.cache
+def _get_source_hash(fn):
+    source_hash = hashlib.sha256()
+    for name, module in sorted(_get_module_dependencies(sys.modules[fn.__module__]).items()):
+        try:
+            source = inspect.getsource(module)
+        except (OSError, TypeError):
+            source = "" # no source file available
+
+        source_hash.update(f"{name}\n{source}\n".encode())
+
+    return source_hash.hexdigest()
+
+
+def _get_parser_source_hash(parser_name):
+    module_name, _, qualname = parser_name.partition(":")
+    try:
+        fn = importlib.import_module(module_name)
+        for attr in qualname.split("."):
+            fn = getattr(fn, attr)
+
+        return _get_source_hash(fn)
+    except (ImportError, AttributeError, OSError, TypeError):
+        return None # parser not found, considered as modified
+
+
+def _get_file_fingerprint(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def track_registered_file(filename):
+    for registered_files in _registered_files_stack:
+        registered_files.add(str(filename))
+
+
+def _dump_pickle_atomically(content, dest):
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=dest.parent, prefix=f".{dest.name}.", delete=False) as f:
+        try:
+            pickle.dump(content, f)
+        except Exception:
+            os.remove(f.name)
+            raise
+
+    os.replace(f.name, dest)
+
+
+def get_parallel_parsing_workers():
+    value = os.environ.get("MATBENCH_STORE_PARALLEL_PARSING", "")
+    if value in ("", "no", "n", "false", "False"):
+        return 0
+
+    if value in ("yes", "y", "true", "True"):
+        return os.cpu_count()
+
+    return int(value)
+
+
+def _parse_directory_worker(dirname, import_settings):
+    store = _parallel_parsing_store
+
+    results = store.load_or_parse(dirname, import_settings)
+
+    # the results are pickled to be sent back to the main process
+    store.prepare_for_pickle(results)
+    store._prepare_for_pickle(results)
+
+    return results
+
+
+class ParallelParsing(object):
+    """
+    Parses the directories passed to BaseStore.parse_directory in a
+    process pool.
+
+    The results are added to the matrix when leaving the context, in
+    the order of the parse_directory calls.
+    """
+
+    def __init__(self, store, workers):
+        self.store = store
+        self.workers = workers
+        self.pool = None
+        self.pending = None
+
+    def __enter__(self):
+        global _parallel_parsing_store
+
+        if self.workers <= 1:
+            logging.info("Parallel parsing disabled, parsing the directories sequentially.")
+            return self
+
+        logging.info(f"Parsing the directories in parallel, with {self.workers} workers.")
+        _parallel_parsing_store = self.store
+        # fork: the workers inherit the store configuration (register_important_file, artifact paths, ...)
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                           mp_context=multiprocessing.get_context("fork"))
+        self.pending = []
+        self.store.parallel_parsing = self
+
+        return self
+
+    def submit(self, fn_add_to_matrix, dirname, import_settings, exit_code):
+        future = self.pool.submit(_parse_directory_worker, dirname, import_settings)
+        self.pending.append((future, fn_add_to_matrix, dirname, import_settings, exit_code))
+
+    def __exit__(self, ex_type, ex_value, exc_traceback):
+        global _parallel_parsing_store
+
+        if not self.pool:
+            return False
+
+        self.store.parallel_parsing = None
+        _parallel_parsing_store = None
+
+        try:
+            if ex_value:
+                return False
+
+            for future, fn_add_to_matrix, dirname, import_settings, exit_code in self.pending:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logging.error(f"Failed to parse {dirname} ...")
+                    logging.info(f"       {e.__class__.__name__}: {e}")
+                    raise
+
+                self.store._prepare_after_pickle(results)
+                self.store.prepare_after_pickle(results)
+
+                self.store.add_results_to_matrix(results, fn_add_to_matrix, dirname, import_settings, exit_code)
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+        return False # If we returned True here, any exception would be suppressed!
+
+
+def _get_parse_key(args, kwargs, cli_kwargs=None):
+    if cli_kwargs is None:
+        cli_kwargs = cli_args.kwargs or {}
+
+    # the filters are applied on the parsed matrix, they are not part of the key
+    return json.dumps([cli_kwargs.get("workload"), cli_kwargs.get("results_dirname"), args, kwargs], default=str)
+
+
+def is_matrix_kept(cli_kwargs):
+    """
+    Tells if the matrix parsed for these matbench arguments is kept in memory.
+    """
+
+    return bool(_kept_matrix and _kept_matrix[0] == _get_parse_key((), {}, cli_kwargs)
+                and common.Matrix.processed_map)
+
+
+def forget_kept_matrix():
+    """
+    Forces the next parse_data call to parse the results, eg after they have been modified.
+    """
+
+    global _kept_matrix
+
+    _kept_matrix = None
+
+
+def reuse_kept_matrix(parse_data):
+    """
+    Decorates a parse_data function, so that with
+    MATBENCH_STORE_KEEP_MATRIX, the matrix parsed by a previous matbench
+    command of this process is reused, as long as it is still populated
+    (see matrix_benchmarking/library/matbench_worker.py).
+
+    The workloads with their own parse_data function must use it too.
+    """
+
+    @functools.wraps(parse_data)
+    def wrapper(*args, **kwargs):
+        global _kept_matrix
+
+        keep_matrix = _ignore_env("MATBENCH_STORE_KEEP_MATRIX")
+        parse_key = _get_parse_key(args, kwargs)
+        if keep_matrix and _kept_matrix and _kept_matrix[0] == parse_key and common.Matrix.processed_map:
+            logging.info("Reusing the matrix parsed by a previous command.")
+            return _kept_matrix[1]
+
+        result = parse_data(*args, **kwargs)
+
+        _kept_matrix = (parse_key, result) if keep_matrix else None
+
+        return result
+
+    return wrapper
+
 
 class BaseStore():
     def __init__(self, *,
@@ -34,6 +315,9 @@ class BaseStore():
         self.parse_always = parse_always
         self.parse_once = parse_once
 
+        self.parallel_parsing = None
+        self.parallel_parsing_warned = False
+
         self.lts_payload_model = lts_payload_model
         if lts_payload_model:
             self.generate_lts_payload = generate_lts_payload
@@ -61,9 +345,15 @@ class BaseStore():
         return False
 
     def is_cache_file(self, filename):
-        return filename.name == self.cache_filename
+        return (filename.name == self.cache_filename
+                or filename.parent.name == self.cache_filename + PARSER_CACHE_DIRNAME_SUFFIX)
+
+    def get_parser_cache_dir(self, dirname):
+        return dirname / (self.cache_filename + PARSER_CACHE_DIRNAME_SUFFIX)
 
     def register_important_file(self, base_dirname, filename):
+        track_registered_file(filename)
+
         to_return = base_dirname / filename
         if self.is_important_file(filename):
             return to_return
@@ -122,26 +412,127 @@ class BaseStore():
 
         return results
 
+    def run_cached_parser(self, fn, dirname, args, kwargs):
+        parser_name = f"{fn.__module__}:{fn.__qualname__}"
+        source_hash = _get_source_hash(fn)
+        _used_parsers[parser_name] = source_hash
+
+        # the artifact paths are global values used by most of the parsers
+        parser_key = repr((args, sorted(kwargs.items()), sorted(self.artifact_paths.__dict__.items())))
+        parser_key_hash = hashlib.sha256(parser_key.encode()).hexdigest()[:16]
+
+        cache_file = self.get_parser_cache_dir(dirname) / f"{parser_name.replace(':', '.')}.{parser_key_hash}.pickle"
+
+        try:
+            with open(cache_file, "rb") as f:
+                entry = pickle.load(f)
+
+            if (entry["source_hash"] == source_hash
+                and all(_get_file_fingerprint(dirname / filename) == fingerprint
+                        for filename, fingerprint in entry["files"].items())):
+
+                for filename in entry["files"]:
+                    track_registered_file(filename)
+
+                return entry["result"]
+
+            logging.info(f"{parser_name}: parser or important file modified, parsing again.")
+        except FileNotFoundError:
+            pass # not cached yet
+        except Exception as e:
+            logging.warning(f"{parser_name}: could not reload the parser cache file: {e}")
+
+        registered_files = set()
+        _registered_files_stack.append(registered_files)
+        try:
+            result = fn(dirname, *args, **kwargs)
+        finally:
+            _registered_files_stack.pop()
+
+        entry = dict(
+            source_hash=source_hash,
+            files={filename: _get_file_fingerprint(dirname / filename) for filename in registered_files},
+            result=result,
+        )
+
+        try:
+            _dump_pickle_atomically(entry, cache_file)
+        except Exception as e:
+            logging.info(f"{parser_name}: cannot cache the parser results: {e}")
+
+        return result
+
+    def load_directory_dependencies(self, dirname):
+        with open(self.get_parser_cache_dir(dirname) / DIRECTORY_DEPENDENCIES_FILENAME, "rb") as f:
+            return pickle.load(f)
+
+    def is_cache_up_to_date(self, dirname):
+        try:
+            dependencies = self.load_directory_dependencies(dirname)
+        except FileNotFoundError:
+            return True # cache generated without dependencies, trust it
+        except Exception as e:
+            logging.warning(f"Could not reload the cache dependencies: {e}")
+            return False
+
+        for filename, fingerprint in dependencies["files"].items():
+            if _get_file_fingerprint(dirname / filename) != fingerprint:
+                logging.info(f"{dirname}: important file '{filename}' modified since the cache generation.")
+                return False
+
+        for parser_name, source_hash in dependencies["parsers"].items():
+            if _get_parser_source_hash(parser_name) != source_hash:
+                logging.info(f"{dirname}: parser '{parser_name}' modified since the cache generation.")
+                return False
+
+        return True
+
+    def save_directory_dependencies(self, dirname, registered_files, used_parsers):
+        dependencies = dict(
+            files={filename: _get_file_fingerprint(dirname / filename) for filename in registered_files},
+            parsers=used_parsers,
+        )
+
+        _dump_pickle_atomically(dependencies, self.get_parser_cache_dir(dirname) / DIRECTORY_DEPENDENCIES_FILENAME)
 
     def parse_directory(self, fn_add_to_matrix, dirname, import_settings, exit_code):
-        ignore_cache = os.environ.get("MATBENCH_STORE_IGNORE_CACHE", False) in ("yes", "y", "true", "True")
+        if self.parallel_parsing:
+            self.parallel_parsing.submit(fn_add_to_matrix, dirname, import_settings, exit_code)
+            return
+
+        if get_parallel_parsing_workers() > 1 and not self.parallel_parsing_warned:
+            logging.warning("MATBENCH_STORE_PARALLEL_PARSING is ignored: the workload store must export "
+                            "`parse_data = local_store.parse_data`, or use ParallelParsing in its own parse_data.")
+            self.parallel_parsing_warned = True
+
+        results = self.load_or_parse(dirname, import_settings)
+
+        self.add_results_to_matrix(results, fn_add_to_matrix, dirname, import_settings, exit_code)
+
+    def add_results_to_matrix(self, results, fn_add_to_matrix, dirname, import_settings, exit_code):
+        self.parse_always(results, dirname, import_settings)
+        self.parse_lts(results, import_settings, exit_code)
+
+        fn_add_to_matrix(results)
+
+    def load_or_parse(self, dirname, import_settings):
+        ignore_cache = _ignore_env("MATBENCH_STORE_IGNORE_CACHE")
         if not ignore_cache:
             try:
-                results = self.load_cache(dirname)
+                results = self.load_cache(dirname) if self.is_cache_up_to_date(dirname) else None
             except FileNotFoundError:
                 results = None # Cache file doesn't exit, ignore and parse the artifacts
         else:
             logging.info("MATBENCH_STORE_IGNORE_CACHE is set, not processing the cache file.")
             results = None
 
+        if results and not self.is_cached_results_up_to_date(results):
+            logging.info(f"{dirname}: cache file generated by an older version of the store, parsing again.")
+            results = None
+
         if results:
             # reloaded from cache
-            self.parse_always(results, dirname, import_settings)
-            self.parse_lts(results, import_settings, exit_code)
-
-            fn_add_to_matrix(results)
-
-            return
+            return results
 
         self.resolve_artifact_dirnames(dirname)
 
@@ -151,11 +542,16 @@ class BaseStore():
         if "import_settings" in inspect.getargspec(self.parse_once).args:
             parse_once_kwargs["import_settings"] = import_settings
 
-        self.parse_once(results, dirname, **parse_once_kwargs)
-        self.parse_always(results, dirname, import_settings)
-        self.parse_lts(results, import_settings, exit_code)
-
-        fn_add_to_matrix(results)
+        global _current_store
+        registered_files = set()
+        _current_store = self
+        _used_parsers.clear()
+        _registered_files_stack.append(registered_files)
+        try:
+            self.parse_once(results, dirname, **parse_once_kwargs)
+        finally:
+            _registered_files_stack.pop()
+            _current_store = None
 
         with open(dirname / self.cache_filename, "wb") as f:
 
@@ -167,8 +563,15 @@ class BaseStore():
             self._prepare_after_pickle(results)
             self.prepare_after_pickle(results)
 
+        try:
+            self.save_directory_dependencies(dirname, registered_files, dict(_used_parsers))
+        except Exception as e:
+            logging.warning(f"Could not save the cache dependencies: {e}")
+
         print("parsing done :)")
 
+        return results
+
     def parse_lts(self, results, import_settings, exit_code):
         if not self.lts_payload_model:
             return
@@ -210,15 +613,18 @@ class BaseStore():
     def prepare_after_pickle(self, results):
         pass
 
-    def parse_data():
-        # delegate the parsing to the simple_store
-        store.register_custom_rewrite_settings(_rewrite_settings)
-        store_simple.register_custom_parse_results(_parse_directory)
+    def is_cached_results_up_to_date(self, results):
+        # called after prepare_after_pickle, tells if the results reloaded from the cache file can be used
+        return True
 
-        from . import lts
-        store_simple.register_custom_build_lts_payloads(lts.build_lts_payloads)
+    def parse_data(self):
+        return reuse_kept_matrix(self._parse_data)()
 
-        return store_simple.parse_data()
+    def _parse_data(self):
+        # delegate the parsing to the simple_store,
+        # in parallel if MATBENCH_STORE_PARALLEL_PARSING is set
+        with ParallelParsing(self, get_parallel_parsing_workers()):
+            return store_simple.parse_data()
 
 
     def build_lts_payloads(self):
@@ -0,0 +1,205 @@
+import types
+import logging
+import datetime
+
+import numpy
+import pandas as pd
+import dateutil.tz
+
+# Columnar view of the llm-load-test `output.json` results.
+#
+# The results are converted once, when parsing the result directory,
+# into a DataFrame with one row per request. The DataFrame is saved in
+# the store cache file, next to the results, and the plots compute
+# their statistics on its columns instead of looping over the requests.
+
+NUMERIC_COLUMNS = ["start_time", "end_time", "response_time",
+                   "output_tokens", "tpot", "itl", "ttft", "error_code"]
+
+# increase when the columns of the table change, to regenerate the tables of the cache files
+RESULTS_TABLE_VERSION = 4
+
+# statistics.quantiles(method="exclusive") interpolation, used by the plots before the vectorization
+QUANTILES_METHOD = "weibull"
+
+
+def parse_results_table(llm_load_test_output):
+    """
+    Converts the `results` of llm-load-test output.json into a DataFrame.
+
+    The missing numeric values are stored as NaN, the missing user_ids
+    as NA. The `error` column
+    tells if the request failed, `tokens`, `latency` and
+    `latency_per_token` are the per-request values used by the latency
+    plots (0 when no token was generated).
+    """
+
+    results = (llm_load_test_output or {}).get("results") or []
+
+    columns = {}
+    for name in NUMERIC_COLUMNS:
+        columns[name] = numpy.array([result.get(name) for result in results], dtype=numpy.float64)
+
+    # a missing user_id stays NA, it must not be merged with the series of user 0
+    columns["user_id"] = pd.array([result.get("user_id") for result in results], dtype="Int64")
+    # pd.Series keeps the object dtype (pandas >= 3 turns object arrays of strings into `str` columns, with NaN for None)
+    columns["error_text"] = pd.Series([result.get("error_text") for result in results], dtype=object)
+    columns["stop_reason"] = pd.Series([result.get("stop_reason") for result in results], dtype=object)
+
+    table = pd.DataFrame(columns)
+    table.attrs["version"] = RESULTS_TABLE_VERSION
+
+    table["error"] = table.error_code.fillna(0).to_numpy() != 0
+
+    tokens = table.output_tokens.fillna(0).to_numpy()
+    has_tokens = tokens > 0
+    table["tokens"] = tokens
+    table["latency"] = numpy.where(has_tokens, table.response_time.to_numpy(), 0)
+    table["latency_per_token"] = numpy.divide(table.latency.to_numpy(), tokens,
+                                              out=numpy.zeros(len(table)), where=has_tokens)
+
+    return table
+
+
+def is_outdated(table):
+    """
+    Tells if the results table was generated by an older version of parse_results_table.
+    """
+
+    return table is not None and table.attrs.get("version") != RESULTS_TABLE_VERSION
+
+
+def parse_results(llm_load_test_output):
+    """
+    Returns the results table of the llm-load-test output, or None if it is empty.
+
+    The `results` are dropped from the output once the table is built,
+    only the `summary` is used after the parsing.
+    """
+
+    if not llm_load_test_output:
+        return None
+
+    table = parse_results_table(llm_load_test_output)
+    llm_load_test_output.pop("results", None)
+
+    return table
+
+
+def upgrade_cached_results(results):
+    """
+    Builds the results table of the results reloaded from a cache file
+    generated before the `results` were dropped from the output.
+
+    To be called from the prepare_after_pickle of the stores.
+    """
+
+    if "results" in (results.llm_load_test_output or {}):
+        results.llm_load_test_results = parse_results(results.llm_load_test_output)
+
+
+def is_cached_results_up_to_date(results):
+    """
+    Tells if the results reloaded from a cache file have an up-to-date results table.
+
+    The `results` aren't in the cache files anymore, a missing or outdated
+    table can only be regenerated by parsing the directory again.
+    """
+
+    return ("llm_load_test_results" in results.__dict__
+            and not is_outdated(results.llm_load_test_results))
+
+
+def get_summary_metric(results, name):
+    """
+    Returns the summary of a metric of the llm-load-test output, with
+    its non-zero `values`, as a SimpleNamespace (None if llm-load-test didn't run).
+    """
+
+    if not results.llm_load_test_output: return None
+
+    metric = dict(results.llm_load_test_output["summary"][name])
+    metric["values"] = get_values(results.llm_load_test_results, name)
+
+    return types.SimpleNamespace(**metric)
+
+
+def get_values(table, column):
+    """
+    Returns the non-null, non-zero values of a column of the results table, as a list.
+    """
+
+    values = table[column]
+
+    return values[values.notna() & (values != 0)].tolist()
+
+
+def get_start_end(table):
+    """
+    Returns the (start, end) datetimes of the test, or (None, None) if it has no result.
+    """
+
+    if table is None or table.empty:
+        return None, None
+
+    return (datetime.datetime.fromtimestamp(table.start_time.min()),
+            datetime.datetime.fromtimestamp(table.end_time.max()))
+
+
+def parse_test_start_end(table):
+    """
+    Returns the start and end datetimes of the test, as a SimpleNamespace (None if llm-load-test didn't run).
+    """
+
+    if table is None:
+        return None
+
+    test_start_end = types.SimpleNamespace()
+    test_start_end.start, test_start_end.end = get_start_end(table)
+
+    if test_start_end.start is None:
+        logging.warning("Could not find the start time of the test...")
+    if test_start_end.end is None:
+        logging.warning("Could not find the end time of the test...")
+
+    return test_start_end
+
+
+def to_local_datetime(timestamps):
+    """
+    Converts epoch timestamps into naive local datetimes,
+    like datetime.datetime.fromtimestamp does.
+    """
+
+    # rounded to the microsecond the same way as fromtimestamp
+    fractions, seconds = numpy.modf(numpy.asarray(timestamps, dtype=numpy.float64))
+    microseconds = seconds * 1_000_000 + numpy.round(fractions * 1e6)
+
+    # converted with the rules of the local timezone, DST changes included
+    local_datetimes = (pd.to_datetime(microseconds, unit="us", utc=True)
+                       .tz_convert(dateutil.tz.tzlocal())
+                       .tz_localize(None)
+                       .as_unit("us"))
+
+    return pd.Series(local_datetimes, index=getattr(timestamps, "index", None))
+
+
+def get_quantiles(values, quantiles):
+    """
+    Returns the quantiles (in percent) of the values, as a numpy array.
+    """
+
+    return numpy.percentile(numpy.asarray(values, dtype=numpy.float64), quantiles, method=QUANTILES_METHOD)
+
+
+def get_stats(values):
+    """
+    Returns the distribution statistics of the values, as a SimpleNamespace.
+    """
+
+    stats = types.SimpleNamespace()
+    stats.count = len(values)
+    stats.min, stats.q1, stats.median, stats.q3, stats.q90, stats.q99, stats.max = \
+        get_quantiles(values, [0, 25, 50, 75, 90, 99, 100]).tolist()
+
+    return stats
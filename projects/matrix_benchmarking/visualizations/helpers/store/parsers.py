@@ -1,5 +1,6 @@
 import types
 import logging
+import functools
 import uuid
 import pathlib
 import datetime
@@ -14,15 +15,21 @@ import matrix_benchmarking.cli_args as cli_args
 
 import projects.matrix_benchmarking.visualizations.helpers.store as helpers_store
 from . import k8s_quantity
+from . import prom_queries
 
 K8S_TIME_FMT = "%Y-%m-%dT%H:%M:%SZ"
 K8S_TIME_MILLI_FMT = "%Y-%m-%dT%H:%M:%S.%fZ"
 SHELL_DATE_TIME_FMT = "%a %b %d %H:%M:%S %Z %Y"
 ANSIBLE_LOG_DATE_TIME_FMT = "%Y-%m-%d %H:%M:%S"
 
-register_important_file = lambda dirname, filename: dirname/filename
+def register_important_file(dirname, filename):
+    # tracked so that the cached parsers know the files they depend on
+    helpers_store.track_registered_file(filename)
+
+    return dirname / filename
 
 def ignore_file_not_found(fn):
+    @functools.wraps(fn)
     def decorator(*args, **kwargs):
         try:
             return fn(*args, **kwargs)
@@ -33,6 +40,77 @@ def ignore_file_not_found(fn):
     return decorator
 
 
+@functools.lru_cache(maxsize=65536)
+def parse_k8s_time(ts_str):
+    """
+    Parses a K8S_TIME_FMT or K8S_TIME_MILLI_FMT timestamp.
+
+    The K8s timestamps have a second resolution and are largely shared
+    between the resources, so the results are cached. The well-formed
+    timestamps are parsed with `fromisoformat`, much faster than
+    `strptime`.
+    """
+
+    # eg: 2024-05-06T12:34:56Z or 2024-05-06T12:34:56.123456Z
+    if len(ts_str) >= 20 and ts_str[-1] == "Z" and ts_str[10] == "T" and (len(ts_str) == 20 or ts_str[19] == "."):
+        try:
+            return datetime.datetime.fromisoformat(ts_str[:-1])
+        except ValueError:
+            pass # not a fast-path timestamp, use strptime
+
+    fmt = K8S_TIME_MILLI_FMT if "." in ts_str else K8S_TIME_FMT
+
+    return datetime.datetime.strptime(ts_str, fmt)
+
+
+def parse_pod_time(pod):
+    """
+    Extracts the timestamps of a Pod JSON object.
+
+    Returns a SimpleNamespace with the pod_name, hostname, creation_time,
+    start_time, pod_scheduled, pod_initialized, containers_ready and
+    container_finished timestamps (if available), and a `conditions`
+    dict with the lastTransitionTime of all the Pod conditions.
+    """
+
+    pod_time = types.SimpleNamespace()
+
+    pod_time.pod_name = pod["metadata"]["name"]
+    pod_time.hostname = pod["spec"].get("nodeName")
+
+    pod_time.creation_time = parse_k8s_time(pod["metadata"]["creationTimestamp"])
+
+    start_time_str = pod["status"].get("startTime")
+    pod_time.start_time = None if not start_time_str else \
+        parse_k8s_time(start_time_str)
+
+    pod_time.conditions = {}
+
+    for condition in pod["status"].get("conditions", []):
+        last_transition = parse_k8s_time(condition["lastTransitionTime"])
+
+        pod_time.conditions[condition["type"]] = last_transition
+
+        if condition["type"] == "ContainersReady":
+            pod_time.containers_ready = last_transition
+        elif condition["type"] == "Initialized":
+            pod_time.pod_initialized = last_transition
+        elif condition["type"] == "PodScheduled":
+            pod_time.pod_scheduled = last_transition
+
+    for containerStatus in pod["status"].get("containerStatuses", []):
+        try:
+            finishedAt = parse_k8s_time(containerStatus["state"]["terminated"]["finishedAt"])
+        except KeyError: continue
+
+        # take the last container_finished found
+        if ("container_finished" not in pod_time.__dict__
+            or pod_time.container_finished < finishedAt):
+            pod_time.container_finished = finishedAt
+
+    return pod_time
+
+
 def dict_get_from_path(dict_obj, path, default=None):
     # default currently unused :/
     return reduce(dict.get, path.split("."), dict_obj)
@@ -174,6 +252,7 @@ def parse_test_uuid(dirname):
     return uuid.UUID(test_uuid)
 
 
+@helpers_store.cache_parser
 @ignore_file_not_found
 def parse_nodes_info(dirname, capture_state_dir, sutest_cluster=True):
     nodes_info = {}
@@ -268,7 +347,7 @@ def parse_rhods_info(dirname, capture_state_dir, version_name=None):
     with open(register_important_file(dirname, capture_state_dir / "rhods.createdAt")) as f:
         rhods_info.createdAt_raw = f.read().strip()
 
-    try: rhods_info.createdAt = datetime.datetime.strptime(rhods_info.createdAt_raw, K8S_TIME_FMT)
+    try: rhods_info.createdAt = parse_k8s_time(rhods_info.createdAt_raw)
     except ValueError as e:
         logging.error("Couldn't parse RHOAI version timestamp: {e}")
         rhods_info.createdAt = None
@@ -367,6 +446,7 @@ def parse_local_env(dirname):
     return from_local_env
 
 
+@helpers_store.cache_parser
 def extract_metrics(dirname, db_files):
     metrics = {}
     for name, (tarball_glob, metric) in db_files.items():
@@ -377,6 +457,15 @@ def extract_metrics(dirname, db_files):
             continue
 
         register_important_file(dirname, prom_tarball.relative_to(dirname))
-        metrics[name] = store_prom_db.extract_metrics(prom_tarball, metric, dirname)
+
+        metrics_dir = prom_queries.get_metrics_dir(prom_tarball)
+        if metrics_dir is None:
+            metrics[name] = store_prom_db.extract_metrics(prom_tarball, metric, dirname)
+            continue
+
+        # metrics queried from Prometheus, loaded from their columnar files
+        metrics[name], missing_metrics = prom_queries.extract_metrics(metrics_dir, metric)
+        if missing_metrics:
+            metrics[name].update(store_prom_db.extract_metrics(prom_tarball, missing_metrics, dirname))
 
     return metrics
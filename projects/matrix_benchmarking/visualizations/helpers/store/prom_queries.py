@@ -0,0 +1,240 @@
+import types
+import logging
+import pathlib
+import json
+import shutil
+import tempfile
+import collections.abc
+
+import numpy
+
+# Columnar conversion of the metrics queried from Prometheus
+# (tests.capture_prom=with-queries, see projects/cluster/library/prom.py).
+#
+# metrics/<query>.json          --> [{metric: {labels}, values: [[ts, "value"], ...]}, ...]
+# metrics/<query>.columns/
+#   index.json      --> the JSON file fingerprint, the distinct label sets, and the labels/offset/length of each series
+#   timestamps.npy  --> the timestamps of all the series, concatenated
+#   values.npy      --> the values of all the series, concatenated, as float64
+#
+# The JSON files are converted the first time they are parsed. Then,
+# the .npy files are memory-mapped, so that the samples don't have to
+# be loaded in memory before being used.
+
+METRICS_DIRNAME = "metrics"
+COLUMNS_DIRNAME_SUFFIX = ".columns"
+COLUMNS_VERSION = 1
+INDEX_FILENAME = "index.json"
+TIMESTAMPS_FILENAME = "timestamps.npy"
+VALUES_FILENAME = "values.npy"
+
+
+class SeriesValues(collections.abc.Mapping):
+    """
+    Read-only {timestamp: value} view of one series of the columnar files.
+    """
+
+    def __init__(self, cache_dir, offset, length, timestamps, values):
+        self.cache_dir = cache_dir
+        self.offset = offset
+        self.length = length
+        self.timestamps = timestamps
+        self.values_array = values
+
+    @classmethod
+    def load(cls, cache_dir, offset, length):
+        timestamps, values = _load_arrays(cache_dir)
+
+        return cls(cache_dir, offset, length,
+                   timestamps[offset:offset+length], values[offset:offset+length])
+
+    def __reduce__(self):
+        # pickled as a reference to the cache files, not as a copy of the samples
+        return (SeriesValues.load, (self.cache_dir, self.offset, self.length))
+
+    def __getitem__(self, timestamp):
+        idx = numpy.searchsorted(self.timestamps, timestamp)
+        if idx >= self.length or self.timestamps[idx] != timestamp:
+            raise KeyError(timestamp)
+
+        return self.values_array[idx].item()
+
+    def __iter__(self):
+        return iter(self.timestamps.tolist())
+
+    def __len__(self):
+        return self.length
+
+    def keys(self):
+        return self.timestamps.tolist()
+
+    def values(self):
+        return self.values_array.tolist()
+
+    def items(self):
+        return zip(self.timestamps.tolist(), self.values_array.tolist())
+
+
+_arrays_cache = {}
+
+def _load_arrays(cache_dir):
+    cache_dir = pathlib.Path(cache_dir)
+    try:
+        return _arrays_cache[cache_dir]
+    except KeyError:
+        pass
+
+    # raises FileNotFoundError if the cache has been deleted
+    _arrays_cache[cache_dir] = arrays = (
+        numpy.load(cache_dir / TIMESTAMPS_FILENAME, mmap_mode="r"),
+        numpy.load(cache_dir / VALUES_FILENAME, mmap_mode="r"),
+    )
+
+    return arrays
+
+
+def get_metrics_dir(prom_tarball):
+    """
+    Returns the directory of the queried metrics, or None if the metrics have not been queried.
+    """
+
+    # <artifact_dir>/*__cluster__dump_prometheus_dbs/*__cluster__dump_prometheus_db/prometheus.tar.dummy
+    # <artifact_dir>/metrics/
+    if not prom_tarball.name.endswith(".dummy"):
+        return None
+
+    metrics_dir = prom_tarball.parents[2] / METRICS_DIRNAME
+
+    return metrics_dir if metrics_dir.is_dir() else None
+
+
+def get_metric_file(metrics_dir, metric_name):
+    # same naming as cluster_query_prometheus_db/files/query_prometheus.py
+    return metrics_dir / (metric_name.replace(".*", "") + ".json")
+
+
+def _get_file_fingerprint(path):
+    stat = path.stat()
+
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def convert_metric_file(metric_file, columns_dir):
+    """
+    Converts the JSON samples of a query into the columnar files.
+    """
+
+    with open(metric_file) as f:
+        series = json.load(f)
+
+    index = dict(version=COLUMNS_VERSION, source=_get_file_fingerprint(metric_file), labels=[], series=[])
+
+    # the label sets are stored once, and referenced by the series
+    labels_idx = {}
+    all_timestamps = []
+    all_values = []
+    offset = 0
+    for current_series in series:
+        labels = current_series["metric"]
+        labels_key = json.dumps(labels, sort_keys=True)
+        if labels_key not in labels_idx:
+            labels_idx[labels_key] = len(index["labels"])
+            index["labels"].append(labels)
+
+        # sorted by timestamp, for the SeriesValues lookups
+        samples = sorted(current_series["values"], key=lambda ts_val: ts_val[0])
+        all_timestamps += [ts for ts, _ in samples]
+        all_values += [value for _, value in samples]
+
+        index["series"].append(dict(labels=labels_idx[labels_key], offset=offset, length=len(samples)))
+        offset += len(samples)
+
+    timestamps_dtype = numpy.int64 if all(isinstance(ts, int) for ts in all_timestamps) else numpy.float64
+
+    tmp_dir = pathlib.Path(tempfile.mkdtemp(dir=columns_dir.parent, prefix=f".{columns_dir.name}."))
+    try:
+        numpy.save(tmp_dir / TIMESTAMPS_FILENAME, numpy.array(all_timestamps, dtype=timestamps_dtype))
+        # the values are strings in the JSON files ("NaN" and "+Inf" included)
+        numpy.save(tmp_dir / VALUES_FILENAME, numpy.array(all_values, dtype=numpy.float64))
+        with open(tmp_dir / INDEX_FILENAME, "w") as f:
+            json.dump(index, f)
+
+        shutil.rmtree(columns_dir, ignore_errors=True)
+        tmp_dir.rename(columns_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _arrays_cache.pop(columns_dir, None)
+
+
+def load_metric_columns(columns_dir, metric_file):
+    """
+    Loads the series of a query from its columnar files, or returns None if they are outdated.
+    """
+
+    with open(columns_dir / INDEX_FILENAME) as f:
+        index = json.load(f)
+
+    if index["version"] != COLUMNS_VERSION or index["source"] != _get_file_fingerprint(metric_file):
+        return None
+
+    timestamps, values = _load_arrays(columns_dir)
+
+    series = []
+    for entry in index["series"]:
+        offset, length = entry["offset"], entry["length"]
+
+        metric = types.SimpleNamespace()
+        metric.metric = index["labels"][entry["labels"]]
+        metric.values = SeriesValues(columns_dir, offset, length,
+                                     timestamps[offset:offset+length], values[offset:offset+length])
+        series.append(metric)
+
+    return series
+
+
+def load_metric(metric_file):
+    """
+    Returns the series of a query, converting its JSON file if necessary.
+    """
+
+    columns_dir = metric_file.with_name(metric_file.stem + COLUMNS_DIRNAME_SUFFIX)
+
+    try:
+        series = load_metric_columns(columns_dir, metric_file)
+        if series is not None:
+            return series
+    except FileNotFoundError:
+        pass # not converted yet
+    except Exception as e:
+        logging.warning(f"{columns_dir}: could not reload the metric columns: {e}")
+
+    convert_metric_file(metric_file, columns_dir)
+
+    return load_metric_columns(columns_dir, metric_file)
+
+
+def extract_metrics(metrics_dir, metrics):
+    """
+    Loads the queried metrics available in metrics_dir.
+
+    Returns the metrics, and the list of the metrics that could not be found.
+    """
+
+    extracted_metrics = {}
+    missing_metrics = []
+    for metric in metrics:
+        if isinstance(metric, dict):
+            [(metric_name, metric_query)] = metric.items()
+        else:
+            metric_name = metric
+
+        metric_file = get_metric_file(metrics_dir, metric_name)
+        if not metric_file.exists():
+            missing_metrics.append(metric)
+            continue
+
+        extracted_metrics[metric_name] = load_metric(metric_file)
+
+    return extracted_metrics, missing_metrics
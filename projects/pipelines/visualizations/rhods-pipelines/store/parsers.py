@@ -1,6 +1,7 @@
 import types
 import pathlib
 import logging
+import functools
 import yaml
 import os
 import json
@@ -56,6 +57,7 @@ PARSER_VERSION = "2023-06-05"
 ARTIFACTS_VERSION = "2023-06-05"
 
 def ignore_file_not_found(fn):
+    @functools.wraps(fn)
     def decorator(*args, **kwargs):
         try:
             return fn(*args, **kwargs)
@@ -186,15 +188,11 @@ def _parse_tester_job(dirname):
         job = yaml.safe_load(f)
 
     job_info.creation_time = \
-        datetime.datetime.strptime(
-            job["status"]["startTime"],
-            helpers_store_parsers.K8S_TIME_FMT)
+        helpers_store_parsers.parse_k8s_time(job["status"]["startTime"])
 
     if job["status"].get("completionTime"):
         job_info.completion_time = \
-            datetime.datetime.strptime(
-                job["status"]["completionTime"],
-                helpers_store_parsers.K8S_TIME_FMT)
+            helpers_store_parsers.parse_k8s_time(job["status"]["completionTime"])
     else:
         job_info.completion_time = job_info.creation_time + datetime.timedelta(hours=1)
 
@@ -222,6 +220,7 @@ def _extract_metrics(dirname):
     return helpers_store_parsers.extract_metrics(dirname, db_files)
 
 
+@helpers_store.cache_parser
 @ignore_file_not_found
 def _parse_pod_times(dirname, ci_pod_dir):
     filenames = [fname.relative_to(dirname) for fname in
@@ -230,7 +229,7 @@ def _parse_pod_times(dirname, ci_pod_dir):
     pod_times = []
 
     def _parse_pod_times_file(filename, pod):
-        pod_time = types.SimpleNamespace()
+        pod_time = helpers_store_parsers.parse_pod_time(pod)
         pod_times.append(pod_time)
         pod_time.is_pipeline_task = False
         pod_time.is_dspa = False
@@ -256,40 +255,8 @@ def _parse_pod_times(dirname, ci_pod_dir):
             pod_name = pod["metadata"]["name"]
             pod_friendly_name = pod_name
 
-        pod_time.pod_name = pod["metadata"]["name"]
         pod_time.pod_friendly_name = pod_friendly_name
         pod_time.pod_namespace = pod["metadata"]["namespace"]
-        pod_time.hostname = pod["spec"].get("nodeName")
-
-        pod_time.creation_time = datetime.datetime.strptime(
-                pod["metadata"]["creationTimestamp"], helpers_store_parsers.K8S_TIME_FMT)
-
-        start_time_str = pod["status"].get("startTime")
-        pod_time.start_time = None if not start_time_str else \
-            datetime.datetime.strptime(start_time_str, helpers_store_parsers.K8S_TIME_FMT)
-
-        for condition in pod["status"].get("conditions", []):
-            last_transition = datetime.datetime.strptime(condition["lastTransitionTime"], helpers_store_parsers.K8S_TIME_FMT)
-
-            if condition["type"] == "ContainersReady":
-                pod_time.containers_ready = last_transition
-
-            elif condition["type"] == "Initialized":
-                pod_time.pod_initialized = last_transition
-            elif condition["type"] == "PodScheduled":
-                pod_time.pod_scheduled = last_transition
-
-        for containerStatus in pod["status"].get("containerStatuses", []):
-            try:
-                finishedAt =  datetime.datetime.strptime(
-                    containerStatus["state"]["terminated"]["finishedAt"],
-                    helpers_store_parsers.K8S_TIME_FMT)
-            except KeyError: continue
-
-            # take the last container_finished found
-            if ("container_finished" not in pod_time.__dict__
-                or pod_time.container_finished < finishedAt):
-                pod_time.container_finished = finishedAt
 
         if "container_finished" not in pod_time.__dict__:
             pod_time.container_finished = False
@@ -313,6 +280,7 @@ def _parse_pod_times(dirname, ci_pod_dir):
     return pod_times
 
 
+@helpers_store.cache_parser
 def _parse_resource_times(dirname, ci_pod_dir):
     all_resource_times = {}
     logging.info(f"Parsing {ci_pod_dir.name} ...")
@@ -336,8 +304,7 @@ def _parse_resource_times(dirname, ci_pod_dir):
                 metadata = item["metadata"]
 
                 kind = item["kind"]
-                creationTimestamp = datetime.datetime.strptime(
-                    metadata["creationTimestamp"], helpers_store_parsers.K8S_TIME_FMT)
+                creationTimestamp = helpers_store_parsers.parse_k8s_time(metadata["creationTimestamp"])
 
                 name = metadata["name"]
                 generate_name, found, suffix = name.rpartition("-")
@@ -377,8 +344,7 @@ def _parse_workflow_run_names(dirname, ci_pod_dir):
                 metadata = item["metadata"]
 
                 kind = item["kind"]
-                creationTimestamp = datetime.datetime.strptime(
-                    metadata["creationTimestamp"], helpers_store_parsers.K8S_TIME_FMT)
+                creationTimestamp = helpers_store_parsers.parse_k8s_time(metadata["creationTimestamp"])
 
                 name = metadata["name"]
                 generate_name, found, suffix = name.rpartition("-")
@@ -421,8 +387,7 @@ def _parse_workflow_start_times(dirname, ci_pod_dir):
                 metadata = item["metadata"]
                 status = item["status"]
                 kind = item["kind"]
-                creationTimestamp = datetime.datetime.strptime(
-                    metadata["creationTimestamp"], helpers_store_parsers.K8S_TIME_FMT)
+                creationTimestamp = helpers_store_parsers.parse_k8s_time(metadata["creationTimestamp"])
 
                 name = metadata["name"]
                 generate_name, found, suffix = name.rpartition("-")
@@ -437,8 +402,7 @@ def _parse_workflow_start_times(dirname, ci_pod_dir):
                         if node_spec["templateName"] == "root":
                             root_node = node_spec
                             break
-                    all_workflow_start_times[f"{name}"] = datetime.datetime.strptime(
-                        root_node["startedAt"], helpers_store_parsers.K8S_TIME_FMT)
+                    all_workflow_start_times[f"{name}"] = helpers_store_parsers.parse_k8s_time(root_node["startedAt"])
 
     parse("workflow.json")
 
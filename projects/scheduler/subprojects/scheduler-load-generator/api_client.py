@@ -0,0 +1,319 @@
+import os
+import ssl
+import json
+import time
+import types
+import socket
+import base64
+import pathlib
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.parse
+import concurrent.futures
+
+import yaml
+
+# Creates the resources with direct calls to the K8s API server,
+# over persistent HTTP(S) connections, instead of launching one
+# `oc create` process per resource.
+
+SERVICE_ACCOUNT_DIR = pathlib.Path("/run/secrets/kubernetes.io/serviceaccount")
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_TIMEOUT = 60 # seconds
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        super().connect()
+        # the small creation requests should not wait for the delayed ACKs
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+# the plural of the kinds created by the load generator
+RESOURCE_PLURALS = {
+    "Job": "jobs",
+    "AppWrapper": "appwrappers",
+    "PyTorchJob": "pytorchjobs",
+    "PodGroup": "podgroups",
+    "Workload": "workloads",
+    "Pod": "pods",
+    "ConfigMap": "configmaps",
+    "Secret": "secrets",
+}
+
+
+def _get_named(entries, name):
+    for entry in entries or []:
+        if entry["name"] == name:
+            return entry
+
+    raise KeyError(f"'{name}' not found in the kubeconfig")
+
+
+def load_api_config():
+    """
+    Loads the API server location and credentials, from the KUBECONFIG
+    or from the Pod service account.
+    """
+
+    api_config = types.SimpleNamespace(
+        server=None,
+        token=None,
+        ca_file=None,
+        ca_data=None,
+        insecure=False,
+        client_cert=None,
+        client_key=None,
+        client_cert_data=None,
+        client_key_data=None,
+        proxy=None,
+    )
+
+    kubeconfig_path = os.environ.get("KUBECONFIG", "").split(os.pathsep)[0]
+    if not kubeconfig_path: # this makes it safe if KUBECONFIG == ""
+        kubeconfig_path = pathlib.Path(os.environ["HOME"]) / ".kube/config"
+
+    if not pathlib.Path(kubeconfig_path).exists() and (SERVICE_ACCOUNT_DIR / "token").exists():
+        api_config.server = f"https://{os.environ['KUBERNETES_SERVICE_HOST']}:{os.environ['KUBERNETES_SERVICE_PORT']}"
+        api_config.token = (SERVICE_ACCOUNT_DIR / "token").read_text().strip()
+        api_config.ca_file = str(SERVICE_ACCOUNT_DIR / "ca.crt")
+
+        return api_config
+
+    with open(kubeconfig_path) as f:
+        kubeconfig = yaml.safe_load(f)
+
+    context = _get_named(kubeconfig.get("contexts"), kubeconfig["current-context"])["context"]
+    cluster = _get_named(kubeconfig.get("clusters"), context["cluster"])["cluster"]
+    user = _get_named(kubeconfig.get("users"), context["user"])["user"] or {}
+
+    api_config.server = cluster["server"]
+    api_config.proxy = cluster.get("proxy-url")
+    api_config.insecure = cluster.get("insecure-skip-tls-verify", False)
+    api_config.ca_file = cluster.get("certificate-authority")
+    if cluster.get("certificate-authority-data"):
+        api_config.ca_data = base64.b64decode(cluster["certificate-authority-data"]).decode()
+
+    api_config.token = user.get("token")
+
+    api_config.client_cert = user.get("client-certificate")
+    api_config.client_key = user.get("client-key")
+    # kept in memory, written to disk only while the SSL context loads them
+    if user.get("client-certificate-data"):
+        api_config.client_cert_data = base64.b64decode(user["client-certificate-data"])
+    if user.get("client-key-data"):
+        api_config.client_key_data = base64.b64decode(user["client-key-data"])
+
+    if not api_config.token and not (api_config.client_cert or api_config.client_cert_data):
+        api_config.token = subprocess.run("oc whoami -t", capture_output=True, text=True, shell=True, check=True).stdout.strip()
+
+    return api_config
+
+
+def get_resource_path(resource):
+    """
+    Returns the API path where the resource should be POSTed.
+    """
+
+    group, _, version = resource["apiVersion"].rpartition("/")
+    prefix = f"/apis/{group}/{version}" if group else f"/api/{version}"
+
+    namespace = resource["metadata"].get("namespace")
+    if not namespace:
+        raise ValueError(f"{resource['kind']}/{resource['metadata'].get('name')} has no namespace ...")
+
+    try:
+        plural = RESOURCE_PLURALS[resource["kind"]]
+    except KeyError:
+        raise ValueError(f"{resource['kind']}: unknown resource kind, add its plural to api_client.RESOURCE_PLURALS") from None
+
+    return f"{prefix}/namespaces/{namespace}/{plural}"
+
+
+class ApiCreator():
+    """
+    Creates the resources in the background, with at most
+    `max_in_flight` concurrent requests. Each worker thread keeps its
+    own persistent connection to the API server.
+    """
+
+    def __init__(self, api_config, max_in_flight=DEFAULT_MAX_IN_FLIGHT, timeout=DEFAULT_TIMEOUT):
+        self.api_config = api_config
+        self.timeout = timeout
+
+        url = urllib.parse.urlparse(api_config.server)
+        self.https = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port or (443 if self.https else 80)
+        self.path_prefix = url.path.rstrip("/")
+
+        self.ssl_context = self._get_ssl_context() if self.https else None
+
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        if api_config.token:
+            self.headers["Authorization"] = f"Bearer {api_config.token}"
+
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight,
+                                                              thread_name_prefix="api-creator")
+
+    def _get_ssl_context(self):
+        if self.api_config.insecure:
+            ssl_context = ssl._create_unverified_context()
+        else:
+            ssl_context = ssl.create_default_context(cafile=self.api_config.ca_file,
+                                                     cadata=self.api_config.ca_data)
+
+        if self.api_config.client_cert_data or self.api_config.client_key_data:
+            # the ssl module only loads the client certificates from
+            # files. They are removed as soon as they are loaded.
+            with tempfile.TemporaryDirectory(prefix="api-creator-") as tmp_dir:
+                client_cert = self.api_config.client_cert
+                if self.api_config.client_cert_data:
+                    client_cert = pathlib.Path(tmp_dir) / "client.crt"
+                    client_cert.write_bytes(self.api_config.client_cert_data)
+
+                client_key = self.api_config.client_key
+                if self.api_config.client_key_data:
+                    client_key = pathlib.Path(tmp_dir) / "client.key"
+                    client_key.write_bytes(self.api_config.client_key_data)
+
+                ssl_context.load_cert_chain(client_cert, client_key)
+
+        elif self.api_config.client_cert:
+            ssl_context.load_cert_chain(self.api_config.client_cert, self.api_config.client_key)
+
+        return ssl_context
+
+    def _new_connection(self):
+        if self.api_config.proxy:
+            proxy = urllib.parse.urlparse(self.api_config.proxy)
+            host, port = proxy.hostname, proxy.port
+        else:
+            host, port = self.host, self.port
+
+        if self.https:
+            connection = _HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        else:
+            connection = _HTTPConnection(host, port, timeout=self.timeout)
+
+        if self.api_config.proxy:
+            connection.set_tunnel(self.host, self.port)
+
+        with self._connections_lock:
+            self._connections.append(connection)
+
+        return connection
+
+    def _get_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._new_connection()
+
+        return connection
+
+    def _post(self, path, body):
+        """
+        POSTs the body, and returns the HTTP status, the response and
+        whether the request has been retried.
+        """
+
+        retried = False
+        while True:
+            connection = self._get_connection()
+            # sock is None until the connection is first used
+            reused = connection.sock is not None
+            try:
+                connection.request("POST", self.path_prefix + path, body=body, headers=self.headers)
+                response = connection.getresponse()
+
+                return response.status, response.read(), retried
+            except (http.client.HTTPException, OSError) as e:
+                # the connection can't be reused (timeout, SSL error, ...),
+                # its response may still be pending
+                connection.close()
+                self._local.connection = None
+
+                # only retry when a persistent connection was closed
+                # by the server while idle. The POST may still have
+                # reached the server, see the 409 check in _create.
+                if retried or not reused or not isinstance(e, (http.client.HTTPException, ConnectionError)):
+                    raise
+                retried = True
+
+    def _create(self, resource_json, submit_ts):
+        timing = dict(submit_ts=submit_ts, send_ts=None, ack_ts=None, status=None, error=None, retried=False)
+
+        # one resource per line, see utils.get_json_resource
+        for resource_line in resource_json.splitlines():
+            if not resource_line.strip(): continue
+
+            resource = json.loads(resource_line)
+            path = get_resource_path(resource)
+
+            send_ts = time.time()
+            if timing["send_ts"] is None:
+                timing["send_ts"] = send_ts
+
+            try:
+                status, response, retried = self._post(path, resource_line.encode())
+            except Exception as e:
+                timing["ack_ts"] = time.time()
+                timing["error"] = f"{e.__class__.__name__}: {e}"
+                break
+
+            timing["ack_ts"] = time.time()
+            timing["status"] = status
+            timing["retried"] |= retried
+
+            if retried and status == http.HTTPStatus.CONFLICT:
+                # the first attempt has created the resource before
+                # the connection was lost
+                continue
+
+            if not 200 <= status < 300:
+                try:
+                    message = json.loads(response)["message"]
+                except Exception:
+                    message = response.decode(errors="replace")
+
+                timing["error"] = f"{resource['kind']}/{resource['metadata'].get('name')}: HTTP {status}: {message}"
+                break
+
+        timing["latency"] = timing["ack_ts"] - timing["send_ts"] if timing["send_ts"] else None
+
+        return timing
+
+    def create(self, resource_json):
+        """
+        Creates the resource(s) of resource_json in the background.
+
+        Returns a Future, resolving to the timing of the creation:
+        submit_ts, send_ts, ack_ts (epoch seconds), latency, HTTP status, error
+        and whether a request has been retried.
+        """
+
+        return self.executor.submit(self._create, resource_json, time.time())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
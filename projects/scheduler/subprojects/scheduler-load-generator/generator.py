@@ -7,6 +7,7 @@ import pathlib
 import yaml, json
 from collections import defaultdict
 import datetime
+import time
 import logging
 logging.getLogger().setLevel(logging.INFO)
 import importlib
@@ -19,6 +20,7 @@ import k8s_quantity
 import scheduler
 
 import run, config, utils
+import api_client
 import job as job_mod
 import appwrapper as appwrapper_mod
 import kueue as kueue_mod
@@ -42,6 +44,12 @@ def main(dry_run=True,
          visualize=True,
 
          kueue_queue="local-queue",
+
+         creation_backend="oc",
+         max_in_flight=api_client.DEFAULT_MAX_IN_FLIGHT,
+
+         late_policy="burst",
+         max_lateness=1.0,
          ):
     """
     Generates workload for the MCAD load test
@@ -63,6 +71,12 @@ def main(dry_run=True,
       visualize: activate or deactive the visualization of the generator load distribution
 
       kueue_queue: name of the Kueue queue to use, in Kueue mode
+
+      creation_backend: 'oc' to create the resources with one 'oc create' process each, 'api' to send them directly to the API server
+      max_in_flight: maximum number of concurrent creation requests, in 'api' mode
+
+      late_policy: what to do with the resources whose creation is late: 'burst' to create them immediately, 'skip' to skip them if they are more than 'max_lateness' late
+      max_lateness: the maximum lateness (in seconds) tolerated in 'skip' late policy
     """
 
     config.load_config()
@@ -101,6 +115,16 @@ def main(dry_run=True,
         logging.error(f"Received an invalid mode: '{mode}'. Must in in {MODES}")
         sys.exit(1)
 
+    CREATION_BACKENDS = ("oc", "api")
+    if creation_backend not in CREATION_BACKENDS:
+        logging.error(f"Received an invalid creation backend: '{creation_backend}'. Must be in {CREATION_BACKENDS}")
+        sys.exit(1)
+
+    LATE_POLICIES = ("burst", "skip")
+    if late_policy not in LATE_POLICIES:
+        logging.error(f"Received an invalid late policy: '{late_policy}'. Must be in {LATE_POLICIES}")
+        sys.exit(1)
+
     logging.info(f"Running with a timespan of {timespan} minutes.")
     timespan_sec = timespan * 60
 
@@ -134,24 +158,50 @@ def main(dry_run=True,
     resource_json_template = utils.get_json_resource(resources)
     verbose_resource_creation = count < 50
 
+    creator = None
+    if creation_backend == "api" and not dry_run:
+        api_config = api_client.load_api_config()
+        logging.info(f"Creating the resources through {api_config.server}, with at most {max_in_flight} requests in flight.")
+        creator = api_client.ApiCreator(api_config, max_in_flight)
+
     processes = []
     schedule_result = []
-    def _create_resource(index, delay):
+    def _create_resource(index, delay, lateness):
         time_fct = (lambda : "{:.2f} minutes".format(float(scheduler.dry_run_time) / 60)) if dry_run \
             else (lambda : datetime.datetime.now().time())
 
         create_ts = str(time_fct())
-        name, process = utils.create_resource(resource_json_template, resource_name_template,
-                                                index, verbose_resource_creation, dry_run)
-        nonlocal processes
-        processes += [process]
 
-        schedule_result.append(dict(
+        # numeric timestamps (epoch seconds), derived from the
+        # scheduler clock to compare the planned and actual times
+        planned_ts = schedule.start_ts + float(delay)
+        result = dict(
             create=create_ts,
-            name=name,
+            name=resource_name_template.replace("{INDEX}", f"{index:03d}"),
             delay=float(delay),
-            index=index
-        ))
+            index=index,
+            planned_ts=planned_ts,
+            issue_ts=planned_ts + lateness,
+            lateness=lateness,
+            skipped=False,
+        )
+
+        nonlocal processes
+        schedule_result.append(result)
+
+        if late_policy == "skip" and lateness > max_lateness:
+            logging.warning(f"Skipping resource #{index}: {lateness:.2f}s late.")
+            result["skipped"] = True
+            processes += [None]
+            return
+
+        _, process = utils.create_resource(resource_json_template, resource_name_template,
+                                             index, verbose_resource_creation, dry_run, creator)
+        processes += [process]
+
+        if creator is None and not dry_run:
+            # 'oc create' has been launched. Its completion isn't tracked.
+            result["send_ts"] = time.time()
 
     times, schedule = scheduler.prepare(_create_resource, distribution, timespan_sec, count,
                                         dry_run=dry_run,
@@ -174,14 +224,55 @@ def main(dry_run=True,
     schedule.run()
 
     start_wait = datetime.datetime.now()
-    if not dry_run:
+    failed = False
+    if not dry_run and creator is None:
         for idx, proc in enumerate(processes):
+            if proc is None: continue # skipped
             if (ret := proc.wait()) != 0:
                 logging.error(f"Background call #{idx} to '{' '.join(proc.args)}' returned {ret} :/")
                 sys.exit(1)
 
+    elif not dry_run:
+        for idx, future in enumerate(processes):
+            if future is None: continue # skipped
+            timing = future.result()
+            schedule_result[idx] |= timing
+            if timing["error"]:
+                logging.error(f"API call #{idx} failed: {timing['error']}")
+                failed = True
+
+        creator.shutdown()
+
     end_wait = datetime.datetime.now()
-    logging.info(f"Had to wait a total of {(end_wait - start_wait).total_seconds():.1f}s to join all the {len(processes)} background processes.")
+    logging.info(f"Had to wait a total of {(end_wait - start_wait).total_seconds():.1f}s to join all the {len(processes)} background creations.")
+
+    lateness_summary = dict(
+        late_policy=late_policy,
+        count=len(schedule_result),
+        skipped=sum(1 for entry in schedule_result if entry["skipped"]),
+        # how late the creations were issued by the scheduler
+        issue_lateness=scheduler.get_percentiles([entry["lateness"] for entry in schedule_result
+                                                  if not entry["skipped"]]),
+        # how late the creations were sent to the API server
+        send_lateness=scheduler.get_percentiles([entry["send_ts"] - entry["planned_ts"] for entry in schedule_result
+                                                 if entry.get("send_ts")]),
+        # how long the API server took to acknowledge the creations
+        ack_latency=scheduler.get_percentiles([entry["ack_ts"] - entry["send_ts"] for entry in schedule_result
+                                               if entry.get("ack_ts") and entry.get("send_ts")]),
+    )
+
+    for key in "issue_lateness", "send_lateness", "ack_latency":
+        if not lateness_summary[key]: continue
+        logging.info(f"{key.replace('_', ' ').capitalize()}: " + ", ".join(f"{p}={v:.3f}s" for p, v in lateness_summary[key].items()))
+
+    if lateness_summary["skipped"]:
+        logging.warning(f"{lateness_summary['skipped']}/{lateness_summary['count']} resources have been skipped because of their lateness.")
+
+    schedule_lateness_dest = config.ARTIFACT_DIR / f"schedule_lateness.yaml"
+
+    logging.info(f"Saving the schedule lateness in {schedule_lateness_dest}")
+    with open(schedule_lateness_dest, "w") as f:
+        yaml.dump(lateness_summary, f, sort_keys=False)
 
     schedule_result_dest = config.ARTIFACT_DIR / f"schedule_result.json"
 
@@ -189,6 +280,10 @@ def main(dry_run=True,
     with open(schedule_result_dest, "w") as f:
         json.dump(schedule_result, f)
 
+    if failed:
+        logging.error("Some of the resources could not be created :/")
+        sys.exit(1)
+
     if visualize:
         import visualize_schedule
         visualize_schedule.main(config.ARTIFACT_DIR, schedule_result)
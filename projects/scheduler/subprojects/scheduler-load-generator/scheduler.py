@@ -45,7 +45,49 @@ class Timelines:
 
 dry_run_time = 0.0
 
+class Schedule():
+    """
+    Runs the method at the planned times. The time reference is taken
+    when the schedule starts running, so that the preparation time
+    isn't counted as lateness.
+    """
+
+    def __init__(self, method, distributed_times, timefunc, delayfunc):
+        self.method = method
+        self.distributed_times = distributed_times
+        self.timefunc = timefunc
+        self.delayfunc = delayfunc
+
+        self.start_time = None # in the timefunc reference
+        self.start_ts = None # epoch timestamp
+
+    def _run_event(self, index, delay):
+        lateness = self.timefunc() - (self.start_time + delay)
+
+        self.method(index, delay, lateness)
+
+    def run(self):
+        scheduler = sched.scheduler(self.timefunc, self.delayfunc)
+
+        self.start_time = self.timefunc()
+        self.start_ts = time.time()
+
+        for index, delay in enumerate(self.distributed_times):
+            # the late events run immediately, in their planned order
+            scheduler.enterabs(self.start_time + delay, 1, self._run_event, argument=[index, delay])
+
+        scheduler.run()
+
+
 def prepare(method, distribution, timespan, instances, rng_seed=RNG_SEED, dry_run=False, verbose_dry_run=True):
+    """
+    Prepares the schedule of the `instances` calls to `method(index, delay, lateness)`.
+
+    `delay` is the planned time of the call (in seconds since the
+    beginning of the schedule), and `lateness` how late (in seconds)
+    the call actually happens.
+    """
+
     distribution_func = getattr(Timelines, distribution, None)
     if distribution_func is None:
         raise ValueError(f"Invalid distribution name '{distribution}'. "
@@ -69,9 +111,20 @@ def prepare(method, distribution, timespan, instances, rng_seed=RNG_SEED, dry_ru
     params = (time_monotonic, time_sleep) if dry_run \
         else (time.monotonic, time.sleep)
 
-    scheduler = sched.scheduler(*params)
+    schedule = Schedule(method, distributed_times, *params)
+
+    return distributed_times, schedule
+
+
+LATENESS_PERCENTILES = (50, 90, 99, 100)
+
+def get_percentiles(values):
+    """
+    Returns the LATENESS_PERCENTILES of the values, as a {"pXX": value} dict.
+    """
 
-    for index, delay in enumerate(distributed_times):
-        scheduler.enter(delay, 1, method, argument=[index, delay])
+    values = [v for v in values if v is not None]
+    if not values:
+        return {}
 
-    return distributed_times, scheduler
+    return {f"p{p}": float(v) for p, v in zip(LATENESS_PERCENTILES, np.percentile(values, LATENESS_PERCENTILES))}
@@ -5,7 +5,7 @@ import yaml, json
 import config, run
 
 def create_resource(resource_json_template, resource_name_template,
-                      index, verbose_resource_creation, dry_run):
+                      index, verbose_resource_creation, dry_run, creator=None):
     K8S_TIME_FMT = "%Y-%m-%dT%H:%M:%SZ"
     schedule_time = datetime.datetime.now().strftime(K8S_TIME_FMT)
     resource_json = resource_json_template
@@ -20,10 +20,13 @@ def create_resource(resource_json_template, resource_name_template,
     if index == 0:
         logging.info(f"First resource: {resource_json}")
 
-    if not dry_run:
-        process = run.run_in_background("oc create -f-".split(" "), input=resource_json, verbose=verbose_resource_creation, capture_stdout=not verbose_resource_creation)
-    else:
+    if dry_run:
         process = None
+    elif creator is not None:
+        # returns a Future instead of a process
+        process = creator.create(resource_json)
+    else:
+        process = run.run_in_background("oc create -f-".split(" "), input=resource_json, verbose=verbose_resource_creation, capture_stdout=not verbose_resource_creation)
 
     return resource_name, process
 
@@ -56,5 +56,15 @@ def main(artifact_dir=pathlib.Path("."), schedule_result=None):
          "Duration between two resource creations, in seconds",
          )
 
+    if "lateness" not in df:
+        return
+
+    logging.info("Generating the lateness timeline ...")
+    save(px.scatter(df, x="delay", y="lateness", color="skipped"),
+         "creation lateness timeline", "lateness",
+         artifact_dir,
+         "Planned creation time, in seconds",
+         )
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -30,6 +30,9 @@ class Scheduler:
             scheduler_load_generator="projects/scheduler/subprojects/scheduler-load-generator/generator.py",
             kueue_queue="local-queue",
             resource_kind="job",
+            creation_backend="oc",
+            late_policy="burst",
+            max_lateness=1.0,
     ):
         """
         Generate scheduler load
@@ -50,6 +53,9 @@ class Scheduler:
           scheduler_load_generator: the path of the scheduler load generator to launch
           kueue_queue: the name of the Kueue queue to use
           resource_kind: the kind of resource created by the load generator
+          creation_backend: the backend used to create the resources: 'oc' (one 'oc create' process per resource) or 'api' (persistent connections to the API server)
+          late_policy: what to do with the resources whose creation is late: 'burst' to create them immediately, 'skip' to skip them if they are more than 'max_lateness' late
+          max_lateness: the maximum lateness (in seconds) tolerated in 'skip' late policy
         """
 
         return RunAnsibleRole(locals())
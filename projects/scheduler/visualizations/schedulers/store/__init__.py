@@ -33,6 +33,7 @@ local_store = helpers_store.BaseStore(
 
 parsers.register_important_file = local_store.register_important_file
 build_lts_payloads = local_store.build_lts_payloads
+parse_data = local_store.parse_data
 is_mandatory_file = local_store.is_mandatory_file
 is_cache_file = local_store.is_cache_file
 is_important_file = local_store.is_important_file
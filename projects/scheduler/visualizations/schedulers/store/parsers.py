@@ -1,6 +1,7 @@
 import types
 import pathlib
 import logging
+import functools
 import yaml
 import os
 import json
@@ -52,6 +53,7 @@ IMPORTANT_FILES = [
 ]
 
 def ignore_file_not_found(fn):
+    @functools.wraps(fn)
     def decorator(*args, **kwargs):
         try:
             return fn(*args, **kwargs)
@@ -115,6 +117,7 @@ def _extract_metrics(dirname):
     return helpers_store_parsers.extract_metrics(dirname, db_files)
 
 
+@helpers_store.cache_parser
 @ignore_file_not_found
 def _parse_pod_times(dirname):
     filename = artifact_paths.SCHEDULER_GENERATE_LOAD_DIR / "pods.json"
@@ -128,58 +131,21 @@ def _parse_pod_times(dirname):
 
     pod_times = []
     for pod in json_file["items"]:
-      pod_time = types.SimpleNamespace()
+      pod_time = helpers_store_parsers.parse_pod_time(pod)
       pod_times.append(pod_time)
 
-      pod_time.pod_name = pod["metadata"]["name"]
-
       pod_friendly_name = pod["metadata"]["labels"].get("job-name")
       if pod_friendly_name is None:
           pod_friendly_name = pod["metadata"]["labels"].get("training.kubeflow.org/job-name")
 
       pod_time.pod_friendly_name = pod_friendly_name
-      pod_time.hostname = pod["spec"].get("nodeName")
-
-      pod_time.creation_time = datetime.datetime.strptime(
-              pod["metadata"]["creationTimestamp"], helpers_store_parsers.K8S_TIME_FMT)
-
-      start_time_str = pod["status"].get("startTime")
-      pod_time.start_time = None if not start_time_str else \
-          datetime.datetime.strptime(start_time_str, helpers_store_parsers.K8S_TIME_FMT)
-      pod_time.conditions = {}
-
-      for condition in pod["status"].get("conditions", []):
-          last_transition = datetime.datetime.strptime(condition["lastTransitionTime"], helpers_store_parsers.K8S_TIME_FMT)
-
-          pod_time.conditions[condition["type"]] = last_transition
-
-          if condition["type"] == "ContainersReady":
-              pod_time.containers_ready = last_transition
-          elif condition["type"] == "Initialized":
-              pod_time.pod_initialized = last_transition
-          elif condition["type"] == "PodScheduled":
-              pod_time.pod_scheduled = last_transition
-
-      for containerStatus in pod["status"].get("containerStatuses", []):
-          try:
-              finishedAt =  datetime.datetime.strptime(
-                  containerStatus["state"]["terminated"]["finishedAt"],
-                  helpers_store_parsers.K8S_TIME_FMT)
-          except KeyError: continue
-
-          # take the last container_finished found
-          if ("container_finished" not in pod_time.__dict__
-              or pod_time.container_finished < finishedAt):
-              pod_time.container_finished = finishedAt
 
     return pod_times
 
 
 def __parse_appwrapper_times(item, resource_times):
     if "annotations" in item["metadata"] and "scheduleTime" in item["metadata"]["annotations"]:
-        resource_times.conditions["OC Created"] = datetime.datetime.strptime(
-            item["metadata"]["annotations"]["scheduleTime"],
-            helpers_store_parsers.K8S_TIME_FMT)
+        resource_times.conditions["OC Created"] = helpers_store_parsers.parse_k8s_time(item["metadata"]["annotations"]["scheduleTime"])
 
     elif not missing_label_warning_printed:
         missing_label_warning_printed = True
@@ -191,32 +157,24 @@ def __parse_appwrapper_times(item, resource_times):
     if not item.get("status"): return
 
     if "controllerfirsttimestamp" in item["status"]:
-        resource_times.conditions["Discovered"] = datetime.datetime.strptime(
-            item["status"]["controllerfirsttimestamp"],
-            helpers_store_parsers.K8S_TIME_MILLI_FMT)
+        resource_times.conditions["Discovered"] = helpers_store_parsers.parse_k8s_time(item["status"]["controllerfirsttimestamp"])
 
     for condition in item["status"].get("conditions", []):
         if condition.get("reason") != "PodsCompleted": continue
         if condition.get("status") != "True": continue
         if condition.get("type") != "Completed": continue
         resource_times.completion = \
-            datetime.datetime.strptime(
-                condition["lastUpdateMicroTime"],
-                helpers_store_parsers.K8S_TIME_MILLI_FMT)
+            helpers_store_parsers.parse_k8s_time(condition["lastUpdateMicroTime"])
         break
 
     for condition in item["status"]["conditions"]:
         resource_times.conditions[condition["type"]] = \
-            datetime.datetime.strptime(
-                condition["lastUpdateMicroTime"],
-                helpers_store_parsers.K8S_TIME_MILLI_FMT)
+            helpers_store_parsers.parse_k8s_time(condition["lastUpdateMicroTime"])
 
 
 def __parse_job_times(item, resource_times):
     resource_times.completion = \
-        datetime.datetime.strptime(
-            item["status"].get("completionTime"),
-            helpers_store_parsers.K8S_TIME_FMT) \
+        helpers_store_parsers.parse_k8s_time(item["status"].get("completionTime")) \
             if item["status"].get("completionTime") else None
 
 
@@ -227,31 +185,23 @@ def __parse_workload_times(item, resource_times):
 
     for condition in item["status"]["conditions"]:
         resource_times.conditions[condition["reason"]] = \
-            datetime.datetime.strptime(
-                condition["lastTransitionTime"],
-                helpers_store_parsers.K8S_TIME_FMT)
+            helpers_store_parsers.parse_k8s_time(condition["lastTransitionTime"])
 
 
 def __parse_pytorchjob_times(item, resource_times):
     resource_times.conditions["ETCD Created"] = resource_times.creation
 
     resource_times.start = \
-        datetime.datetime.strptime(
-            item["status"].get("startTime"),
-            helpers_store_parsers.K8S_TIME_FMT) \
+        helpers_store_parsers.parse_k8s_time(item["status"].get("startTime")) \
             if item["status"].get("startTime") else None
 
     resource_times.completion = \
-        datetime.datetime.strptime(
-            item["status"].get("completionTime"),
-            helpers_store_parsers.K8S_TIME_FMT) \
+        helpers_store_parsers.parse_k8s_time(item["status"].get("completionTime")) \
             if item["status"].get("completionTime") else None
 
     for condition in item["status"]["conditions"]:
         resource_times.conditions[condition["reason"]] = \
-            datetime.datetime.strptime(
-                condition["lastTransitionTime"],
-                helpers_store_parsers.K8S_TIME_FMT)
+            helpers_store_parsers.parse_k8s_time(condition["lastTransitionTime"])
 
     if resource_times.start and resource_times.completion:
         resource_times.duration = (resource_times.completion - resource_times.start).total_seconds()
@@ -259,6 +209,7 @@ def __parse_pytorchjob_times(item, resource_times):
         resource_times.duration = None
 
 
+@helpers_store.cache_parser
 @ignore_file_not_found
 def _parse_resource_times(dirname, mode, resource_type):
     all_resource_times = {}
@@ -279,8 +230,7 @@ def _parse_resource_times(dirname, mode, resource_type):
             metadata = item["metadata"]
 
             kind = item["kind"]
-            creationTimestamp = datetime.datetime.strptime(
-                metadata["creationTimestamp"], helpers_store_parsers.K8S_TIME_FMT)
+            creationTimestamp = helpers_store_parsers.parse_k8s_time(metadata["creationTimestamp"])
 
             name = metadata["name"]
             if kind == "Pod":
@@ -336,9 +286,7 @@ def _parse_test_start_end_time(dirname):
 
     for cm in start_end_cm["items"]:
         name = cm["metadata"]["name"]
-        ts = datetime.datetime.strptime(
-            cm["metadata"]["creationTimestamp"],
-            helpers_store_parsers.K8S_TIME_FMT)
+        ts = helpers_store_parsers.parse_k8s_time(cm["metadata"]["creationTimestamp"])
         test_start_end_time.__dict__[name] = ts
 
     logging.debug(f'Start time: {test_start_end_time.start}')
@@ -358,9 +306,7 @@ def _parse_cleanup_start_end_time(dirname):
 
     for cm in configmaps["items"]:
         name = cm["metadata"]["name"]
-        ts = datetime.datetime.strptime(
-            cm["metadata"]["creationTimestamp"],
-            helpers_store_parsers.K8S_TIME_FMT)
+        ts = helpers_store_parsers.parse_k8s_time(cm["metadata"]["creationTimestamp"])
         cleanup_times.__dict__[name] = ts
 
     logging.debug(f'Start time: {cleanup_times.start}')
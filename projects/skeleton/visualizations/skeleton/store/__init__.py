@@ -35,6 +35,7 @@ def _rewrite_settings(settings_dict):
     return settings_dict
 
 build_lts_payloads = local_store.build_lts_payloads
+parse_data = local_store.parse_data
 parsers.register_important_file = local_store.register_important_file
 # delegate the parsing to the simple_store
 store.register_custom_rewrite_settings(_rewrite_settings)
@@ -10,6 +10,73 @@ if [[ -z "${STORAGE_DIR:-}" ]]; then
     STORAGE_DIR=/storage
 fi
 
+if [[ -z "${CHECKSUM_PARALLEL:-}" ]]; then
+    CHECKSUM_PARALLEL=$(nproc)
+fi
+
+# Computes the sha256sum of the files of the source, with
+# CHECKSUM_PARALLEL sha256sum processes.
+#
+# The size, mtime and hash of the files are recorded in a manifest,
+# next to the source directory:
+#   <size>\t<mtime>\t<sha256sum>\t<path>
+compute_checksums() {
+    local source_name=$1
+    local manifest="${source_name}.manifest"
+    local tmp_dir
+    tmp_dir=$(mktemp -d)
+
+    find "./$source_name" ! -path '*/.git/*' -type f -printf '%s\t%T@\t%p\n' > "$tmp_dir/current"
+
+    echo "$(wc -l < "$tmp_dir/current") files to hash with $CHECKSUM_PARALLEL processes ..."
+
+    cut -f3 "$tmp_dir/current" \
+        | tr '\n' '\0' \
+        | xargs -0 --no-run-if-empty -P "$CHECKSUM_PARALLEL" -n 16 sha256sum \
+                > "$tmp_dir/hashed"
+
+    # sha256sum output: <64 hex chars><2 spaces><path>
+    awk -F'\t' -v OFS='\t' '
+        FILENAME == ARGV[1] { hash[substr($0, 67)] = substr($0, 1, 64); next }
+        $3 in hash { print $1, $2, hash[$3], $3 }
+    ' "$tmp_dir/hashed" "$tmp_dir/current" \
+        | sort -t$'\t' -k4 \
+               > "$tmp_dir/manifest"
+
+    mv "$tmp_dir/manifest" "$manifest"
+    rm -rf "$tmp_dir"
+
+    awk -F'\t' '{ print $3 "  " $4 }' "$manifest" > "${source_name}.sha256sum"
+}
+
+# Tells if the source is the one recorded in its manifest: same files,
+# with the same size and mtime. The source is then complete, and its
+# checksums are known.
+is_source_unchanged() {
+    local source_name=$1
+    local manifest="${source_name}.manifest"
+
+    [[ -s "$manifest" ]] || return 1
+
+    diff -q <(cut -f1,2,4 "$manifest" | sort) \
+            <(find "./$source_name" ! -path '*/.git/*' -type f -printf '%s\t%T@\t%p\n' | sort) \
+         > /dev/null
+}
+
+show_source() {
+    cat "${SOURCE_NAME}.sha256sum"
+
+    echo "---"
+
+    du -sh "./$SOURCE_NAME"
+
+    echo "---"
+
+    df -h "$STORAGE_DIR"
+
+    echo "---"
+}
+
 if [[ "$CLEAN_FIRST" == True ]]; then
     rm "$STORAGE_DIR" -rf
 fi
@@ -24,10 +91,22 @@ df -h "$STORAGE_DIR"
 echo "---"
 
 if [[ -e "$STORAGE_DIR/$SOURCE_NAME" ]]; then
+    if (cd "$STORAGE_DIR" && is_source_unchanged "$SOURCE_NAME"); then
+        echo "$STORAGE_DIR/$SOURCE_NAME already downloaded, and unchanged since its checksums were computed. Keeping it."
+
+        cd "$STORAGE_DIR"
+        show_source
+
+        exit 0
+    fi
+
     echo "Warning: $STORAGE_DIR/$SOURCE_NAME already exists :/  Cleaning it up."
     rm -rfv "$STORAGE_DIR/$SOURCE_NAME"
 fi
 
+# downloaded again, the checksums of the previous run don't apply anymore
+rm -f "$STORAGE_DIR/${SOURCE_NAME}.manifest" "$STORAGE_DIR/${SOURCE_NAME}.sha256sum"
+
 if [[ "$DOWNLOAD_SOURCE" == "https://huggingface.co/"* ]];
 then
     dnf install --quiet -y git-lfs
@@ -154,16 +233,8 @@ echo "All done!"
 
 cd "$STORAGE_DIR"
 
-time find "./$SOURCE_NAME" ! -path '*/.git/*' -type f -exec sha256sum {} \; | tee -a "${SOURCE_NAME}.sha256sum"
+time compute_checksums "$SOURCE_NAME"
 
-echo "---"
-
-du -sh "./$SOURCE_NAME"
-
-echo "---"
-
-df -h "$STORAGE_DIR"
-
-echo "---"
+show_source
 
 exit 0
@@ -0,0 +1,38 @@
+import sys
+import types
+import pathlib
+import importlib
+
+TOPSAIL_DIR = pathlib.Path(__file__).absolute().parents[1]
+
+sys.path.insert(0, str(TOPSAIL_DIR))
+
+HELPERS_PACKAGES = [
+    "projects.matrix_benchmarking.visualizations.helpers.store",
+    "projects.matrix_benchmarking.visualizations.helpers.analyze",
+]
+
+
+def _register_helpers_packages():
+    # the __init__ of the visualization helpers packages need the
+    # matrix_benchmarking submodule. When it isn't checked out, the
+    # packages are registered without running their __init__, so that
+    # their standalone modules (llm_load_test, prom_queries, ...) can
+    # still be imported.
+    try:
+        import matrix_benchmarking # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    for package_name in HELPERS_PACKAGES:
+        parent_name, _, name = package_name.rpartition(".")
+        parent = importlib.import_module(parent_name)
+
+        package = types.ModuleType(package_name)
+        package.__path__ = [str(TOPSAIL_DIR / package_name.replace(".", "/"))]
+        sys.modules[package_name] = package
+        setattr(parent, name, package)
+
+
+_register_helpers_packages()
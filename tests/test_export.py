@@ -0,0 +1,179 @@
+import json
+import shutil
+import pathlib
+import tarfile
+import tempfile
+
+import pytest
+
+from projects.core.library import env, export
+
+moto_server = pytest.importorskip("moto.server")
+boto3 = pytest.importorskip("boto3")
+
+pytestmark = pytest.mark.skipif(not shutil.which("aws"), reason="the aws CLI is needed to run the exports")
+
+BUCKET = "bucket"
+DEST = f"s3://{BUCKET}/run"
+
+# the export runs its batches in threads, they need the ARTIFACT_DIR of the main thread
+env._set_tls_artifact_dir(pathlib.Path(tempfile.mkdtemp(prefix="topsail_test_")))
+
+
+@pytest.fixture(scope="module")
+def s3_server():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    try:
+        host, port = server.get_host_and_port()
+        yield f"http://{host}:{port}"
+    finally:
+        server.stop()
+
+
+@pytest.fixture
+def s3(s3_server, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+
+    client = boto3.client("s3", endpoint_url=s3_server)
+    client.create_bucket(Bucket=BUCKET)
+    try:
+        yield client
+    finally:
+        for obj in client.list_objects_v2(Bucket=BUCKET).get("Contents", []):
+            client.delete_object(Bucket=BUCKET, Key=obj["Key"])
+        client.delete_bucket(Bucket=BUCKET)
+
+
+class Uploads():
+    """
+    Records the files of the uploaded batches. The batches named in
+    `failing` (eg, batch_0001) fail to upload.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.failing = set()
+
+    @property
+    def files(self):
+        return sorted(relpath for batch in self.batches for relpath in batch)
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    uploads = Uploads()
+    upload_directory = export._S3Uploader.upload_directory
+
+    def recording_upload_directory(self, src_dir, dest_path=""):
+        if src_dir.name in uploads.failing:
+            return False
+
+        uploads.batches.append([str(path.relative_to(src_dir)) for path in src_dir.rglob("*") if path.is_file()])
+
+        return upload_directory(self, src_dir, dest_path)
+
+    monkeypatch.setattr(export._S3Uploader, "upload_directory", recording_upload_directory)
+
+    return uploads
+
+
+def get_objects(s3):
+    return {obj["Key"].removeprefix("run/"): s3.get_object(Bucket=BUCKET, Key=obj["Key"])["Body"].read()
+            for obj in s3.list_objects_v2(Bucket=BUCKET).get("Contents", [])}
+
+
+def populate(src, files):
+    for relpath, content in files.items():
+        (src / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (src / relpath).write_text(content)
+
+
+def test_only_the_changed_files_are_uploaded(tmp_path, s3, s3_server, uploads):
+    src = tmp_path / "artifacts"
+    populate(src, {"a.txt": "a", "b.txt": "b", "dir/c.txt": "c"})
+    log_file = src / "aws_s3_cp.log"
+
+    export.upload_directory(src, DEST, endpoint_url=s3_server, log_file=log_file)
+
+    assert uploads.files == ["a.txt", "b.txt", "dir/c.txt"]
+    assert log_file.exists()
+
+    populate(src, {"b.txt": "b modified", "dir/d.txt": "d"})
+    uploads.batches.clear()
+
+    export.upload_directory(src, DEST, endpoint_url=s3_server, log_file=log_file)
+
+    # the log file written by the first export isn't exported
+    assert uploads.files == ["b.txt", "dir/d.txt"]
+    objects = get_objects(s3)
+    assert json.loads(objects.pop(export.MANIFEST_FILENAME))["uploaded"].keys() == objects.keys()
+    assert objects == {"a.txt": b"a", "b.txt": b"b modified", "dir/c.txt": b"c", "dir/d.txt": b"d"}
+
+    uploads.batches.clear()
+    export.upload_directory(src, DEST, endpoint_url=s3_server, log_file=log_file)
+
+    assert uploads.files == []
+
+
+def test_interrupted_export_resumes(tmp_path, s3, s3_server, uploads):
+    src = tmp_path / "artifacts"
+    populate(src, {f"file_{idx}.txt": str(idx) for idx in range(6)})
+    kwargs = dict(endpoint_url=s3_server, parallel=1, batch_size=2)
+
+    uploads.failing.add("batch_0001")
+    with pytest.raises(RuntimeError, match="1/3 batches"):
+        export.upload_directory(src, DEST, **kwargs)
+
+    assert uploads.files == ["file_0.txt", "file_1.txt", "file_4.txt", "file_5.txt"]
+
+    # resumed from the local manifest
+    uploads.failing.clear()
+    uploads.batches.clear()
+    export.upload_directory(src, DEST, **kwargs)
+
+    assert uploads.files == ["file_2.txt", "file_3.txt"]
+    assert sorted(get_objects(s3)) == sorted([export.MANIFEST_FILENAME] + [f"file_{idx}.txt" for idx in range(6)])
+
+    # resumed from the manifest of the destination, in a copy with other mtimes
+    copy = tmp_path / "copy"
+    shutil.copytree(src, copy, copy_function=shutil.copyfile,
+                    ignore=shutil.ignore_patterns(export.MANIFEST_FILENAME, export.LOG_FILENAME))
+    (copy / "file_0.txt").write_text("modified")
+    uploads.batches.clear()
+
+    export.upload_directory(copy, DEST, **kwargs)
+
+    assert uploads.files == ["file_0.txt"]
+
+
+def test_small_files_bundles(tmp_path, s3, s3_server, uploads):
+    src = tmp_path / "artifacts"
+    small_files = {f"logs/{idx}.log": f"log {idx}" for idx in range(3)}
+    populate(src, small_files | {"big.txt": "x" * 100})
+
+    export.upload_directory(src, DEST, endpoint_url=s3_server,
+                            bundle_small_files=True, bundle_max_file_size=10, bundle_min_files=3)
+
+    assert uploads.files == ["big.txt", f"logs/{export.BUNDLE_INDEX_FILENAME}", f"logs/{export.BUNDLE_FILENAME}"]
+
+    objects = get_objects(s3)
+    index = json.loads(objects[f"logs/{export.BUNDLE_INDEX_FILENAME}"])
+    assert [member["path"] for member in index["files"]] == ["0.log", "1.log", "2.log"]
+
+    bundle = tmp_path / "bundle.tar.gz"
+    bundle.write_bytes(objects[f"logs/{export.BUNDLE_FILENAME}"])
+    with tarfile.open(bundle) as tar:
+        assert {member.name: tar.extractfile(member).read().decode() for member in tar.getmembers()} \
+            == {f"{idx}.log": f"log {idx}" for idx in range(3)}
+
+    # a modified small file rebuilds its bundle only
+    populate(src, {"logs/1.log": "log 1 modified"})
+    uploads.batches.clear()
+    export.upload_directory(src, DEST, endpoint_url=s3_server,
+                            bundle_small_files=True, bundle_max_file_size=20, bundle_min_files=3)
+
+    assert uploads.files == [f"logs/{export.BUNDLE_INDEX_FILENAME}", f"logs/{export.BUNDLE_FILENAME}"]
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import time
+import threading
+import http.server
+import urllib.parse
+
+import pytest
+
+from projects.kserve.testing import failure_watcher
+
+NAMESPACE = "ns"
+PODS_PATH = f"/api/v1/namespaces/{NAMESPACE}/pods"
+ISVCS_PATH = f"/apis/serving.kserve.io/v1beta1/namespaces/{NAMESPACE}/inferenceservices"
+
+# `oc get --raw <path>`, streaming the response of the fake API server line by line
+FAKE_OC = f"""#!{sys.executable}
+import os, sys, urllib.request, urllib.error
+
+assert sys.argv[1:3] == ["get", "--raw"], sys.argv
+try:
+    with urllib.request.urlopen(f"http://127.0.0.1:{{os.environ['FAKE_API_PORT']}}{{sys.argv[3]}}") as response:
+        for line in response:
+            sys.stdout.write(line.decode())
+            sys.stdout.flush()
+except urllib.error.HTTPError:
+    sys.exit(1)
+"""
+
+
+def pod(resource_version, deleting=False, phase="Running"):
+    metadata = dict(name="u0-m0-predictor", resourceVersion=str(resource_version))
+    if deleting:
+        metadata["deletionTimestamp"] = "2026-10-18T00:00:00Z"
+
+    return dict(kind="Pod", metadata=metadata, status=dict(phase=phase, reason="Evicted", message="low on memory"))
+
+
+def resource_list(resource_version, items):
+    return dict(metadata=dict(resourceVersion=str(resource_version)), items=items)
+
+
+def event(event_type, obj):
+    return dict(type=event_type, object=obj)
+
+
+class FakeApiServer(http.server.ThreadingHTTPServer):
+    """
+    Serves the canned responses, keyed by (path, resourceVersion of the
+    watch, or None for the list). The n-th request of a key gets the
+    n-th response. The requests without response get an idle watch
+    stream, until the client goes away.
+    """
+
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, responses):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.responses = {key: list(value) for key, value in responses.items()}
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+class FakeApiHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0" # the response ends when the connection is closed
+
+    def log_message(self, *args):
+        pass
+
+    def send_line(self, obj):
+        self.wfile.write((json.dumps(obj) + "\n").encode() if obj is not None else b"\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        key = (url.path, query.get("resourceVersion") if query.get("watch") else None)
+
+        with self.server.lock:
+            self.server.requests.append(key)
+            responses = self.server.responses.get(key)
+            response = responses.pop(0) if responses else None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+
+        if key[1] is None: # list
+            return self.send_line(response)
+
+        try:
+            for line in response or []: # watch events, then end of the stream
+                self.send_line(line)
+
+            while response is None: # idle watch stream
+                time.sleep(0.1)
+                self.send_line(None)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def fake_api(tmp_path, monkeypatch):
+    servers = []
+
+    def start(responses):
+        server = FakeApiServer(responses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+
+        monkeypatch.setenv("FAKE_API_PORT", str(server.server_address[1]))
+
+        return server
+
+    oc = tmp_path / "bin" / "oc"
+    oc.parent.mkdir()
+    oc.write_text(FAKE_OC)
+    oc.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{oc.parent}{os.pathsep}{os.environ['PATH']}")
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_relist_after_gone_then_failure(fake_api):
+    server = fake_api({
+        (PODS_PATH, None): [resource_list(10, [pod(9)]), resource_list(20, [pod(19)])],
+        (PODS_PATH, "10"): [[
+            event("MODIFIED", pod(11)),
+            event("BOOKMARK", dict(kind="Pod", metadata=dict(resourceVersion="12"))),
+        ]], # end of the stream, resumed from the bookmark
+        (PODS_PATH, "12"): [[
+            event("ERROR", dict(kind="Status", code=410, message="too old resource version: 12")),
+        ]], # listed again
+        (PODS_PATH, "20"): [[
+            event("MODIFIED", pod(21)),
+            event("MODIFIED", pod(22, deleting=True)),
+        ]],
+    })
+
+    with pytest.raises(failure_watcher.FailureDetected, match="Pod/u0-m0-predictor being terminated"):
+        failure_watcher.FailureWatcher(NAMESPACE).watch("pods")
+
+    assert server.requests == [
+        (PODS_PATH, None), (PODS_PATH, "10"), (PODS_PATH, "12"), (PODS_PATH, None), (PODS_PATH, "20"),
+    ]
+
+
+def test_failed_pod_in_the_list(fake_api):
+    server = fake_api({
+        (PODS_PATH, None): [resource_list(10, [pod(9, phase="Failed")])],
+    })
+
+    with pytest.raises(failure_watcher.FailureDetected, match=r"failed \(Evicted: low on memory\)"):
+        failure_watcher.FailureWatcher(NAMESPACE).watch("pods")
+
+    assert server.requests == [(PODS_PATH, None)]
+
+
+def test_failing_inference_service(fake_api):
+    isvc = dict(kind="InferenceService", metadata=dict(name="u0-m0", resourceVersion="6"),
+                status=dict(modelStatus=dict(transitionStatus="BlockedByFailedLoad",
+                                             lastFailureInfo=dict(message="OOMKilled"))))
+    fake_api({
+        (ISVCS_PATH, None): [resource_list(5, [])],
+        (ISVCS_PATH, "5"): [[event("ADDED", isvc)]],
+    })
+
+    with pytest.raises(failure_watcher.FailureDetected, match="InferenceService/u0-m0 model failed to load"):
+        failure_watcher.FailureWatcher(NAMESPACE).watch("inferenceservices")
+
+
+def test_stop(fake_api):
+    server = fake_api({
+        (PODS_PATH, None): [resource_list(10, [pod(9)])],
+        (ISVCS_PATH, None): [resource_list(5, [])],
+    })
+
+    watcher = failure_watcher.FailureWatcher(NAMESPACE)
+    threads = [threading.Thread(target=watcher.watch, args=(resource,)) for resource in failure_watcher.RESOURCES]
+    for thread in threads: thread.start()
+
+    while len(server.requests) < 4: # the lists and the idle watch streams
+        time.sleep(0.05)
+    watcher.stop()
+
+    for thread in threads:
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+    assert set(server.requests) == {(PODS_PATH, None), (PODS_PATH, "10"), (ISVCS_PATH, None), (ISVCS_PATH, "5")}
+    assert not watcher.processes
+
+
+def test_deleted_pod(fake_api):
+    fake_api({
+        (PODS_PATH, None): [resource_list(10, [pod(9)])],
+        (PODS_PATH, "10"): [[event("DELETED", pod(11))]],
+    })
+
+    with pytest.raises(failure_watcher.FailureDetected, match="Pod/u0-m0-predictor deleted"):
+        failure_watcher.FailureWatcher(NAMESPACE).watch("pods")
@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+
+import pytest
+
+from projects.core.library import k8s_apply
+
+# records the arguments and the applied objects, fails the batches containing a `fail-*` object
+FAKE_OC = f"""#!{sys.executable}
+import os, sys, json
+
+objects = json.load(sys.stdin)
+with open(os.environ["FAKE_OC_LOG"], "a") as f:
+    print(json.dumps(dict(args=sys.argv[1:], objects=objects)), file=f)
+
+if any(obj["metadata"]["name"].startswith("fail-") for obj in objects["items"]):
+    print("the server rejected the object", file=sys.stderr)
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def fake_oc(tmp_path, monkeypatch):
+    oc = tmp_path / "bin" / "oc"
+    oc.parent.mkdir()
+    oc.write_text(FAKE_OC)
+    oc.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{oc.parent}{os.pathsep}{os.environ['PATH']}")
+
+    log_file = tmp_path / "oc.log"
+    monkeypatch.setenv("FAKE_OC_LOG", str(log_file))
+
+    def get_calls():
+        with open(log_file) as f:
+            return [json.loads(line) for line in f]
+
+    return get_calls
+
+
+def obj(name):
+    return dict(apiVersion="v1", kind="ConfigMap", metadata=dict(name=name))
+
+
+def test_apply_batches(fake_oc):
+    batches = [
+        ("ns-1", [obj("cm-1"), obj("cm-2")]),
+        ("ns-2", [obj("fail-3")]),
+        (None, [obj("node-4")]),
+    ]
+
+    results, summary = k8s_apply.apply_batches(batches, parallel=2)
+
+    assert [(result["count"], result["returncode"]) for result in results] == [(2, 0), (1, 1), (1, 0)]
+    assert results[1]["error"] == "the server rejected the object"
+    assert "error" not in results[0]
+
+    assert summary["batches"] == 3
+    assert summary["failed_batches"] == 1
+    assert summary["batch_latency_min"] <= summary["batch_latency_median"] <= summary["batch_latency_max"]
+
+    calls = sorted(fake_oc(), key=lambda call: call["objects"]["items"][0]["metadata"]["name"])
+    assert [call["args"] for call in calls] == [
+        ["apply", "--server-side", "--force-conflicts", "-f-", "-n", "ns-1"],
+        ["apply", "--server-side", "--force-conflicts", "-f-", "-n", "ns-2"],
+        ["apply", "--server-side", "--force-conflicts", "-f-"],
+    ]
+    assert calls[0]["objects"] == dict(apiVersion="v1", kind="List", items=[obj("cm-1"), obj("cm-2")])
+
+
+def test_apply_no_batch(fake_oc):
+    results, summary = k8s_apply.apply_batches([], parallel=2)
+
+    assert results == []
+    assert summary["batches"] == 0 and summary["batch_latency_median"] is None
@@ -0,0 +1,147 @@
+import gc
+import time
+import types
+import datetime
+
+import pandas as pd
+
+import projects.matrix_benchmarking.visualizations.helpers.store.llm_load_test as helpers_store_llm_load_test
+import projects.matrix_benchmarking.visualizations.helpers.analyze.llm_load_test as helpers_analyze_llm_load_test
+
+
+def _result(**kwargs):
+    result = dict(start_time=1.0, end_time=2.0, response_time=1.0, output_tokens=10,
+                  tpot=0.1, itl=0.1, ttft=0.2, error_code=None, error_text=None,
+                  user_id=1, stop_reason=None)
+    result.update(kwargs)
+
+    return result
+
+
+def _entry(results):
+    entry = types.SimpleNamespace()
+    entry.results = types.SimpleNamespace()
+    entry.results.llm_load_test_results = helpers_store_llm_load_test.parse_results_table(dict(results=results))
+
+    return entry
+
+
+class Entry():
+    # weak-referenceable, like the matrix entries
+    def __init__(self, results, **settings):
+        self.results = types.SimpleNamespace()
+        self.results.llm_load_test_results = helpers_store_llm_load_test.parse_results_table(dict(results=results))
+        self.settings = types.SimpleNamespace(**settings)
+
+    def get_name(self, variables):
+        return ", ".join(f"{key}={self.settings.__dict__[key]}" for key in variables)
+
+
+def test_text_columns_keep_none():
+    table = helpers_store_llm_load_test.parse_results_table(dict(results=[
+        _result(stop_reason="stop"),
+        _result(stop_reason=None, error_code=500, error_text="boom"),
+    ]))
+
+    assert table.stop_reason.dtype == object
+    assert table.stop_reason.tolist() == ["stop", None]
+    assert table.error_text.dtype == object
+    assert table.error_text.tolist() == [None, "boom"]
+
+
+def test_finish_reasons_mixed_vllm_and_none():
+    entry = _entry([_result(stop_reason="stop"), _result(stop_reason=None)])
+
+    assert helpers_analyze_llm_load_test.get_finish_reasons(entry) == {
+        "EOS_TOKEN": 1,
+        "NOT_REPORTED": 1,
+    }
+
+
+def test_finish_reasons_with_errors():
+    entry = _entry([
+        _result(stop_reason="length"),
+        _result(stop_reason=1),
+        _result(stop_reason=None),
+        _result(error_code=500, error_text="CUDA out of memory, tried to allocate"),
+    ])
+
+    assert helpers_analyze_llm_load_test.get_finish_reasons(entry) == {
+        "MAX_TOKENS": 2,
+        "NOT_REPORTED": 1,
+        "CUDA out of memory": 1,
+    }
+
+
+def test_finish_reason_nan_is_not_reported():
+    assert helpers_analyze_llm_load_test._get_finish_reason(float("nan")) == "NOT_REPORTED"
+
+
+def test_missing_user_id_is_not_user_0():
+    table = helpers_store_llm_load_test.parse_results_table(dict(results=[
+        _result(user_id=0),
+        _result(user_id=None),
+    ]))
+
+    assert table.user_id[0] == 0
+    assert table.user_id.isna().tolist() == [False, True]
+
+
+def test_to_local_datetime_across_dst_change(monkeypatch):
+    # Newfoundland switches to summer time on 2026-03-08 at 02:00 local time, 05:30 UTC,
+    # in the middle of an UTC hour
+    monkeypatch.setenv("TZ", "America/St_Johns")
+    time.tzset()
+    try:
+        dst_change = datetime.datetime(2026, 3, 8, 5, 30, tzinfo=datetime.timezone.utc).timestamp()
+        timestamps = pd.Series([dst_change - 1800.25, dst_change - 0.5, dst_change, dst_change + 1800.123456])
+
+        local_datetimes = helpers_store_llm_load_test.to_local_datetime(timestamps)
+
+        assert local_datetimes.tolist() == [datetime.datetime.fromtimestamp(ts) for ts in timestamps]
+        assert local_datetimes[1].hour == 1 and local_datetimes[2].hour == 3
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_parse_results_drops_the_results():
+    llm_load_test_output = dict(results=[_result(), _result()], summary=dict(throughput=1))
+
+    results = types.SimpleNamespace(llm_load_test_output=llm_load_test_output)
+    results.llm_load_test_results = helpers_store_llm_load_test.parse_results(llm_load_test_output)
+
+    assert len(results.llm_load_test_results) == 2
+    assert llm_load_test_output == dict(summary=dict(throughput=1))
+    assert helpers_store_llm_load_test.is_cached_results_up_to_date(results)
+
+    results.llm_load_test_results.attrs["version"] = 0 # cache file generated by an older version
+    assert not helpers_store_llm_load_test.is_cached_results_up_to_date(results)
+
+
+def test_upgrade_cached_results():
+    # cache file generated before the results table
+    results = types.SimpleNamespace(llm_load_test_output=dict(results=[_result()], summary={}))
+
+    helpers_store_llm_load_test.upgrade_cached_results(results)
+
+    assert len(results.llm_load_test_results) == 1
+    assert "results" not in results.llm_load_test_output
+    assert helpers_store_llm_load_test.is_cached_results_up_to_date(results)
+
+
+def test_latency_details_cache_does_not_keep_the_entries():
+    helpers_analyze_llm_load_test._latency_details_cache.clear()
+
+    entries = [Entry([_result(), _result(error_code=500, error_text="boom")], model_name="m", index=idx)
+               for idx in range(2)]
+    kwargs = dict(model_name_key="model_name", get_model_name=lambda entry: entry.settings.model_name)
+
+    df = helpers_analyze_llm_load_test.generate_latency_details_data(entries, ["index"], ["index"], **kwargs)
+    assert len(df) == 2 # the errors are hidden
+    assert helpers_analyze_llm_load_test.generate_latency_details_data(entries, ["index"], ["index"], **kwargs) is df
+
+    del entries
+    gc.collect()
+
+    assert not helpers_analyze_llm_load_test._latency_details_cache
@@ -0,0 +1,151 @@
+import time
+import pathlib
+import tempfile
+import threading
+import subprocess
+
+import pytest
+
+from projects.core.library import env, run
+
+# env replaces threading.Thread with a class propagating the
+# ARTIFACT_DIR of the parent thread, so the main thread must have one
+# before any thread is started (in this module or in the others).
+env._set_tls_artifact_dir(pathlib.Path(tempfile.mkdtemp(prefix="topsail_test_")))
+
+
+@pytest.fixture
+def artifact_dir(tmp_path):
+    prev_artifact_dir = env.ARTIFACT_DIR
+    env._set_tls_artifact_dir(tmp_path)
+    try:
+        yield tmp_path
+    finally:
+        env._set_tls_artifact_dir(prev_artifact_dir)
+
+
+class Recorder():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started = []
+
+    def task(self, idx, duration=0.1):
+        with self.lock:
+            self.started.append(idx)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        time.sleep(duration)
+
+        with self.lock:
+            self.running -= 1
+
+
+def test_max_workers(artifact_dir):
+    recorder = Recorder()
+
+    with run.Parallel("test", exit_on_exception=False, dedicated_dir=False, max_workers=2) as parallel:
+        for idx in range(6):
+            parallel.delayed(recorder.task, idx)
+
+    assert recorder.max_running == 2
+    assert sorted(recorder.started) == list(range(6))
+
+
+def test_shared_executor_fifo(artifact_dir):
+    recorder = Recorder()
+
+    with run.Executor("test", max_workers=1) as executor:
+        for block in range(2):
+            with run.Parallel(f"test_{block}", exit_on_exception=False, dedicated_dir=False,
+                              executor=executor) as parallel:
+                for idx in range(3):
+                    parallel.delayed(recorder.task, block * 3 + idx, duration=0.01)
+
+    assert recorder.max_running == 1
+    assert recorder.started == list(range(6))
+
+
+def test_max_workers_with_executor():
+    with run.Executor("test") as executor:
+        with pytest.raises(ValueError, match="max_workers"):
+            run.Parallel("test", max_workers=2, executor=executor)
+
+
+def test_timeout_of_python_code(artifact_dir):
+    start = time.monotonic()
+
+    with pytest.raises(TimeoutError, match="timed out after 0.5s"):
+        with run.Parallel("test", exit_on_exception=False, dedicated_dir=False, timeout=0.5) as parallel:
+            parallel.delayed(time.sleep, 5)
+
+    # raised when the task is late, its thread is abandoned
+    assert time.monotonic() - start < 2
+
+
+def test_timeout_kills_the_subprocesses(artifact_dir):
+    start = time.monotonic()
+    returncodes = []
+
+    def run_sleep():
+        try:
+            run.run("sleep 30", protect_shell=False, log_command=False)
+        except subprocess.CalledProcessError as e:
+            returncodes.append(e.returncode)
+
+    with pytest.raises(TimeoutError):
+        with run.Parallel("test", exit_on_exception=False, dedicated_dir=False, timeout=0.5) as parallel:
+            parallel.delayed(run_sleep)
+
+    assert time.monotonic() - start < 2
+
+    deadline = time.monotonic() + 5
+    while not returncodes and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert returncodes and returncodes[0] < 0 # killed by a signal
+
+
+def test_cancel_siblings(artifact_dir):
+    start = time.monotonic()
+    sibling_done = threading.Event()
+
+    def fail():
+        time.sleep(0.2)
+        raise RuntimeError("failure")
+
+    def sibling():
+        try:
+            run.run("sleep 30", protect_shell=False, log_command=False)
+        finally:
+            sibling_done.set()
+
+    with pytest.raises(RuntimeError, match="failure"):
+        with run.Parallel("test", exit_on_exception=False, dedicated_dir=False, cancel_siblings=True) as parallel:
+            parallel.delayed(fail)
+            parallel.delayed(sibling)
+
+    # the subprocess of the sibling has been killed, the sibling has completed
+    assert sibling_done.is_set()
+    assert time.monotonic() - start < 5
+
+
+def test_artifact_dir(artifact_dir):
+    artifact_dirs = []
+
+    def record_artifact_dir():
+        artifact_dirs.append(env.ARTIFACT_DIR)
+
+        # propagated to the threads started by the task
+        thread = threading.Thread(target=lambda: artifact_dirs.append(env.ARTIFACT_DIR))
+        thread.start()
+        thread.join()
+
+    with run.Parallel("test_dir", exit_on_exception=False) as parallel:
+        parallel.delayed(record_artifact_dir)
+        parallel.delayed(record_artifact_dir)
+
+    [dedicated_dir] = list(artifact_dir.glob("*__test_dir"))
+    assert artifact_dirs == [dedicated_dir] * 4
+    assert env.ARTIFACT_DIR == artifact_dir
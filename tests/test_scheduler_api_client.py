@@ -0,0 +1,220 @@
+import sys
+import json
+import types
+import time
+import base64
+import shutil
+import tempfile
+import threading
+import subprocess
+import http.server
+
+import pytest
+import yaml
+
+from conftest import TOPSAIL_DIR
+
+sys.path.insert(0, str(TOPSAIL_DIR / "projects/scheduler/subprojects/scheduler-load-generator"))
+
+import api_client # noqa: E402
+
+RESPONSE_DELAY = 0.05 # seconds
+SLOW_RESPONSE_DELAY = 1 # seconds
+
+
+class FakeApiServer(http.server.ThreadingHTTPServer):
+    """
+    Records the POSTs, and the maximum number of requests in flight.
+
+    The resources named drop-* are created, but the connection is
+    closed without a response. The responses of the slow-* resources
+    are delayed by SLOW_RESPONSE_DELAY.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.lock = threading.Lock()
+        self.posts = []
+        self.created = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+class FakeApiHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive connections
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        name = body["metadata"]["name"]
+        server = self.server
+
+        with server.lock:
+            server.posts.append((self.path, name))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            exists = (self.path, name) in server.created
+            server.created.add((self.path, name))
+
+        time.sleep(SLOW_RESPONSE_DELAY if name.startswith("slow-") else RESPONSE_DELAY)
+
+        with server.lock:
+            server.in_flight -= 1
+
+        if name.startswith("drop-") and not exists:
+            self.close_connection = True
+            return
+
+        status = 409 if exists else 201
+        response = json.dumps(dict(message="already exists") if exists else body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+
+@pytest.fixture
+def fake_api():
+    server = FakeApiServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get_creator(server, max_in_flight, timeout=api_client.DEFAULT_TIMEOUT):
+    api_config = types.SimpleNamespace(
+        server=f"http://127.0.0.1:{server.server_address[1]}/prefix",
+        token="token", ca_file=None, ca_data=None, insecure=False,
+        client_cert=None, client_key=None, client_cert_data=None, client_key_data=None,
+        proxy=None,
+    )
+
+    return api_client.ApiCreator(api_config, max_in_flight, timeout)
+
+
+def job(name, kind="Job", api_version="batch/v1", namespace="ns"):
+    return json.dumps(dict(apiVersion=api_version, kind=kind,
+                           metadata=dict(name=name, namespace=namespace)))
+
+
+def test_create_paths_in_flight_and_timing(fake_api):
+    creator = get_creator(fake_api, max_in_flight=4)
+
+    futures = []
+    for idx in range(20):
+        futures.append(creator.create(job(f"job-{idx}")))
+        # one PodGroup + one PyTorchJob per resource_json, see utils.get_json_resource
+        futures.append(creator.create("\n".join([
+            job(f"pg-{idx}", "PodGroup", "scheduling.x-k8s.io/v1alpha1"),
+            job(f"pytorch-{idx}", "PyTorchJob", "kubeflow.org/v1"),
+        ])))
+    timings = [future.result() for future in futures]
+    creator.shutdown()
+
+    assert sorted(fake_api.posts) == sorted(
+        [("/prefix/apis/batch/v1/namespaces/ns/jobs", f"job-{idx}") for idx in range(20)]
+        + [("/prefix/apis/scheduling.x-k8s.io/v1alpha1/namespaces/ns/podgroups", f"pg-{idx}") for idx in range(20)]
+        + [("/prefix/apis/kubeflow.org/v1/namespaces/ns/pytorchjobs", f"pytorch-{idx}") for idx in range(20)]
+    )
+    assert fake_api.max_in_flight == 4
+
+    for timing in timings:
+        assert timing["error"] is None
+        assert timing["status"] == 201
+        assert not timing["retried"]
+        assert timing["submit_ts"] <= timing["send_ts"] <= timing["ack_ts"]
+        assert timing["latency"] == timing["ack_ts"] - timing["send_ts"]
+        assert timing["latency"] >= RESPONSE_DELAY
+
+
+def test_retry_after_lost_response_is_created(fake_api):
+    creator = get_creator(fake_api, max_in_flight=1)
+
+    # the first request opens the persistent connection
+    assert creator.create(job("job-0")).result()["error"] is None
+    # the response is lost, the retry finds the resource already created
+    timing = creator.create(job("drop-1")).result()
+    creator.shutdown()
+
+    assert timing["error"] is None
+    assert timing["retried"]
+    assert timing["status"] == 409
+    assert [name for _, name in fake_api.posts] == ["job-0", "drop-1", "drop-1"]
+
+
+def test_no_retry_on_a_new_connection(fake_api):
+    creator = get_creator(fake_api, max_in_flight=1)
+
+    timing = creator.create(job("drop-0")).result()
+    creator.shutdown()
+
+    assert timing["error"].startswith("RemoteDisconnected")
+    assert [name for _, name in fake_api.posts] == ["drop-0"]
+
+
+def test_timeout_closes_the_connection(fake_api):
+    creator = get_creator(fake_api, max_in_flight=1, timeout=0.5)
+
+    assert creator.create(job("job-0")).result()["error"] is None
+    timing = creator.create(job("slow-1")).result()
+    # sent on a new connection, the pending response of slow-1 is not read
+    next_timing = creator.create(job("job-2")).result()
+    creator.shutdown()
+
+    assert timing["error"].startswith("TimeoutError")
+    assert not timing["retried"]
+
+    assert next_timing["error"] is None
+    assert next_timing["status"] == 201
+    assert not next_timing["retried"]
+    assert [name for _, name in fake_api.posts] == ["job-0", "slow-1", "job-2"]
+
+
+def test_resource_path():
+    assert api_client.get_resource_path(json.loads(job("job", "AppWrapper", "workload.codeflare.dev/v1beta2"))) \
+        == "/apis/workload.codeflare.dev/v1beta2/namespaces/ns/appwrappers"
+    assert api_client.get_resource_path(json.loads(job("cm", "ConfigMap", "v1"))) \
+        == "/api/v1/namespaces/ns/configmaps"
+
+    with pytest.raises(ValueError, match="unknown resource kind"):
+        api_client.get_resource_path(json.loads(job("np", "NetworkPolicy", "networking.k8s.io/v1")))
+
+
+@pytest.mark.skipif(not shutil.which("openssl"), reason="openssl is needed to generate the client certificate")
+def test_client_certificate_not_left_on_disk(tmp_path, monkeypatch):
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=test",
+                    "-keyout", tmp_path / "client.key", "-out", tmp_path / "client.crt"],
+                   check=True, capture_output=True)
+
+    kubeconfig = dict(
+        clusters=[dict(name="cluster", cluster=dict(server="https://127.0.0.1:6443", **{"insecure-skip-tls-verify": True}))],
+        users=[dict(name="user", user={
+            "client-certificate-data": base64.b64encode((tmp_path / "client.crt").read_bytes()).decode(),
+            "client-key-data": base64.b64encode((tmp_path / "client.key").read_bytes()).decode(),
+        })],
+        contexts=[dict(name="context", context=dict(cluster="cluster", user="user"))],
+    )
+    kubeconfig["current-context"] = "context"
+    (tmp_path / "kubeconfig").write_text(yaml.dump(kubeconfig))
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "kubeconfig"))
+
+    tmp_dir = tmp_path / "tmp"
+    tmp_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_dir))
+
+    api_config = api_client.load_api_config()
+    creator = api_client.ApiCreator(api_config)
+    creator.shutdown()
+
+    assert api_config.client_cert is None and api_config.client_cert_data
+    assert creator.ssl_context is not None
+    assert list(tmp_dir.iterdir()) == []